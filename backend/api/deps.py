@@ -6,20 +6,23 @@ from sqlalchemy.future import select
 
 # 🔄 UPDATED IMPORTS: backend -> backend
 from backend.core.config import settings
-from backend.core.database import get_db
+from backend.core.database import get_read_db
 from backend.db.models import User
+from backend.core.identity_cache import CachedUser, identity_cache, token_cache
 
 # ⚡ CRITICAL FIX: The token URL must match exactly where your auth.py is mounted.
 # In router.py, we mounted auth at root ("") prefix, so the path is /api/login/access-token
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_STR}/login/access-token")
 
 async def get_current_user(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     token: str = Depends(oauth2_scheme)
-) -> User:
+) -> CachedUser:
     """
     Decodes the JWT token from the Authorization header.
-    Returns the User object from the REAL Database (vlink.db).
+    Returns a slim, immutable copy of the User from the REAL Database (vlink.db).
+    Both the decoded claims and the user record are cached (see backend/core/identity_cache.py),
+    so most requests neither verify the signature again nor query SQLite.
     """
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
@@ -27,20 +30,26 @@ async def get_current_user(
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        # 1. Decode Token
-        # We use "HS256" as the default algorithm if not explicitly set in config
-        algorithm = getattr(settings, "ALGORITHM", "HS256")
-        
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[algorithm])
-        user_id: str = payload.get("sub")
-        
-        if user_id is None:
+    payload = token_cache.get(token)
+    if payload is None:
+        try:
+            # 1. Decode Token
+            # We use "HS256" as the default algorithm if not explicitly set in config
+            algorithm = getattr(settings, "ALGORITHM", "HS256")
+
+            payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[algorithm])
+        except JWTError:
             raise credentials_exception
-            
-    except JWTError:
+        token_cache.put_claims(token, payload)
+
+    user_id: str = payload.get("sub")
+    if user_id is None:
         raise credentials_exception
-    
+
+    cached = identity_cache.get(user_id)
+    if cached is not None:
+        return cached
+
     # 2. Query the Real Database
     # We look up the user by the ID found in the token
     result = await db.execute(select(User).where(User.id == user_id))
@@ -48,5 +57,7 @@ async def get_current_user(
     
     if user is None:
         raise credentials_exception
-        
-    return user
\ No newline at end of file
+
+    cached = CachedUser.from_model(user)
+    identity_cache.put(user_id, cached)
+    return cached
\ No newline at end of file
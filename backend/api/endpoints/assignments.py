@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -8,7 +9,7 @@ import uuid
 from datetime import datetime
 
 # 🔄 IMPORTS
-from backend.core.database import get_db
+from backend.core.database import get_db, get_read_db
 from backend.api.deps import get_current_user
 # ⚡ ADDED: Enrollment needed for student queries
 from backend.db.models import User, Assignment, Submission, SubmissionStatus, UserRole, Classroom, Enrollment
@@ -30,7 +31,7 @@ class QuizSubmission(BaseModel):
 
 @router.get("/me")
 async def get_my_assignments(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -150,7 +151,12 @@ async def submit_assignment(
     )
     
     db.add(submission)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request submitted first (unique assignment/student index)
+        await db.rollback()
+        return {"success": False, "message": "You have already submitted this assignment."}
     
     return {
         "success": True,
@@ -1,29 +1,33 @@
 from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from fastapi.security import OAuth2PasswordRequestForm
-# You might need to import your token creation utility here
-# from backend.core.security import create_access_token 
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.core.database import get_read_db
+from backend.core.security import create_user_token, verify_password_async
+from backend.db.models import User
 
 router = APIRouter()
 
 # 1. Define the Login Route
 @router.post("/login/access-token")
-async def login_access_token(form_data: OAuth2PasswordRequestForm = Depends()):
+async def login_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_read_db)):
     """
-    Login endpoint that accepts 'student'/'123'
+    Login endpoint (users from backend/seeder.py, e.g. 'student'/'123').
+    The token carries id, username, name and role, so sockets authenticate from its claims.
     """
-    username = form_data.username
-    password = form_data.password
+    result = await db.execute(select(User).where(User.username == form_data.username))
+    user = result.scalars().first()
 
-    # ⚡ HARDCODED CHECK (What you asked for)
-    if (username == "student" or username == "teacher") and password == "123":
-        # ✅ SUCCESS: Generate a generic token
-        # In a real app, you would sign this with a secret key
+    if user and await verify_password_async(form_data.password, user.hashed_password):
+        # ✅ SUCCESS: signed token with the identity claims
+        role = getattr(user.role, "value", user.role)
         return {
-            "access_token": f"real-token-for-{username}", 
+            "access_token": create_user_token(user),
             "token_type": "bearer",
-            "user": {"username": username, "role": username}
+            "user": {"id": user.id, "username": user.username, "role": role}
         }
-    
+
     # ❌ FAILURE
-    raise HTTPException(status_code=400, detail="Incorrect email or password")
\ No newline at end of file
+    raise HTTPException(status_code=400, detail="Incorrect email or password")
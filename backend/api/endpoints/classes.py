@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -8,7 +9,7 @@ import string
 import uuid
 
 # 🔄 FIX: Ensure correct imports
-from backend.core.database import get_db
+from backend.core.database import get_db, get_read_db
 from backend.api.deps import get_current_user
 from backend.db.models import User, Classroom, Enrollment, UserRole, ClassStatus
 
@@ -87,14 +88,19 @@ async def join_classroom(
     # 3. Enroll
     enrollment = Enrollment(user_id=current_user.id, classroom_id=classroom.id)
     db.add(enrollment)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request enrolled first (unique user/classroom index)
+        await db.rollback()
+        return {"success": True, "message": "Already enrolled", "classId": classroom.id}
     
     return {"success": True, "classId": classroom.id}
 
 @router.get("/{class_id}")
 async def get_classroom_details(
     class_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     # Load teacher and students to prevent NoneType errors
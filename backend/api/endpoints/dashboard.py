@@ -4,7 +4,7 @@ from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
 from typing import Any
 
-from backend.core.database import get_db
+from backend.core.database import get_read_db
 from backend.api.deps import get_current_user
 from backend.db.models import User, Classroom, Enrollment, ClassStatus, UserRole
 
@@ -13,7 +13,7 @@ router = APIRouter()
 # ⚡ FIX: Use empty string "" to match "/api/dashboard" exactly (no trailing slash)
 @router.get("")
 async def get_dashboard_data(
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ) -> Any:
     # ... (Keep your existing logic for fetching classes/stats) ...
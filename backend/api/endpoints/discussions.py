@@ -8,7 +8,7 @@ import uuid
 from datetime import datetime
 
 # 🔄 FIX: backend -> backend
-from backend.core.database import get_db
+from backend.core.database import get_db, get_read_db
 from backend.api.deps import get_current_user
 from backend.db.models import User, Discussion, Classroom
 
@@ -30,7 +30,7 @@ class PostResponse(BaseModel):
 @router.get("/class/{class_id}", response_model=List[PostResponse])
 async def get_discussions(
     class_id: str,
-    db: AsyncSession = Depends(get_db),
+    db: AsyncSession = Depends(get_read_db),
     current_user: User = Depends(get_current_user)
 ):
     """
@@ -1,11 +1,15 @@
-import aiofiles
-from fastapi import APIRouter, UploadFile, File, Depends, Query, HTTPException
+from fastapi import APIRouter, UploadFile, File, Depends, Query, HTTPException, Request
 from pathlib import Path
+from pydantic import BaseModel
+from sqlalchemy import or_, union
 from sqlalchemy.future import select
 
 from backend.api.deps import get_current_user
-from backend.core.database import AsyncSessionLocal
-from backend.db.models import FileResource, AudioCache
+from backend.core.database import AsyncSessionLocal, ReadSessionLocal
+from backend.core.blob_store import blob_store
+from backend.core.http_cache import file_download
+from backend.db.models import Blob, Classroom, Enrollment, FileResource, AudioCache, UserRole
+from backend.core.upload_pipeline import QuotaExceeded, StoredUpload, store_upload, upload_quota
 from backend.core.worker import enqueue_ffprobe
 
 router = APIRouter()
@@ -13,55 +17,166 @@ UPLOAD_DIR = Path("uploads")
 UPLOAD_DIR.mkdir(exist_ok=True)
 
 
-async def save_upload_file_async(upload_file: UploadFile, dest_path: Path):
-    # async streaming write
-    async with aiofiles.open(dest_path, "wb") as out_file:
-        while True:
-            chunk = await upload_file.read(1024 * 64)
-            if not chunk:
-                break
-            await out_file.write(chunk)
-    # ensure upload_file file is closed
-    try:
-        await upload_file.close()
-    except Exception:
-        pass
+def display_name(filename: str | None) -> str:
+    # Keep only the final path component of client-supplied names
+    return Path(filename or "upload").name or "upload"
+
+
+def member_classroom_ids(user_id: str):
+    """Classes the user teaches or is enrolled in (a subquery for IN clauses)."""
+    return union(
+        select(Classroom.id).where(Classroom.teacher_id == user_id),
+        select(Enrollment.classroom_id).where(Enrollment.user_id == user_id),
+    )
+
+
+async def require_member(classroom_id: str, current_user, headers: dict | None = None):
+    """403 unless the caller teaches or is enrolled in the class."""
+    async with ReadSessionLocal() as db:
+        result = await db.execute(
+            select(Classroom.id).where(Classroom.id == classroom_id, Classroom.id.in_(member_classroom_ids(current_user.id)))
+        )
+        if result.first() is None:
+            raise HTTPException(status_code=403, detail="Not a member of this class", headers=headers)
 
 
 @router.post("/upload")
 async def upload_file(classroom_id: str = Query(...), upload_file: UploadFile = File(...), current_user=Depends(get_current_user)):
-    # Save file asynchronously
-    dest = UPLOAD_DIR / upload_file.filename
-    # avoid overwriting: if exists, append uuid
-    if dest.exists():
-        from uuid import uuid4
-        dest = UPLOAD_DIR / f"{uuid4().hex}_{upload_file.filename}"
-    await save_upload_file_async(upload_file, dest)
-
-    # Create DB record (async)
+    await require_member(classroom_id, current_user)
+    # Stream to a temp file off the event loop; SHA-256, size and quotas are handled in the same pass.
+    # The blob store then keeps one copy per content hash.
+    try:
+        async with upload_quota.reserve(current_user.id, classroom_id) as reservation:
+            stored = await store_upload(upload_file, blob_store.temp_path(), reservation)
+            return await register_file(stored, classroom_id, upload_file.content_type, current_user.id, upload_file.filename)
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+
+class DedupeRequest(BaseModel):
+    classroom_id: str
+    filename: str
+    sha256: str
+    size_bytes: int
+    content_type: str | None = None
+
+
+@router.post("/dedupe")
+async def dedupe_file(req: DedupeRequest, current_user=Depends(get_current_user)):
+    """
+    Upload-free shortcut: if the caller already has access to content with this SHA-256 and
+    size (a file they uploaded, or one in a class they belong to), the file is added to the
+    class immediately. 404 means the client has to upload the bytes.
+    """
+    await require_member(req.classroom_id, current_user)
+    try:
+        # Charged only to a user/class that does not store this content yet (physical bytes)
+        async with upload_quota.reserve(current_user.id, req.classroom_id, expected=req.size_bytes, sha256=req.sha256):
+            record = await link_file(req.sha256, req.size_bytes, req.classroom_id, req.content_type, current_user.id, req.filename)
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
+    if record is None:
+        raise HTTPException(status_code=404, detail="Content not stored yet, upload it")
+    return record
+
+
+@router.api_route("/download/{file_id}", methods=["GET", "HEAD"])
+async def download_file(file_id: str, request: Request):
+    """
+    Serves the stored file with a strong ETag (its SHA-256), If-None-Match, and byte ranges
+    (Range with one or several ranges, If-Range), so players can seek and the PWA service
+    worker can keep immutable copies.
+    """
+    async with ReadSessionLocal() as db:
+        file_record = await db.get(FileResource, file_id)
+    if not file_record or not Path(file_record.file_path).is_file():
+        raise HTTPException(status_code=404, detail="File not found")
+    return file_download(request, file_record.file_path, file_record.filename, file_record.file_type, file_record.sha256)
+
+
+@router.delete("/{file_id}")
+async def delete_file(file_id: str, current_user=Depends(get_current_user)):
+    """
+    Removes a file from its class (uploader or the class's teacher only); the stored blob is
+    collected once nothing references it.
+    """
     async with AsyncSessionLocal() as db:
-        file_record = FileResource(
-            classroom_id=classroom_id,
-            filename=dest.name,
-            file_path=str(dest),
-            file_size=str(dest.stat().st_size),
-            file_type=upload_file.content_type or "application/octet-stream",
-            is_offline_ready=False,
-        )
+        file_record = await db.get(FileResource, file_id)
+        if not file_record:
+            raise HTTPException(status_code=404, detail="File not found")
+        # The uploader, or the teacher of the class the file belongs to
+        if file_record.uploaded_by != current_user.id:
+            classroom = await db.get(Classroom, file_record.classroom_id)
+            if current_user.role != UserRole.TEACHER or not classroom or classroom.teacher_id != current_user.id:
+                raise HTTPException(status_code=403, detail="Not allowed to delete this file")
+        if file_record.blob_sha256:
+            await blob_store.release_ref(db, file_record.blob_sha256)
+        await db.delete(file_record)
+        await db.commit()
+    return {"success": True}
+
+
+def _file_record(blob: Blob, classroom_id: str, content_type: str | None, uploaded_by: str | None, filename: str | None) -> FileResource:
+    return FileResource(
+        classroom_id=classroom_id,
+        filename=display_name(filename),
+        file_path=blob.path,
+        file_size=str(blob.size_bytes),
+        file_type=content_type or "application/octet-stream",
+        is_offline_ready=False,
+        uploaded_by=uploaded_by,
+        size_bytes=blob.size_bytes,
+        sha256=blob.sha256,
+        blob_sha256=blob.sha256,
+    )
+
+
+async def _created(file_record: FileResource, content_type: str | None) -> FileResource:
+    # persist an ffprobe job to extract audio metadata (run by the probe runner, survives restarts)
+    if content_type and content_type.startswith("audio"):
+        await enqueue_ffprobe(file_record.file_path, related={"type": "file_resource", "id": file_record.id}, classroom_id=file_record.classroom_id)
+    return file_record
+
+
+async def register_file(stored: StoredUpload, classroom_id: str, content_type: str | None, uploaded_by: str | None, filename: str | None) -> FileResource:
+    """Stores an upload in the blob store (deduplicated) and creates its FileResource row."""
+    async with AsyncSessionLocal() as db:
+        blob = await blob_store.put(db, stored)
+        file_record = _file_record(blob, classroom_id, content_type, uploaded_by, filename)
         db.add(file_record)
         await db.commit()
         await db.refresh(file_record)
+    return await _created(file_record, content_type)
 
-    # enqueue ffprobe job to extract audio metadata (non-blocking)
-    if upload_file.content_type and upload_file.content_type.startswith("audio"):
-        enqueue_ffprobe(str(dest), related={"type": "file_resource", "id": file_record.id})
 
-    return file_record
+async def link_file(sha256: str, size_bytes: int, classroom_id: str, content_type: str | None, uploaded_by: str | None, filename: str | None) -> FileResource | None:
+    """
+    Creates a FileResource for already stored content, or returns None if it is unknown.
+    A hash alone is no proof of possession: only content the uploader can already reach (a
+    file they uploaded, or one in a class they belong to) is linked; anything else is uploaded.
+    """
+    async with AsyncSessionLocal() as db:
+        reachable = await db.execute(
+            select(FileResource.id).where(
+                FileResource.blob_sha256 == sha256.lower(),
+                or_(FileResource.uploaded_by == uploaded_by, FileResource.classroom_id.in_(member_classroom_ids(uploaded_by))),
+            ).limit(1)
+        )
+        if reachable.first() is None:
+            return None
+        blob = await blob_store.link(db, sha256, size_bytes)
+        if blob is None:
+            return None
+        file_record = _file_record(blob, classroom_id, content_type, uploaded_by, filename)
+        db.add(file_record)
+        await db.commit()
+        await db.refresh(file_record)
+    return await _created(file_record, content_type)
 
 
 @router.get("/")
 async def list_files(classroom_id: str | None = None):
-    async with AsyncSessionLocal() as db:
+    async with ReadSessionLocal() as db:
         if classroom_id:
             result = await db.execute(select(FileResource).where(FileResource.classroom_id == classroom_id))
         else:
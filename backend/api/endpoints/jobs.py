@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+from backend.core.database import get_read_db
+from backend.api.deps import get_current_user
+from backend.db.models import User, Job, Classroom, UserRole
+
+router = APIRouter()
+
+
+def _job_to_dict(job: Job) -> dict:
+    return {
+        "id": job.id,
+        "kind": job.kind,
+        "status": job.status,
+        "payload": job.payload,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "run_after": job.run_after,
+        "last_error": job.last_error,
+        "created_at": job.created_at,
+        "updated_at": job.updated_at,
+    }
+
+
+async def _taught_classroom_ids(db: AsyncSession, current_user: User) -> list:
+    """Classrooms whose jobs the caller may see: only teachers, only their own classes."""
+    if current_user.role != UserRole.TEACHER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only teachers can view jobs"
+        )
+    result = await db.execute(select(Classroom.id).where(Classroom.teacher_id == current_user.id))
+    return result.scalars().all()
+
+
+@router.get("/{job_id}")
+async def get_job_status(
+    job_id: str,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Status of a background job (e.g. the recording merge returned by /live/{id}/end).
+    """
+    classroom_ids = await _taught_classroom_ids(db, current_user)
+    job = await db.get(Job, job_id)
+    # Jobs of other teachers' classes are reported as missing, not as forbidden
+    if not job or (job.payload or {}).get("classroom_id") not in classroom_ids:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return _job_to_dict(job)
+
+
+@router.get("/")
+async def list_jobs(
+    kind: str | None = None,
+    status: str | None = None,
+    limit: int = 50,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Recent jobs of the classrooms the calling teacher owns (matched on payload.classroom_id).
+    """
+    classroom_ids = await _taught_classroom_ids(db, current_user)
+    stmt = (
+        select(Job)
+        .where(Job.payload["classroom_id"].as_string().in_(classroom_ids))
+        .order_by(Job.created_at.desc())
+        .limit(limit)
+    )
+    if kind:
+        stmt = stmt.where(Job.kind == kind)
+    if status:
+        stmt = stmt.where(Job.status == status)
+    result = await db.execute(stmt)
+    return [_job_to_dict(j) for j in result.scalars().all()]
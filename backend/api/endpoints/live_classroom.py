@@ -1,12 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException, status, BackgroundTasks
+from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 
 from backend.core.database import get_db
 from backend.api.deps import get_current_user
-from backend.db.models import User, Classroom, ClassStatus
+from backend.db.models import User, Classroom, ClassStatus, UserRole
 # You will need to ensure this function exists in your worker file
-from backend.core.worker import enqueue_recording_merge 
+from backend.core.worker import ffprobe_stats
+from backend.core.write_behind import write_behind
+from backend.core.recorder import recorder
+from backend.core.segment_log import close_room
+from backend.core.jobs import enqueue_job
+from backend.core.media_relay import media_relay
+from backend.core.chunk_cache import chunk_cache
+from backend.core.broadcast import pen_broadcaster
+from backend.core.room_registry import room_registry
+from backend.core.identity_cache import identity_stats
+from backend.core.admission import handshake_limiter
+from backend.core.hash_pool import password_pool
+from backend.core.blob_store import blob_store
+from backend.core.sendfile import sendfile_stats
+from backend.core.tus import tus_store
+from backend.core.upload_pipeline import upload_io_pool, upload_quota
 
 router = APIRouter()
 
@@ -45,7 +60,6 @@ async def start_class(
 @router.post("/{class_id}/end")
 async def end_class(
     class_id: str,
-    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     current_user: User = Depends(get_current_user)
 ):
@@ -65,12 +79,53 @@ async def end_class(
     classroom.status = ClassStatus.COMPLETED
     await db.commit()
 
-    # 2. Trigger FFmpeg Merge Task
-    # This runs in the background so the teacher gets an immediate "Class Ended" response.
-    background_tasks.add_task(enqueue_recording_merge, class_id)
+    # 2. Make sure buffered chunk rows are in the DB before the merge reads them
+    await write_behind.flush()
+
+    # 3. Seal the incremental recording and close the room's segments.
+    # Only live process state is touched here; the heavy work runs as a job.
+    parts_dir = await recorder.seal(class_id)
+    await close_room(class_id)
+    media_relay.drop_room(class_id)
+    chunk_cache.drop_room(class_id)
+
+    # 4. Queue the FFmpeg Merge Job
+    # Persisted, so it survives restarts and can be picked up by a dedicated worker process.
+    job = await enqueue_job("recording_merge", {
+        "classroom_id": class_id,
+        "parts_dir": str(parts_dir) if parts_dir else None,
+    })
     
     return {
         "success": True, 
         "status": "completed", 
+        "job_id": job.id,
         "message": "Class session ended. Recording is being processed."
-    }
\ No newline at end of file
+    }
+
+@router.get("/stats")
+async def live_stats(current_user: User = Depends(get_current_user)):
+    """
+    Backpressure/throughput metrics of the live pipeline (teachers only).
+    """
+    if current_user.role != UserRole.TEACHER:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Only teachers can view pipeline stats"
+        )
+    return {
+        "write_behind": write_behind.stats(),
+        "ffprobe": await ffprobe_stats(),
+        "relay": media_relay.stats(),
+        "chunk_cache": chunk_cache.stats(),
+        "pen_broadcast": pen_broadcaster.stats(),
+        "rooms": room_registry.stats(),
+        "identity": identity_stats(),
+        "socket_handshakes": handshake_limiter.stats(),
+        "password_pool": password_pool.stats(),
+        "tus_uploads": tus_store.stats(),
+        "blobs": blob_store.stats(),
+        "upload_quota": upload_quota.stats(),
+        "upload_io": upload_io_pool.stats(),
+        "downloads": sendfile_stats(),
+    }
@@ -1,42 +1,107 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import FileResponse
+import hashlib
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
 from sqlalchemy.future import select
 
-from backend.core.database import AsyncSessionLocal
-from backend.db.models import LiveChunk, EventLog
+from backend.core.database import ReadSessionLocal
+from backend.core.segment_log import read_chunk
+from backend.core.chunk_cache import chunk_cache
+from backend.core.event_sync import event_to_dict, fetch_events_after, render_events
+from backend.core.stroke_codec import PLAIN
+from backend.core.http_cache import IMMUTABLE_CACHE_CONTROL, RangeFileResponse, if_none_match, quote_etag, range_response
+from backend.db.models import LiveChunk, EventLog, EventLogArchive
 from pathlib import Path
 
 router = APIRouter()
 
 
+def _chunk_to_dict(chunk: LiveChunk) -> dict:
+    return {c.name: getattr(chunk, c.name) for c in LiveChunk.__table__.columns}
+
+
 @router.get("/chunks/{classroom_id}")
-async def list_chunks(classroom_id: str, limit: int = 100):
+async def list_chunks(classroom_id: str, request: Request, limit: int = 100):
     """
     List recent LiveChunk metadata for a classroom (ordered by seq desc).
+    Answered from the in-memory chunk cache during a live class; supports If-None-Match.
     """
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(select(LiveChunk).where(LiveChunk.classroom_id == classroom_id).order_by(LiveChunk.seq.desc()).limit(limit))
-        return result.scalars().all()
+    cached = chunk_cache.list_recent(classroom_id, limit)
+    if cached is not None:
+        chunks, version = cached
+        etag = quote_etag(f"{classroom_id}-{version}-{limit}", weak=True)
+    else:
+        async with ReadSessionLocal() as db:
+            result = await db.execute(select(LiveChunk).where(LiveChunk.classroom_id == classroom_id).order_by(LiveChunk.seq.desc()).limit(limit))
+            chunks = [_chunk_to_dict(c) for c in result.scalars().all()]
+        digest = hashlib.sha1("|".join(c["id"] for c in chunks).encode()).hexdigest()
+        etag = quote_etag(digest, weak=True)
+
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if if_none_match(request, etag):
+        return Response(status_code=304, headers=headers)
+    return JSONResponse(content=jsonable_encoder(chunks), headers=headers)
 
 
 @router.get("/chunk/file/{chunk_id}")
-async def download_chunk(chunk_id: str):
-    async with AsyncSessionLocal() as db:
-        result = await db.execute(select(LiveChunk).where(LiveChunk.id == chunk_id))
-        chunk = result.scalars().first()
-        if not chunk or not chunk.file_path:
+async def download_chunk(chunk_id: str, request: Request):
+    # Resolve the chunk first: an unknown id is a 404 whatever If-None-Match says
+    data = chunk_cache.get_data(chunk_id)
+    meta = chunk_cache.get_meta(chunk_id)
+    if data is None:
+        # Aged out of the cache: fall back to the segment (or legacy chunk file) on disk
+        if meta is None:
+            async with ReadSessionLocal() as db:
+                result = await db.execute(select(LiveChunk).where(LiveChunk.id == chunk_id))
+                chunk = result.scalars().first()
+                meta = _chunk_to_dict(chunk) if chunk else None
+        if not meta or not meta.get("file_path"):
             raise HTTPException(status_code=404, detail="Chunk not found")
-        p = Path(chunk.file_path)
-        if not p.exists():
-            raise HTTPException(status_code=404, detail="File not found")
-        return FileResponse(path=str(p), filename=p.name, media_type="application/octet-stream")
+
+    # Chunk bytes never change once written: the content hash is a strong validator, and
+    # legacy rows recorded without one fall back to the (equally immutable) chunk id
+    etag = quote_etag((meta or {}).get("sha256") or chunk_id)
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    if if_none_match(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    # Range / multi-range / If-Range are served from the bytes (players seeking a chunk)
+    if data is not None:
+        return range_response(request, data, "application/octet-stream", headers)
+
+    p = Path(meta["file_path"])
+    if not p.exists():
+        raise HTTPException(status_code=404, detail="File not found")
+    if meta.get("segment_offset") is not None and meta.get("segment_length") is not None:
+        data = await read_chunk(str(p), meta["segment_offset"], meta["segment_length"])
+        return range_response(request, data, "application/octet-stream", headers)
+    # Legacy standalone chunk file
+    return RangeFileResponse(path=str(p), filename=p.name, media_type="application/octet-stream", headers=headers)
 
 
 @router.get("/events/{classroom_id}")
-async def list_events(classroom_id: str, limit: int = 200):
+async def list_events(classroom_id: str, after: int | None = None, limit: int = 200, wait: float = 0, codec: str = PLAIN):
     """
-    List recent EventLog entries for a classroom (pen strokes / slides / coords)
+    List recent EventLog entries for a classroom (pen strokes / slides / coords).
+    With ?after=<seq> returns only newer events in seq order plus a next_cursor
+    (keyset pagination); &wait=<seconds> long-polls until something new arrives.
+    Strokes come back as plain numbers unless &codec=qdv1 asks for the packed form.
     """
-    async with AsyncSessionLocal() as db:
+    if after is not None:
+        limit = max(1, min(limit, 1000))
+        return await fetch_events_after(classroom_id, after, limit, wait=min(max(wait, 0), 30), codec=codec)
+
+    async with ReadSessionLocal() as db:
         result = await db.execute(select(EventLog).where(EventLog.classroom_id == classroom_id).order_by(EventLog.created_at.desc()).limit(limit))
-        return result.scalars().all()
\ No newline at end of file
+        events = [event_to_dict(ev) for ev in result.scalars().all()]
+        if len(events) < limit:
+            # Older events were moved to the archive by board compaction
+            result = await db.execute(
+                select(EventLogArchive)
+                .where(EventLogArchive.classroom_id == classroom_id)
+                .order_by(EventLogArchive.created_at.desc())
+                .limit(limit - len(events))
+            )
+            events += [event_to_dict(ev) for ev in result.scalars().all()]
+        return render_events(events, codec)
@@ -0,0 +1,204 @@
+import email.utils
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from starlette.requests import ClientDisconnect
+
+from backend.api.deps import get_current_user
+from backend.api.endpoints.files import link_file, register_file, require_member
+from backend.core.upload_pipeline import QuotaExceeded, StoredUpload, hash_file, upload_quota
+from backend.core.tus import (
+    TUS_EXTENSIONS, TUS_VERSION, OffsetMismatch, TusUpload, UploadTooLarge,
+    format_metadata, parse_metadata, tus_store,
+)
+
+router = APIRouter()
+
+OFFSET_CONTENT_TYPE = "application/offset+octet-stream"
+
+
+def _headers(upload: Optional[TusUpload] = None, **extra) -> dict:
+    headers = {"Tus-Resumable": TUS_VERSION, "Cache-Control": "no-store"}
+    if upload is not None:
+        headers["Upload-Offset"] = str(upload.offset)
+        headers["Upload-Expires"] = email.utils.formatdate(upload.expires_at, usegmt=True)
+        if upload.file_id:
+            headers["Vlink-File-Id"] = upload.file_id
+    headers.update(extra)
+    return headers
+
+
+def _check_version(request: Request):
+    if request.headers.get("Tus-Resumable") != TUS_VERSION:
+        raise HTTPException(status_code=412, detail="Unsupported tus version", headers={"Tus-Version": TUS_VERSION})
+
+
+def _owned_upload(upload_id: str, current_user) -> TusUpload:
+    upload = tus_store.get(upload_id)
+    if not upload:
+        raise HTTPException(status_code=404, detail="Upload not found or expired", headers=_headers())
+    if upload.owner_id != current_user.id:
+        raise HTTPException(status_code=403, detail="Not your upload", headers=_headers())
+    return upload
+
+
+async def _write_body(upload: TusUpload, offset: int, request: Request) -> TusUpload:
+    try:
+        upload = await tus_store.append(upload, offset, request.stream())
+    except OffsetMismatch:
+        raise HTTPException(status_code=409, detail="Upload-Offset does not match", headers=_headers(upload))
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Body exceeds Upload-Length", headers=_headers(upload))
+    except ClientDisconnect:
+        # Bytes received so far are persisted; the client resumes from HEAD's Upload-Offset
+        pass
+    if upload.complete and not upload.file_id:
+        await _finalize(upload)
+    return upload
+
+
+async def _has_body(request: Request) -> bool:
+    async for chunk in request.stream():
+        if chunk:
+            return True
+    return False
+
+
+async def _finalize(upload: TusUpload):
+    """Stores the assembled part file in the blob store (a rename, or dropped as a duplicate)."""
+    metadata = upload.metadata
+    try:
+        part = tus_store.part_path(upload.id)
+        stored = StoredUpload(path=part, size=upload.length, sha256=await hash_file(part))
+        async with upload_quota.reserve(upload.owner_id, metadata["classroom_id"], expected=upload.length, sha256=stored.sha256):
+            record = await register_file(stored, metadata["classroom_id"], _content_type(metadata), upload.owner_id, _filename(upload))
+    except QuotaExceeded as e:
+        # Other uploads filled the quota while this one was in progress
+        tus_store.delete(upload.id)
+        raise HTTPException(status_code=413, detail=str(e), headers=_headers())
+    upload.file_id = record.id
+    tus_store.save(upload)
+
+
+async def _link_existing(upload: TusUpload) -> bool:
+    """
+    Completes an upload without any bytes if Upload-Metadata's sha256 names stored content
+    the owner can already reach (see link_file); otherwise the bytes are uploaded as usual.
+    """
+    metadata = upload.metadata
+    if not metadata.get("sha256"):
+        return False
+    async with upload_quota.reserve(upload.owner_id, metadata["classroom_id"], expected=upload.length, sha256=metadata["sha256"]):
+        record = await link_file(metadata["sha256"], upload.length, metadata["classroom_id"], _content_type(metadata), upload.owner_id, _filename(upload))
+    if record is None:
+        return False
+    tus_store.part_path(upload.id).unlink(missing_ok=True)
+    upload.offset = upload.length
+    upload.file_id = record.id
+    tus_store.save(upload)
+    return True
+
+
+def _filename(upload: TusUpload) -> str:
+    return upload.metadata.get("filename") or upload.metadata.get("name") or upload.id
+
+
+def _content_type(metadata: dict):
+    return metadata.get("filetype") or metadata.get("type")
+
+
+@router.options("")
+async def tus_options():
+    return Response(status_code=204, headers=_headers(**{
+        "Tus-Version": TUS_VERSION,
+        "Tus-Extension": TUS_EXTENSIONS,
+        "Tus-Max-Size": str(tus_store.max_size),
+    }))
+
+
+@router.post("")
+async def create_upload(request: Request, current_user=Depends(get_current_user)):
+    """
+    Creates a resumable upload. Upload-Metadata must carry classroom_id and should carry
+    filename and filetype. A body with Content-Type application/offset+octet-stream is
+    written right away (creation-with-upload). If it also carries the sha256 of content
+    already stored, the upload completes at once (Upload-Offset == Upload-Length).
+    """
+    _check_version(request)
+    try:
+        length = int(request.headers["Upload-Length"])
+        metadata = parse_metadata(request.headers.get("Upload-Metadata"))
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Upload-Length and valid Upload-Metadata are required", headers=_headers())
+    if length < 0 or not metadata.get("classroom_id"):
+        raise HTTPException(status_code=400, detail="Upload-Metadata must include classroom_id", headers=_headers())
+    await require_member(metadata["classroom_id"], current_user, headers=_headers())
+    try:
+        # Reject early if the declared length does not fit the quota; checked again on completion
+        # (content named by a sha256 that the user or class already stores costs it nothing)
+        async with upload_quota.reserve(current_user.id, metadata["classroom_id"]) as reservation:
+            sha256 = metadata.get("sha256")
+            user_has, class_has = await upload_quota.stores(current_user.id, metadata["classroom_id"], sha256) if sha256 else (False, False)
+            reservation.check(length, user=not user_has, klass=not class_has)
+        upload = tus_store.create(length, metadata, current_user.id)
+    except UploadTooLarge:
+        raise HTTPException(status_code=413, detail="Upload-Length exceeds Tus-Max-Size", headers=_headers())
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e), headers=_headers())
+
+    async with tus_store.lock(upload.id):
+        try:
+            linked = await _link_existing(upload)
+        except QuotaExceeded as e:
+            tus_store.delete(upload.id)
+            raise HTTPException(status_code=413, detail=str(e), headers=_headers())
+        if not linked and (request.headers.get("Content-Type") == OFFSET_CONTENT_TYPE or length == 0):
+            upload = await _write_body(upload, 0, request)
+    location = f"{str(request.url).split('?')[0].rstrip('/')}/{upload.id}"
+    return Response(status_code=201, headers=_headers(upload, Location=location))
+
+
+@router.head("/{upload_id}")
+async def upload_status(upload_id: str, request: Request, current_user=Depends(get_current_user)):
+    _check_version(request)
+    upload = _owned_upload(upload_id, current_user)
+    return Response(status_code=200, headers=_headers(
+        upload, **{"Upload-Length": str(upload.length), "Upload-Metadata": format_metadata(upload.metadata)}
+    ))
+
+
+@router.patch("/{upload_id}")
+async def upload_chunk(upload_id: str, request: Request, current_user=Depends(get_current_user)):
+    _check_version(request)
+    if request.headers.get("Content-Type") != OFFSET_CONTENT_TYPE:
+        raise HTTPException(status_code=415, detail=f"Content-Type must be {OFFSET_CONTENT_TYPE}", headers=_headers())
+    try:
+        offset = int(request.headers["Upload-Offset"])
+    except (KeyError, ValueError):
+        raise HTTPException(status_code=400, detail="Upload-Offset is required", headers=_headers())
+
+    _owned_upload(upload_id, current_user)
+    lock = tus_store.lock(upload_id)
+    if lock.locked():
+        # A previous PATCH for this upload is still streaming (e.g. its client just dropped)
+        raise HTTPException(status_code=423, detail="Upload is busy", headers=_headers())
+    async with lock:
+        # Re-read under the lock: the offset may have moved since the request arrived
+        upload = _owned_upload(upload_id, current_user)
+        if upload.complete and upload.file_id:
+            # A retry of the final PATCH whose 204 was lost: the part file is in the blob store
+            # by now, so answer from the .info instead of writing again
+            if offset != upload.offset or await _has_body(request):
+                raise HTTPException(status_code=409, detail="Upload is already complete", headers=_headers(upload))
+            return Response(status_code=204, headers=_headers(upload))
+        upload = await _write_body(upload, offset, request)
+    return Response(status_code=204, headers=_headers(upload))
+
+
+@router.delete("/{upload_id}")
+async def terminate_upload(upload_id: str, request: Request, current_user=Depends(get_current_user)):
+    _check_version(request)
+    upload = _owned_upload(upload_id, current_user)
+    async with tus_store.lock(upload.id):
+        tus_store.delete(upload.id)
+    return Response(status_code=204, headers=_headers())
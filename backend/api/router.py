@@ -10,6 +10,9 @@ from backend.api.endpoints import files
 from backend.api.endpoints import discussions
 from backend.api.endpoints import live_classroom
 from backend.api.endpoints import profile
+from backend.api.endpoints import jobs
+from backend.api.endpoints import streams
+from backend.api.endpoints import tus
 
 api_router = APIRouter()
 
@@ -33,6 +36,9 @@ api_router.include_router(assignments.router, prefix="/assignments", tags=["assi
 # 5. Files
 # URLs: /api/files/upload, /api/files/download/{id}
 api_router.include_router(files.router, prefix="/files", tags=["files"])
+# Resumable uploads (tus 1.0.0)
+# URLs: /api/files/tus (OPTIONS, POST), /api/files/tus/{upload_id} (HEAD, PATCH, DELETE)
+api_router.include_router(tus.router, prefix="/files/tus", tags=["files"])
 
 # 6. Discussions
 # URLs: /api/discussions/create, /api/discussions/class/{id}
@@ -44,4 +50,12 @@ api_router.include_router(live_classroom.router, prefix="/live", tags=["live_cla
 
 # 8. Profile & Preferences
 # URLs: /api/profile, /api/profile/preferences
-api_router.include_router(profile.router, prefix="/profile", tags=["profile"])
\ No newline at end of file
+api_router.include_router(profile.router, prefix="/profile", tags=["profile"])
+
+# 9. Background Jobs
+# URLs: /api/jobs, /api/jobs/{id}
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+
+# 10. Live Streams (chunk/event polling)
+# URLs: /api/streams/chunks/{classroom_id}, /api/streams/chunk/file/{chunk_id}, /api/streams/events/{classroom_id}
+api_router.include_router(streams.router, prefix="/streams", tags=["streams"])
\ No newline at end of file
@@ -1,29 +1,46 @@
 import json
 import base64
+import hashlib
 import asyncio
 import logging
-import aiofiles
 from pathlib import Path
 from datetime import datetime
 
 # SQLAlchemy imports
+from sqlalchemy import or_
 from sqlalchemy.future import select
+from fastapi.encoders import jsonable_encoder
 
 # Backend imports
+from backend.core.config import settings
 from backend.core.socket_manager import sio
 from backend.core.security import decode_access_token
-from backend.core.database import AsyncSessionLocal
-from backend.db.models import LiveChunk, EventLog, User
-from backend.core.worker import enqueue_ffprobe
+from backend.core.database import ReadSessionLocal
+from backend.db.models import LiveChunk, EventLog, User, gen_uuid
+from backend.core.segment_log import live_logs
+from backend.core.write_behind import write_behind
+from backend.core.recorder import recorder
+from backend.core.media_frame import parse_frame
+from backend.core.media_relay import media_relay, RelayedChunk
+from backend.core.chunk_cache import chunk_cache
+from backend.core.identity_cache import CachedUser, identity_cache, token_cache
+from backend.core.admission import handshake_limiter
+from backend.core.event_sync import event_sequencer, fetch_events_after
+from backend.core.broadcast import pen_broadcaster
+from backend.core.room_registry import room_registry
+from backend.core.stroke_codec import PACKED, PLAIN, codec_room, negotiate, pack_payload, to_storable, unpack_payload
 
 # Setup Directories
 UPLOAD_DIR = Path("uploads")
-LIVE_AUDIO_DIR = UPLOAD_DIR / "live_audio"
-LIVE_VIDEO_DIR = UPLOAD_DIR / "live_video"
+LIVE_AUDIO_DIR = live_logs["audio"].base_dir
+LIVE_VIDEO_DIR = live_logs["video"].base_dir
 
 LIVE_AUDIO_DIR.mkdir(parents=True, exist_ok=True)
 LIVE_VIDEO_DIR.mkdir(parents=True, exist_ok=True)
 
+# Legacy chunks' seq/timestamp_ms must fit a signed 64-bit integer
+INT64_LIMIT = 2 ** 63
+
 logger = logging.getLogger(__name__)
 
 def _extract_token_from_environ(environ: dict) -> str | None:
@@ -44,127 +61,202 @@ def _extract_token_from_environ(environ: dict) -> str | None:
 async def _persist_chunk(chunk_type, classroom_id, user_id, seq, timestamp_ms, codec, raw_bytes):
     """
     Unified background task to handle I/O for both Audio and Video.
+    Chunks are appended to the sender's segment log instead of one file per chunk.
     """
     try:
-        # Determine paths based on type
-        if chunk_type == "video":
-            # standard extension for raw x264/h264 streams
-            ext = "h264" 
-            dest_dir = LIVE_VIDEO_DIR
-        else:
-            ext = "opus"
-            dest_dir = LIVE_AUDIO_DIR
-
-        filename = f"{classroom_id}_{seq}_{int(datetime.utcnow().timestamp()*1000)}.{ext}"
-        room_dir = dest_dir / classroom_id
-        room_dir.mkdir(parents=True, exist_ok=True)
-        full_path = room_dir / filename
-
-        # 1. Write File (Async I/O)
-        async with aiofiles.open(full_path, "wb") as f:
-            await f.write(raw_bytes)
-
-        # 2. DB Insert
-        async with AsyncSessionLocal() as db:
-            chunk = LiveChunk(
-                classroom_id=classroom_id, 
-                sender_id=user_id, 
-                seq=seq, 
-                timestamp_ms=timestamp_ms, 
-                codec=codec, 
-                # Ensure your DB model has a 'chunk_type' column or similar
-                chunk_type=chunk_type, 
-                file_path=str(full_path)
-            )
-            db.add(chunk)
-            await db.commit()
-            
-            # Enqueue ffprobe for metadata analysis
-            enqueue_ffprobe(str(full_path), related={"type": f"live_{chunk_type}", "id": chunk.id})
-            
+        # 1. Append to the per-room, per-sender segment log (Async I/O)
+        location = await live_logs[chunk_type].append(classroom_id, user_id, seq, timestamp_ms, raw_bytes)
+        if settings.LIVE_RECORDING_ENABLED:
+            recorder.add_chunk(classroom_id, chunk_type, seq, timestamp_ms, location)
+
+        # 2. DB Insert (batched by the write-behind buffer)
+        # The id is assigned here so the chunk cache can serve it before the row is flushed
+        row = {
+            "id": gen_uuid(),
+            "classroom_id": classroom_id,
+            "sender_id": user_id,
+            "seq": seq,
+            "timestamp_ms": timestamp_ms,
+            "codec": codec,
+            "chunk_type": chunk_type,
+            "file_path": location.segment_path,
+            "file_size": location.length,
+            "segment_offset": location.offset,
+            "segment_length": location.length,
+            "sha256": hashlib.sha256(raw_bytes).hexdigest(),
+            "created_at": datetime.utcnow(),
+        }
+        await write_behind.put(LiveChunk, row)
+
+        # 3. Keep recent chunks in memory for the /streams polling endpoints
+        chunk_cache.add(row, bytes(raw_bytes))
+
     except Exception as e:
         logger.error(f"Failed to persist {chunk_type} chunk {seq} for room {classroom_id}: {e}")
 
+async def _resolve_identity(token: str):
+    """
+    Resolves a handshake token to a CachedUser, preferring (in order) the signed claims
+    themselves, the shared identity cache, and only then SQLite. DB lookups go through
+    the handshake limiter so a reconnect storm is admitted gradually, one query per user.
+    """
+    claims = token_cache.get(token)
+    if claims is None:
+        try:
+            claims = decode_access_token(token)
+        except Exception:
+            return None
+        token_cache.put_claims(token, claims)
+
+    identity = CachedUser.from_claims(claims)
+    if identity is not None:
+        return identity
+
+    # Legacy tokens carry only a subject (user id or username)
+    subject = claims.get("sub")
+    if not subject:
+        return None
+    identity = identity_cache.get(subject) or identity_cache.get(f"username:{subject}")
+    if identity is not None:
+        return identity
+
+    async def load():
+        async with ReadSessionLocal() as db:
+            res = await db.execute(select(User).where(or_(User.id == subject, User.username == subject)))
+            user = res.scalars().first()
+        if not user:
+            return None
+        cached = CachedUser.from_model(user)
+        identity_cache.put(user.id, cached)
+        identity_cache.put(f"username:{user.username}", cached)
+        return cached
+
+    return await handshake_limiter.single_flight(subject, load)
+
 @sio.event
 async def connect(sid, environ):
     token = _extract_token_from_environ(environ)
     if not token:
         return False
-    try:
-        payload = decode_access_token(token)
-        username = payload.get("sub")
-    except Exception:
+    identity = await _resolve_identity(token)
+    if identity is None:
         return False
-        
-    async with AsyncSessionLocal() as db:
-        res = await db.execute(select(User).where(User.username == username))
-        user = res.scalars().first()
-        if not user:
-            return False
-        await sio.save_session(sid, {"username": username, "user_id": user.id})
+    await sio.save_session(sid, {"username": identity.username, "user_id": identity.id, "role": identity.role})
     
-    print(f"Socket connected: {sid} user: {username}")
+    print(f"Socket connected: {sid} user: {identity.username}")
     return True
 
 @sio.event
 async def disconnect(sid):
+    room_registry.leave_all(sid)
     print(f"Socket disconnected: {sid}")
 
 @sio.on("join_class")
 async def on_join_class(sid, data):
     room = data.get("classroom_id")
     if room:
-        await sio.save_session(sid, {"room": room})
+        async with sio.session(sid) as session:
+            previous = session.get("room")
+            session["room"] = room
+            codec = session.get("stroke_codec", PLAIN)
+            user_id = session.get("user_id")
+        if previous and previous != room:
+            await sio.leave_room(sid, codec_room(previous, codec))
+            room_registry.leave(previous, sid)
         await sio.enter_room(sid, room)
+        # Pen broadcasts go out once per codec sub-room
+        await sio.enter_room(sid, codec_room(room, codec))
+        room_registry.join(room, sid, {"user_id": user_id})
         await sio.emit("joined_class", {"room": room}, room=sid)
 
-async def handle_media_chunk(sid, payload, media_type):
+        # Late joiners catch up from the relay's ring buffer instead of fetching chunks
+        recent = media_relay.recent(room)
+        if recent:
+            await sio.emit("media_catchup", {
+                "classroom_id": room,
+                "chunks": [dict(c.to_event(), media_type=c.media_type) for c in recent],
+            }, room=sid)
+
+def _decode_legacy_chunk(payload: dict):
     """
-    Generic handler for Audio/Video to reduce code duplication.
+    Legacy JSON chunk: {classroom_id, seq, timestamp_ms, codec, binary | base64}.
+    Returns (classroom_id, seq, timestamp_ms, codec, data) or None.
     """
-    session = await sio.get_session(sid)
-    room = session.get("room")
-    user_id = session.get("user_id")
-    classroom_id = payload.get("classroom_id") or room
-    
-    if not classroom_id:
-        return
-
     seq = payload.get("seq")
-    timestamp_ms = payload.get("timestamp_ms")
     data = payload.get("binary") or payload.get("base64")
-    
-    # Defaults
-    if media_type == "video":
-        codec = payload.get("codec", "h264")
-    else:
-        codec = payload.get("codec", "opus")
-
     if seq is None or data is None:
-        return
+        return None
+
+    # seq and timestamp_ms go into 64-bit index records and BigInteger columns
+    try:
+        seq = int(seq)
+        timestamp_ms = payload.get("timestamp_ms")
+        timestamp_ms = int(timestamp_ms) if timestamp_ms is not None else None
+    except (TypeError, ValueError, OverflowError):
+        return None
+    if not all(-INT64_LIMIT <= v < INT64_LIMIT for v in (seq, timestamp_ms or 0)):
+        return None
 
     # Decode Data
-    raw_bytes = None
     if isinstance(data, (bytes, bytearray)):
-        raw_bytes = bytes(data)
+        raw_bytes = memoryview(data)
     elif isinstance(data, str):
         try:
             raw_bytes = base64.b64decode(data)
         except Exception:
+            return None
+    else:
+        return None
+    return payload.get("classroom_id"), seq, timestamp_ms, payload.get("codec"), raw_bytes
+
+
+async def handle_media_chunk(sid, payload, media_type):
+    """
+    Generic handler for Audio/Video to reduce code duplication.
+    Accepts a binary media frame (see backend/core/media_frame.py) or the legacy JSON/base64 form.
+    """
+    session = await sio.get_session(sid)
+    room = session.get("room")
+    user_id = session.get("user_id")
+
+    if isinstance(payload, (bytes, bytearray, memoryview)):
+        try:
+            frame = parse_frame(payload)
+        except ValueError:
             return
+        classroom_id, seq, timestamp_ms, codec, raw_bytes = frame.classroom_id, frame.seq, frame.timestamp_ms, frame.codec, frame.payload
+    elif isinstance(payload, dict):
+        decoded = _decode_legacy_chunk(payload)
+        if decoded is None:
+            return
+        classroom_id, seq, timestamp_ms, codec, raw_bytes = decoded
     else:
         return
 
+    classroom_id = classroom_id or room
+    if not classroom_id:
+        return
+
+    # Defaults
+    if not codec:
+        codec = "h264" if media_type == "video" else "opus"
+
     # 1. BROADCAST IMMEDIATELY (Real-time Priority)
     # Clients rely on timestamp_ms to sync audio/video
     event_name = f"{media_type}_chunk_broadcast"
-    await sio.emit(event_name, {
-        "classroom_id": classroom_id, 
-        "seq": seq, 
-        "sender_id": user_id, 
-        "codec": codec, 
-        "timestamp_ms": timestamp_ms
-    }, room=classroom_id)
+    if media_relay.relays(media_type):
+        # Relay the bytes themselves (binary attachment) so listeners never fetch chunks from disk
+        relayed = RelayedChunk(classroom_id, media_type, seq, timestamp_ms, user_id, codec, bytes(raw_bytes))
+        media_relay.push(relayed)
+        await sio.emit(event_name, relayed.to_event(), room=classroom_id, skip_sid=sid)
+    else:
+        await sio.emit(event_name, {
+            "classroom_id": classroom_id, 
+            "seq": seq, 
+            "sender_id": user_id, 
+            "codec": codec, 
+            "timestamp_ms": timestamp_ms
+        }, room=classroom_id)
 
     # 2. PERSIST IN BACKGROUND (Data Integrity)
     # This ensures the loop is not blocked by file I/O
@@ -181,6 +273,22 @@ async def on_audio_chunk(sid, payload):
 async def on_video_chunk(sid, payload):
     await handle_media_chunk(sid, payload, "video")
 
+@sio.on("stroke_codec")
+async def on_stroke_codec(sid, data):
+    """
+    Per-client stroke codec negotiation: client sends {codecs: ["qdv1", "json"]} and
+    receives "stroke_codec_selected" with the codec used for its pen broadcasts.
+    """
+    codec = negotiate((data or {}).get("codecs"))
+    async with sio.session(sid) as session:
+        previous = session.get("stroke_codec", PLAIN)
+        session["stroke_codec"] = codec
+        room = session.get("room")
+    if room and previous != codec:
+        await sio.leave_room(sid, codec_room(room, previous))
+        await sio.enter_room(sid, codec_room(room, codec))
+    await sio.emit("stroke_codec_selected", {"codec": codec, "scale": settings.STROKE_QUANT_SCALE}, room=sid)
+
 @sio.on("pen_event")
 async def on_pen_event(sid, payload):
     session = await sio.get_session(sid)
@@ -192,19 +300,55 @@ async def on_pen_event(sid, payload):
     if not classroom_id or event_payload is None:
         return
 
-    # Broadcast FIRST
-    await sio.emit("pen_event_broadcast", {
+    # Quantize + delta-pack stroke points once; plain clients get the decoded (quantized) numbers
+    try:
+        packed = pack_payload(event_payload)
+        plain = unpack_payload(packed)
+    except (ValueError, TypeError, OverflowError):
+        # Malformed or non-finite points (e.g. Infinity, or 1e308 times the quantization scale)
+        return
+
+    # Sequence first (no await between seq assignment and queueing keeps rows in seq order)
+    await write_behind.wait_for_room()
+    seq = await event_sequencer.next(classroom_id)
+    # id and created_at are assigned here so event sync can serve the row before it is flushed
+    write_behind.add(EventLog, {
+        "id": gen_uuid(),
+        "classroom_id": classroom_id,
+        "sender_id": user_id,
+        "seq": seq,
+        "event_type": event_type,
+        "payload": to_storable(packed),
+        "created_at": datetime.utcnow(),
+    })
+
+    # Broadcast (seq lets clients resume with sync_events after a drop)
+    event = {
         "sender_id": user_id,
-        "classroom_id": classroom_id, 
-        "event_type": event_type, 
-        "payload": event_payload
-    }, room=classroom_id)
-
-    # Persist Background
-    async def _persist_pen_event():
-        async with AsyncSessionLocal() as db:
-            ev = EventLog(classroom_id=classroom_id, sender_id=user_id, event_type=event_type, payload=event_payload)
-            db.add(ev)
-            await db.commit()
-            
-    sio.start_background_task(_persist_pen_event)
\ No newline at end of file
+        "classroom_id": classroom_id,
+        "seq": seq,
+        "event_type": event_type,
+    }
+    # Coalesced per room into "pen_event_batch"; control events (clear, slide, ...) go out at once
+    immediate = event_type in settings.PEN_IMMEDIATE_EVENT_TYPES
+    for codec, rendered in ((PACKED, packed), (PLAIN, plain)):
+        await pen_broadcaster.send(codec_room(classroom_id, codec), "pen_event_broadcast", dict(event, payload=rendered),
+                                   batch_event="pen_event_batch", immediate=immediate)
+
+@sio.on("sync_events")
+async def on_sync_events(sid, data):
+    """
+    Catch-up after a reconnect: client sends {classroom_id, after} with the last seq it saw
+    and receives only the missed delta (page by page, follow has_more/next_cursor).
+    """
+    session = await sio.get_session(sid)
+    classroom_id = (data or {}).get("classroom_id") or session.get("room")
+    if not classroom_id:
+        return
+    try:
+        after = int((data or {}).get("after") or 0)
+        limit = min(int((data or {}).get("limit") or 500), 1000)
+    except (TypeError, ValueError):
+        return
+    delta = await fetch_events_after(classroom_id, after, limit, codec=session.get("stroke_codec", PLAIN))
+    await sio.emit("events_catchup", jsonable_encoder(delta), room=sid)
@@ -0,0 +1,140 @@
+"""
+Download benchmark: throughput and CPU per GB when a whole class fetches a recording at once.
+
+The /uploads mount is driven in-process by a minimal ASGI server that writes responses to
+real sockets (a socketpair per client, drained by a thread). Modes:
+
+- starlette: plain StaticFiles, 64 KiB blocks as http.response.body (the old path)
+- chunked:   DownloadStaticFiles on a server without extensions (e.g. uvicorn),
+             SENDFILE_CHUNK_BYTES blocks
+- zerocopy:  server offers http.response.zerocopysend; bodies go out via os.sendfile
+- pathsend:  server offers http.response.pathsend; the server sends the file by path
+
+    python backend/bench_downloads.py [clients] [file_mb]
+"""
+
+import asyncio
+import os
+import resource
+import socket
+import sys
+import tempfile
+import threading
+import time
+
+# Add the parent directory to sys.path so we can import 'backend'
+# even if running this script directly from inside the backend/ folder.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from fastapi import FastAPI
+from fastapi.staticfiles import StaticFiles
+
+from backend.core.http_cache import DownloadStaticFiles
+from backend.core.sendfile import PATHSEND, ZEROCOPYSEND, sendfile_stats
+
+MODES = {
+    "starlette": (StaticFiles, {}),
+    "chunked": (DownloadStaticFiles, {}),
+    "zerocopy": (DownloadStaticFiles, {ZEROCOPYSEND: {}}),
+    "pathsend": (DownloadStaticFiles, {PATHSEND: {}}),
+}
+
+
+def _drain(sock: socket.socket, counts: list, index: int):
+    buf = bytearray(1024 * 1024)
+    view = memoryview(buf)
+    total = 0
+    while True:
+        n = sock.recv_into(view)
+        if not n:
+            break
+        total += n
+    counts[index] = total
+    sock.close()
+
+
+async def _serve(app, path: str, extensions: dict, sock: socket.socket):
+    """Runs one GET through the ASGI app, writing the body to sock like a server would."""
+    loop = asyncio.get_running_loop()
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": path, "raw_path": path.encode(), "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 0), "server": ("bench", 80),
+        "extensions": extensions,
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        kind = message["type"]
+        if kind == "http.response.start":
+            assert message["status"] == 200, message["status"]
+        elif kind == "http.response.body":
+            if message.get("body"):
+                await loop.sock_sendall(sock, message["body"])
+        elif kind == ZEROCOPYSEND:
+            await loop.sock_sendfile(sock, message["file"], message.get("offset", 0), message.get("count"))
+        elif kind == PATHSEND:
+            with open(message["path"], "rb") as f:
+                await loop.sock_sendfile(sock, f)
+
+    await app(scope, receive, send)
+    sock.close()
+
+
+async def run(mode: str, directory: str, name: str, clients: int, size: int) -> dict:
+    static_class, extensions = MODES[mode]
+    app = FastAPI()
+    app.mount("/uploads", static_class(directory=directory), name="uploads")
+
+    counts = [0] * clients
+    drains = []
+    servers = []
+    for i in range(clients):
+        server_side, client_side = socket.socketpair()
+        server_side.setblocking(False)
+        drain = threading.Thread(target=_drain, args=(client_side, counts, i), daemon=True)
+        drain.start()
+        drains.append(drain)
+        servers.append(server_side)
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    started = time.perf_counter()
+    await asyncio.gather(*(_serve(app, f"/uploads/{name}", extensions, s) for s in servers))
+    for drain in drains:
+        await asyncio.to_thread(drain.join)
+    elapsed = time.perf_counter() - started
+    after = resource.getrusage(resource.RUSAGE_SELF)
+
+    assert all(c == size for c in counts), "short download"
+    served_gb = clients * size / 1024 ** 3
+    cpu = (after.ru_utime - usage.ru_utime) + (after.ru_stime - usage.ru_stime)
+    return {
+        "mode": mode,
+        "total_s": round(elapsed, 2),
+        "throughput_gb_s": round(served_gb / elapsed, 2),
+        "cpu_s_per_gb": round(cpu / served_gb, 2),
+    }
+
+
+async def main():
+    clients = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    file_mb = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+    size = file_mb * 1024 * 1024
+
+    with tempfile.TemporaryDirectory() as directory:
+        name = "recording.mp4"
+        with open(os.path.join(directory, name), "wb") as f:
+            for _ in range(file_mb):
+                f.write(os.urandom(1024 * 1024))
+
+        print(f"📼 {clients} clients downloading a {file_mb} MB recording at once "
+              f"({clients * file_mb / 1024:.1f} GB); CPU includes the drain threads, same for every mode")
+        for mode in MODES:
+            print("   ", await run(mode, directory, name, clients, size))
+        print("    downloads:", sendfile_stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
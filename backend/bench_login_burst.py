@@ -0,0 +1,82 @@
+"""
+Login-burst benchmark: event-loop (socket) latency while a class logs in at once.
+
+A probe coroutine stands in for the live sockets: it wakes every PROBE_MS and records how
+late it was scheduled. Meanwhile N logins verify a bcrypt password, either inline on the
+event loop (the old path) or on the bounded bcrypt pool (security.verify_password_async).
+
+    python backend/bench_login_burst.py [logins] [bcrypt_rounds]
+"""
+
+import asyncio
+import statistics
+import sys
+import os
+import time
+
+# Add the parent directory to sys.path so we can import 'backend'
+# even if running this script directly from inside the backend/ folder.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from passlib.hash import bcrypt
+
+from backend.core import security
+from backend.core.hash_pool import password_pool
+
+PROBE_MS = 5
+
+
+async def probe(lags: list, stop: asyncio.Event):
+    interval = PROBE_MS / 1000
+    while not stop.is_set():
+        expected = time.perf_counter() + interval
+        await asyncio.sleep(interval)
+        lags.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+
+async def burst(logins: int, hashed: str, offloaded: bool) -> dict:
+    lags: list = []
+    stop = asyncio.Event()
+    prober = asyncio.create_task(probe(lags, stop))
+    await asyncio.sleep(0.05)
+
+    async def login():
+        # Login handlers await a DB lookup first, so the verifies start interleaved
+        await asyncio.sleep(0)
+        if offloaded:
+            return await security.verify_password_async("123", hashed)
+        return security.verify_password("123", hashed)
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*(login() for _ in range(logins)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await prober
+
+    assert all(results)
+    lags.sort()
+    return {
+        "logins": logins,
+        "total_s": round(elapsed, 2),
+        "probe_p50_ms": round(statistics.median(lags), 1),
+        "probe_p99_ms": round(lags[int(len(lags) * 0.99) - 1 if len(lags) > 1 else 0], 1),
+        "probe_max_ms": round(lags[-1], 1),
+        "probe_samples": len(lags),
+    }
+
+
+async def main():
+    logins = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 12
+    hashed = bcrypt.using(rounds=rounds).hash("123")
+
+    print(f"🔐 {logins} logins, bcrypt rounds={rounds}, probe every {PROBE_MS} ms")
+    print("Inline verify (blocks the event loop):")
+    print("   ", await burst(logins, hashed, offloaded=False))
+    print(f"Bounded pool ({password_pool.max_workers} workers):")
+    print("   ", await burst(logins, hashed, offloaded=True))
+    print("    pool:", password_pool.stats())
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
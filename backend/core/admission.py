@@ -0,0 +1,91 @@
+"""
+Admission control for bursts of expensive work (e.g. a classroom reconnecting at once).
+
+AdmissionLimiter lets at most `concurrency` callers in at a time. When it is already full,
+a newcomer first sleeps a random 0..jitter_ms so a burst spreads out instead of queueing in
+lockstep, then waits for a slot. single_flight() collapses concurrent calls with the same
+key (several tabs of one user) into one execution.
+
+Usage:
+    async with handshake_limiter:
+        ...
+    user = await handshake_limiter.single_flight(key, lambda: load_user(key))
+"""
+
+import asyncio
+import random
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from backend.core.config import settings
+
+
+class AdmissionLimiter:
+    def __init__(self, concurrency: Optional[int] = None, jitter_ms: Optional[int] = None):
+        self.concurrency = concurrency or settings.SOCKET_HANDSHAKE_CONCURRENCY
+        self.jitter = (settings.SOCKET_HANDSHAKE_JITTER_MS if jitter_ms is None else jitter_ms) / 1000
+        self._semaphore = asyncio.Semaphore(self.concurrency)
+        self._inflight: Dict[Any, asyncio.Future] = {}
+        self._active = 0
+        self._waiting = 0
+
+        # Metrics
+        self.admitted = 0
+        self.delayed = 0
+        self.coalesced = 0
+        self.high_watermark = 0
+
+    async def __aenter__(self):
+        if self._semaphore.locked() and self.jitter > 0:
+            self.delayed += 1
+            await asyncio.sleep(random.uniform(0, self.jitter))
+        self._waiting += 1
+        self.high_watermark = max(self.high_watermark, self._waiting + self._active)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._waiting -= 1
+        self._active += 1
+        self.admitted += 1
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._active -= 1
+        self._semaphore.release()
+
+    async def single_flight(self, key: Any, work: Callable[[], Awaitable[Any]]):
+        """Runs work() under the limiter, sharing the result with concurrent callers of `key`."""
+        pending = self._inflight.get(key)
+        if pending is not None:
+            self.coalesced += 1
+            return await asyncio.shield(pending)
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            async with self:
+                result = await work()
+            future.set_result(result)
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Retrieve it so an unawaited failure is not reported as "never retrieved"
+            future.exception()
+            raise
+        finally:
+            self._inflight.pop(key, None)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "active": self._active,
+            "waiting": self._waiting,
+            "admitted": self.admitted,
+            "delayed": self.delayed,
+            "coalesced": self.coalesced,
+            "high_watermark": self.high_watermark,
+        }
+
+
+handshake_limiter = AdmissionLimiter()
@@ -0,0 +1,182 @@
+"""
+Content-addressed blob store with reference counting.
+
+Every uploaded body is stored once, at BLOB_DIR/<aa>/<bb>/<sha256>, and described by a
+Blob row. FileResource rows reference a blob by its hash (blob_sha256) and keep their own
+display name, class and uploader, so re-uploading the same PDF to five class sections uses
+the disk space of one copy.
+
+- put(): references the blob of a freshly written temp file, moving the file into place
+  if the content is new and discarding it otherwise.
+- add_ref()/release_ref(): refcount bookkeeping. All of these run in the caller's
+  transaction, so a FileResource row and its reference are committed together.
+- link(): references an existing blob by hash + size without any upload at all
+  (POST /api/files/dedupe, tus Upload-Metadata "sha256"), so duplicates finish instantly.
+- collect_garbage(): deletes blobs unreferenced for BLOB_GC_GRACE_S (re-checking the
+  actual FileResource references first), and orphan files: temp files of crashed uploads
+  and blob files whose row was never committed.
+
+Usage:
+    async with AsyncSessionLocal() as db:
+        blob = await blob_store.put(db, stored)
+        db.add(FileResource(file_path=blob.path, blob_sha256=blob.sha256, ...))
+        await db.commit()
+"""
+
+import asyncio
+import logging
+import os
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.future import select
+
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal
+from backend.core.upload_pipeline import StoredUpload
+from backend.db.models import Blob, FileResource
+
+logger = logging.getLogger(__name__)
+
+_gc_task: Optional[asyncio.Task] = None
+
+
+class BlobStore:
+    def __init__(self, root: Optional[Path] = None):
+        self.root = Path(root or settings.BLOB_DIR)
+        self.tmp_dir = self.root / "tmp"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+
+        # Metrics
+        self.stored = 0
+        self.deduplicated = 0
+        self.bytes_saved = 0
+        self.collected = 0
+        self.bytes_collected = 0
+
+    def path_for(self, sha256: str) -> Path:
+        return self.root / sha256[:2] / sha256[2:4] / sha256
+
+    def temp_path(self) -> Path:
+        """Where an upload is streamed before its hash, and so its final path, is known."""
+        return self.tmp_dir / uuid.uuid4().hex
+
+    async def put(self, db, stored: StoredUpload) -> Blob:
+        """
+        References the blob for stored.sha256. If the content is new, stored.path is moved
+        into place; otherwise the freshly written copy is discarded.
+        """
+        if await self.add_ref(db, stored.sha256):
+            Path(stored.path).unlink(missing_ok=True)
+            self.deduplicated += 1
+            self.bytes_saved += stored.size
+            return await db.get(Blob, stored.sha256)
+
+        path = self.path_for(stored.sha256)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(stored.path, path)  # same filesystem: a rename, not a copy
+        blob = Blob(sha256=stored.sha256, size_bytes=stored.size, path=str(path), refcount=1)
+        try:
+            async with db.begin_nested():
+                db.add(blob)
+        except IntegrityError:
+            # Another process stored the same content meanwhile; the file at `path` is identical
+            await self.add_ref(db, stored.sha256)
+            return await db.get(Blob, stored.sha256)
+        self.stored += 1
+        return blob
+
+    async def add_ref(self, db, sha256: str) -> bool:
+        result = await db.execute(
+            update(Blob).where(Blob.sha256 == sha256).values(refcount=Blob.refcount + 1, unreferenced_at=None)
+        )
+        return result.rowcount == 1
+
+    async def release_ref(self, db, sha256: str):
+        await db.execute(update(Blob).where(Blob.sha256 == sha256).values(refcount=Blob.refcount - 1))
+        await db.execute(
+            update(Blob).where(Blob.sha256 == sha256, Blob.refcount <= 0).values(unreferenced_at=datetime.utcnow())
+        )
+
+    async def link(self, db, sha256: str, size_bytes: int) -> Optional[Blob]:
+        """References an existing blob by content hash; None if unknown (the client uploads it)."""
+        blob = await db.get(Blob, sha256.lower())
+        if blob is None or blob.size_bytes != size_bytes or not await self.add_ref(db, blob.sha256):
+            return None
+        self.deduplicated += 1
+        self.bytes_saved += size_bytes
+        return blob
+
+    async def collect_garbage(self, grace_s: Optional[float] = None) -> int:
+        grace_s = settings.BLOB_GC_GRACE_S if grace_s is None else grace_s
+        cutoff = datetime.utcnow() - timedelta(seconds=grace_s)
+        removed = 0
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(
+                select(Blob).where(Blob.refcount <= 0, Blob.unreferenced_at.isnot(None), Blob.unreferenced_at < cutoff)
+            )
+            for blob in result.scalars().all():
+                # Trust the rows, not the counter: repair drift instead of deleting a live blob
+                refs = await db.execute(select(func.count()).select_from(FileResource).where(FileResource.blob_sha256 == blob.sha256))
+                actual = refs.scalar()
+                if actual:
+                    blob.refcount = actual
+                    blob.unreferenced_at = None
+                    continue
+                deleted = await db.execute(delete(Blob).where(Blob.sha256 == blob.sha256, Blob.refcount <= 0))
+                if deleted.rowcount == 1:
+                    Path(blob.path).unlink(missing_ok=True)
+                    removed += 1
+                    self.bytes_collected += blob.size_bytes
+            await db.commit()
+
+            known = set((await db.execute(select(Blob.sha256))).scalars().all())
+
+        # Orphans: temp files of crashed uploads, and blob files whose row was never committed
+        now = time.time()
+        for path in list(self.tmp_dir.iterdir()) + list(self.root.glob("??/??/*")):
+            try:
+                if path.name not in known and now - path.stat().st_mtime > max(grace_s, 3600):
+                    path.unlink()
+                    removed += 1
+            except OSError:
+                pass
+        self.collected += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "stored": self.stored,
+            "deduplicated": self.deduplicated,
+            "bytes_saved": self.bytes_saved,
+            "collected": self.collected,
+            "bytes_collected": self.bytes_collected,
+        }
+
+
+blob_store = BlobStore()
+
+
+async def _collector():
+    while True:
+        await asyncio.sleep(settings.BLOB_GC_INTERVAL_S)
+        try:
+            removed = await blob_store.collect_garbage()
+            if removed:
+                logger.info(f"[Blobs] Collected {removed} unreferenced blobs")
+        except Exception as e:
+            logger.error(f"[Blobs] Garbage collection failed: {e}")
+
+
+def start_blob_gc(loop: Optional[asyncio.AbstractEventLoop] = None):
+    global _gc_task
+    if _gc_task and not _gc_task.done():
+        return _gc_task
+    loop = loop or asyncio.get_event_loop()
+    _gc_task = loop.create_task(_collector())
+    return _gc_task
@@ -0,0 +1,151 @@
+"""
+Whiteboard snapshot compaction.
+
+Every BOARD_COMPACT_INTERVAL_S the compactor looks for classrooms with at least
+BOARD_COMPACT_MIN_EVENTS sequenced EventLog rows beyond their latest snapshot. It folds
+them (all but the newest BOARD_COMPACT_KEEP_TAIL) into a new BoardSnapshot and moves
+the folded rows from event_logs to event_logs_archive, in the same transaction: the hot
+table stays small, and the full history is kept.
+
+The snapshot is the ordered list of events since the last board clear, stored as
+zlib-compressed JSON. A "clear" event (event_type "clear", or payload {"action": "clear"})
+discards everything before it, so the snapshot does not grow past the visible board.
+
+Usage:
+- On app startup call start_board_compactor().
+- await compact_room(classroom_id) folds one room on demand.
+- snapshot = await load_snapshot(classroom_id) -> {"upto_seq", "events"} or None
+"""
+
+import asyncio
+import json
+import logging
+import zlib
+from typing import List, Optional
+
+from sqlalchemy import delete, func, insert
+from sqlalchemy.future import select
+
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal, ReadSessionLocal
+from backend.db.models import BoardSnapshot, EventLog, EventLogArchive
+
+logger = logging.getLogger(__name__)
+
+_compactor_task: Optional[asyncio.Task] = None
+
+
+def _is_clear(event: dict) -> bool:
+    payload = event.get("payload")
+    return event.get("event_type") == "clear" or (isinstance(payload, dict) and payload.get("action") == "clear")
+
+
+def fold_events(events: List[dict]) -> List[dict]:
+    """Drops everything before the last board clear."""
+    for i in range(len(events) - 1, -1, -1):
+        if _is_clear(events[i]):
+            return events[i:]
+    return events
+
+
+def encode_snapshot(events: List[dict]) -> bytes:
+    return zlib.compress(json.dumps(events, separators=(",", ":"), default=str).encode("utf-8"), 6)
+
+
+def decode_snapshot(data: bytes) -> List[dict]:
+    return json.loads(zlib.decompress(data).decode("utf-8"))
+
+
+def _event_record(ev: EventLog) -> dict:
+    return {
+        "seq": ev.seq,
+        "sender_id": ev.sender_id,
+        "event_type": ev.event_type,
+        "payload": ev.payload,
+        "created_at": ev.created_at.isoformat() if ev.created_at else None,
+    }
+
+
+async def _latest_snapshot(db, classroom_id: str) -> Optional[BoardSnapshot]:
+    result = await db.execute(
+        select(BoardSnapshot).where(BoardSnapshot.classroom_id == classroom_id).order_by(BoardSnapshot.upto_seq.desc()).limit(1)
+    )
+    return result.scalars().first()
+
+
+async def load_snapshot(classroom_id: str) -> Optional[dict]:
+    async with ReadSessionLocal() as db:
+        snapshot = await _latest_snapshot(db, classroom_id)
+    if snapshot is None:
+        return None
+    events = await asyncio.to_thread(decode_snapshot, snapshot.data)
+    return {"upto_seq": snapshot.upto_seq, "event_count": snapshot.event_count, "events": events}
+
+
+async def compact_room(classroom_id: str, keep_tail: Optional[int] = None, min_events: int = 1) -> Optional[int]:
+    """Folds the room's older events into a new snapshot. Returns the new upto_seq, if any."""
+    keep_tail = settings.BOARD_COMPACT_KEEP_TAIL if keep_tail is None else keep_tail
+    async with AsyncSessionLocal() as db:
+        previous = await _latest_snapshot(db, classroom_id)
+        base_seq = previous.upto_seq if previous else 0
+
+        result = await db.execute(select(func.max(EventLog.seq)).where(EventLog.classroom_id == classroom_id))
+        max_seq = result.scalar() or 0
+        upto = max_seq - keep_tail
+        if upto - base_seq < min_events:
+            return None
+
+        result = await db.execute(
+            select(EventLog)
+            .where(EventLog.classroom_id == classroom_id, EventLog.seq > base_seq, EventLog.seq <= upto)
+            .order_by(EventLog.seq)
+        )
+        new_events = [_event_record(ev) for ev in result.scalars().all()]
+        events = await asyncio.to_thread(decode_snapshot, previous.data) if previous else []
+        events = fold_events(events + new_events)
+        data = await asyncio.to_thread(encode_snapshot, events)
+
+        db.add(BoardSnapshot(classroom_id=classroom_id, upto_seq=upto, event_count=len(events), data=data))
+        # The snapshot now holds these events: archive the raw rows, then take them off the hot
+        # table. Superseded snapshots go only after that, all in this one transaction.
+        folded = (EventLog.classroom_id == classroom_id, EventLog.seq <= upto)
+        columns = ["id", "classroom_id", "sender_id", "seq", "event_type", "payload", "created_at"]
+        await db.execute(
+            insert(EventLogArchive).from_select(columns, select(*(EventLog.__table__.c[name] for name in columns)).where(*folded))
+        )
+        await db.execute(delete(EventLog).where(*folded))
+        await db.execute(delete(BoardSnapshot).where(BoardSnapshot.classroom_id == classroom_id, BoardSnapshot.upto_seq < upto))
+        await db.commit()
+
+    logger.info(f"[Board] Compacted {classroom_id} up to seq {upto} ({len(events)} events, {len(data)} bytes)")
+    return upto
+
+
+async def _rooms_to_compact() -> List[str]:
+    async with ReadSessionLocal() as db:
+        result = await db.execute(
+            select(EventLog.classroom_id)
+            .where(EventLog.seq.isnot(None))
+            .group_by(EventLog.classroom_id)
+            .having(func.count() >= settings.BOARD_COMPACT_MIN_EVENTS + settings.BOARD_COMPACT_KEEP_TAIL)
+        )
+        return list(result.scalars().all())
+
+
+async def _compactor():
+    while True:
+        await asyncio.sleep(settings.BOARD_COMPACT_INTERVAL_S)
+        try:
+            for classroom_id in await _rooms_to_compact():
+                await compact_room(classroom_id, min_events=settings.BOARD_COMPACT_MIN_EVENTS)
+        except Exception as e:
+            logger.error(f"[Board] Compaction failed: {e}")
+
+
+def start_board_compactor(loop: Optional[asyncio.AbstractEventLoop] = None):
+    global _compactor_task
+    if _compactor_task and not _compactor_task.done():
+        return _compactor_task
+    loop = loop or asyncio.get_event_loop()
+    _compactor_task = loop.create_task(_compactor())
+    return _compactor_task
@@ -0,0 +1,143 @@
+"""
+Per-room coalescing broadcast scheduler for high-rate whiteboard events.
+
+Instead of one sio.emit per pen point, events sent to the same room within
+PEN_BATCH_WINDOW_MS are coalesced into a single emit of `batch_event` with
+{"events": [...]}. A batch is flushed early once it holds PEN_BATCH_MAX_EVENTS events.
+A lone event still goes out as the regular single event, so quiet rooms see no change.
+
+Control events (send(..., immediate=True)) first flush whatever is pending for the room,
+then go out at once, so ordering is preserved and e.g. "clear" is never delayed.
+PEN_BATCH_WINDOW_MS = 0 disables coalescing.
+
+Usage:
+- await pen_broadcaster.send(room, "pen_event_broadcast", event, batch_event="pen_event_batch")
+- On shutdown await pen_broadcaster.flush_all().
+"""
+
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set, Tuple
+
+from backend.core.config import settings
+from backend.core.socket_manager import sio
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Batch:
+    batch_event: str
+    items: List[dict] = field(default_factory=list)
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+@dataclass
+class _RoomLock:
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    users: int = 0  # holders and waiters; the entry is dropped when it reaches 0
+
+
+class BroadcastScheduler:
+    def __init__(self, window_ms: Optional[int] = None, max_batch: Optional[int] = None):
+        self.window = (settings.PEN_BATCH_WINDOW_MS if window_ms is None else window_ms) / 1000
+        self.max_batch = max_batch or settings.PEN_BATCH_MAX_EVENTS
+        self._pending: Dict[Tuple[str, str], _Batch] = {}
+        self._locks: Dict[str, _RoomLock] = {}
+        self._tasks: Set[asyncio.Task] = set()  # timer-driven flushes, referenced until done
+
+        # Metrics
+        self._events = 0
+        self._emits = 0
+        self._batches = 0
+        self._immediate = 0
+
+    async def _emit(self, event: str, data: dict, room: str):
+        self._emits += 1
+        await sio.emit(event, data, room=room)
+
+    async def send(self, room: str, event: str, data: dict, batch_event: str, immediate: bool = False):
+        self._events += 1
+        if self.window <= 0:
+            await self._emit(event, data, room)
+            return
+        key = (room, event)
+        if immediate:
+            self._immediate += 1
+            async with self._room_lock(room):
+                await self._flush_locked(key)
+                await self._emit(event, data, room)
+            return
+
+        batch = self._pending.get(key)
+        if batch is None:
+            batch = _Batch(batch_event)
+            self._pending[key] = batch
+            batch.timer = asyncio.get_running_loop().call_later(self.window, self._flush_later, room, event)
+        batch.items.append(data)
+        if len(batch.items) >= self.max_batch:
+            await self.flush(room, event)
+
+    def _flush_later(self, room: str, event: str):
+        task = asyncio.ensure_future(self.flush(room, event))
+        self._tasks.add(task)
+        task.add_done_callback(self._flush_done)
+
+    def _flush_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"[Broadcast] Batch flush failed: {task.exception()!r}")
+
+    @asynccontextmanager
+    async def _room_lock(self, room: str):
+        """Per-room lock, kept only while someone holds or waits for it (no entry per idle room)."""
+        entry = self._locks.get(room)
+        if entry is None:
+            entry = self._locks[room] = _RoomLock()
+        entry.users += 1
+        try:
+            async with entry.lock:
+                yield
+        finally:
+            entry.users -= 1
+            if entry.users == 0 and self._locks.get(room) is entry:
+                del self._locks[room]
+
+    async def flush(self, room: str, event: str):
+        async with self._room_lock(room):
+            await self._flush_locked((room, event))
+
+    async def _flush_locked(self, key: Tuple[str, str]):
+        batch = self._pending.pop(key, None)
+        if batch is None:
+            return
+        if batch.timer:
+            batch.timer.cancel()
+        room, event = key
+        if len(batch.items) == 1:
+            await self._emit(event, batch.items[0], room)
+        elif batch.items:
+            self._batches += 1
+            await self._emit(batch.batch_event, {"events": batch.items}, room)
+
+    async def flush_all(self):
+        for room, event in list(self._pending):
+            await self.flush(room, event)
+
+    def stats(self) -> dict:
+        return {
+            "window_ms": round(self.window * 1000),
+            "max_batch": self.max_batch,
+            "pending_rooms": len(self._pending),
+            "locked_rooms": len(self._locks),
+            "flush_tasks": len(self._tasks),
+            "events": self._events,
+            "emits": self._emits,
+            "batches": self._batches,
+            "immediate": self._immediate,
+        }
+
+
+pen_broadcaster = BroadcastScheduler()
@@ -0,0 +1,99 @@
+"""
+Per-classroom cache of recent live chunks (metadata + bytes).
+
+Serves the polling endpoints in backend/api/endpoints/streams.py from memory during a
+live class. Bytes are bounded by a global budget (CHUNK_CACHE_MAX_BYTES) with LRU
+eviction across rooms; metadata is bounded per room (CHUNK_CACHE_MAX_ENTRIES_PER_ROOM).
+Chunks whose bytes were evicted are served from their segment on disk.
+
+Each room has a version that changes whenever a chunk is added, used as the list ETag.
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+
+
+class _RoomChunks:
+    def __init__(self):
+        self.meta: "OrderedDict[str, dict]" = OrderedDict()  # chunk id -> metadata, insertion order
+        self.version = 0
+
+
+class ChunkCache:
+    def __init__(self, max_bytes: Optional[int] = None, max_entries_per_room: Optional[int] = None):
+        self.max_bytes = max_bytes or settings.CHUNK_CACHE_MAX_BYTES
+        self.max_entries_per_room = max_entries_per_room or settings.CHUNK_CACHE_MAX_ENTRIES_PER_ROOM
+        self._rooms: Dict[str, _RoomChunks] = {}
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()  # chunk id -> bytes, LRU order
+        self._owner: Dict[str, str] = {}  # chunk id -> classroom id
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+
+    def add(self, meta: dict, data: Optional[bytes] = None):
+        room = self._rooms.setdefault(meta["classroom_id"], _RoomChunks())
+        room.meta[meta["id"]] = meta
+        room.version += 1
+        self._owner[meta["id"]] = meta["classroom_id"]
+        while len(room.meta) > self.max_entries_per_room:
+            old_id, _ = room.meta.popitem(last=False)
+            self._owner.pop(old_id, None)
+            self._drop_data(old_id)
+
+        if data is not None and len(data) <= self.max_bytes:
+            self._data[meta["id"]] = data
+            self.bytes += len(data)
+            while self.bytes > self.max_bytes:
+                _, evicted = self._data.popitem(last=False)
+                self.bytes -= len(evicted)
+
+    def _drop_data(self, chunk_id: str):
+        data = self._data.pop(chunk_id, None)
+        if data is not None:
+            self.bytes -= len(data)
+
+    def get_data(self, chunk_id: str) -> Optional[bytes]:
+        data = self._data.get(chunk_id)
+        if data is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._data.move_to_end(chunk_id)
+        return data
+
+    def get_meta(self, chunk_id: str) -> Optional[dict]:
+        room = self._rooms.get(self._owner.get(chunk_id))
+        return room.meta.get(chunk_id) if room else None
+
+    def list_recent(self, classroom_id: str, limit: int) -> Optional[Tuple[List[dict], int]]:
+        """
+        Returns (chunks ordered by seq desc, room version), or None if the cache
+        cannot answer (fewer than `limit` chunks cached for the room).
+        """
+        room = self._rooms.get(classroom_id)
+        if room is None or len(room.meta) < limit:
+            return None
+        chunks = sorted(room.meta.values(), key=lambda m: m["seq"], reverse=True)[:limit]
+        return chunks, room.version
+
+    def drop_room(self, classroom_id: str):
+        room = self._rooms.pop(classroom_id, None)
+        if room:
+            for chunk_id in room.meta:
+                self._owner.pop(chunk_id, None)
+                self._drop_data(chunk_id)
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self._rooms),
+            "entries": sum(len(r.meta) for r in self._rooms.values()),
+            "bytes": self.bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+chunk_cache = ChunkCache()
@@ -20,6 +20,122 @@ class Settings(BaseSettings):
     API_STR: str = "/api"
     FRONTEND_ORIGINS: List[str] = ["http://localhost:5173", "http://127.0.0.1:5173", "http://localhost:3000"]
 
+    # SQLite profile (see core/sqlite_profile.py): one serialized writer, a pool of readers
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_READ_POOL_SIZE: int = 4
+    SQLITE_WRITER_TIMEOUT_S: float = 30.0
+
+    # Server databases (see core/db_backend.py); DATABASE_READ_URL may point at a replica
+    DATABASE_READ_URL: str = ""
+    DB_POOL_SIZE: int = 10
+    DB_READ_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_S: float = 30.0
+    DB_POOL_RECYCLE_S: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 256  # 0 behind pgbouncer in transaction mode
+    DB_APPLICATION_NAME: str = "vlink"
+
+    # Live media: chunks are appended to rolling segment files of at most this size
+    LIVE_SEGMENT_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Write-behind buffer for LiveChunk/EventLog inserts: flush at N rows or after N ms
+    WRITE_BEHIND_MAX_ROWS: int = 500
+    WRITE_BEHIND_MAX_DELAY_MS: int = 100
+    WRITE_BEHIND_MAX_PENDING: int = 20000  # producers wait for a flush beyond this
+    # A failed flush is put back and retried with exponential backoff; its rows are dropped
+    # (and their ids logged) only after this many attempts
+    WRITE_BEHIND_MAX_ATTEMPTS: int = 5
+    WRITE_BEHIND_RETRY_BASE_MS: int = 200
+    WRITE_BEHIND_RETRY_MAX_MS: int = 5000
+
+    # ffprobe job runner slots (0 = one per CPU core)
+    FFPROBE_CONCURRENCY: int = 0
+    FFPROBE_TIMEOUT_S: float = 30.0
+    FFPROBE_CACHE_SIZE: int = 1024
+
+    # Incremental recording: mux live chunks into HLS/TS parts every N seconds during class
+    LIVE_RECORDING_ENABLED: bool = True
+    RECORDING_PART_SECONDS: int = 10
+
+    # In-memory media relay: chunk bytes are pushed to the room and kept in a ring buffer
+    RELAY_MEDIA_TYPES: List[str] = ["audio"]
+    RELAY_BUFFER_SECONDS: float = 30.0
+    RELAY_CATCHUP_SECONDS: float = 5.0
+    RELAY_MAX_BYTES_PER_ROOM: int = 8 * 1024 * 1024
+
+    # Recent-chunk cache behind /streams/chunks and /streams/chunk/file
+    CHUNK_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    CHUNK_CACHE_MAX_ENTRIES_PER_ROOM: int = 2000
+
+    # Whiteboard compaction: fold old pen events into a snapshot every N seconds
+    BOARD_COMPACT_INTERVAL_S: int = 60
+    BOARD_COMPACT_MIN_EVENTS: int = 500  # only compact rooms with at least this many foldable events
+    BOARD_COMPACT_KEEP_TAIL: int = 200  # most recent events stay in event_logs
+
+    # Stroke codec: pen coordinates are quantized to 1/N px, then delta + varint packed
+    STROKE_QUANT_SCALE: int = 10
+
+    # Pen broadcast coalescing: events within the window go out as one "pen_event_batch"
+    PEN_BATCH_WINDOW_MS: int = 16  # 0 = emit every event on its own
+    PEN_BATCH_MAX_EVENTS: int = 64
+    PEN_IMMEDIATE_EVENT_TYPES: List[str] = ["clear", "undo", "redo", "slide"]  # never delayed
+
+    # bcrypt hashing/verification runs on this many dedicated threads, off the event loop
+    PASSWORD_HASH_WORKERS: int = 4
+
+    # Auth caches: verified JWT claims per token and slim user records per user id
+    TOKEN_CACHE_TTL_S: int = 300
+    IDENTITY_CACHE_TTL_S: int = 60
+    IDENTITY_CACHE_MAX_ENTRIES: int = 10000
+
+    # Socket handshakes that need a DB lookup: at most N at once, jittered when saturated
+    SOCKET_HANDSHAKE_CONCURRENCY: int = 8
+    SOCKET_HANDSHAKE_JITTER_MS: int = 250
+
+    # Socket.IO across processes: "" (in-process), redis://..., or unix:///path (see core/socket_pubsub.py)
+    SOCKETIO_MESSAGE_QUEUE: str = ""
+    SOCKETIO_CHANNEL: str = "vlink-socketio"
+
+    # Upload pipeline (core/upload_pipeline.py): streamed off-loop in N-byte blocks,
+    # hashed (SHA-256) and size-checked in the same pass. Quotas in bytes, 0 = unlimited.
+    UPLOAD_BUFFER_BYTES: int = 1024 * 1024
+    UPLOAD_IO_WORKERS: int = 4
+    UPLOAD_QUOTA_USER_BYTES: int = 5 * 1024 * 1024 * 1024
+    UPLOAD_QUOTA_CLASS_BYTES: int = 20 * 1024 * 1024 * 1024
+
+    # Content-addressed blob store (core/blob_store.py): uploads are stored once per SHA-256
+    BLOB_DIR: str = "uploads/blobs"
+    BLOB_GC_INTERVAL_S: int = 3600
+    BLOB_GC_GRACE_S: int = 24 * 3600  # unreferenced blobs are kept this long before deletion
+
+    # Downloads (core/sendfile.py): bodies of at least SENDFILE_MIN_BYTES are handed to the
+    # server (ASGI zerocopysend -> os.sendfile, or pathsend) when it supports that; otherwise
+    # they are read in SENDFILE_CHUNK_BYTES blocks instead of Starlette's 64 KiB.
+    SENDFILE_MIN_BYTES: int = 1024 * 1024
+    SENDFILE_CHUNK_BYTES: int = 1024 * 1024
+
+    # Resumable (tus) uploads: partial files live here until complete or expired.
+    # Keep it on the same filesystem as uploads/ (completed files are renamed, not copied)
+    # but outside it, since uploads/ is served statically.
+    TUS_UPLOAD_DIR: str = "tus_uploads"
+    TUS_MAX_SIZE: int = 2 * 1024 * 1024 * 1024
+    TUS_EXPIRY_S: int = 24 * 3600  # refreshed by every PATCH
+    TUS_REAP_INTERVAL_S: int = 600
+
+    # Persistent job queue. Set JOB_WORKER_IN_PROCESS=false when running dedicated
+    # workers with `python -m backend.core.worker`.
+    JOB_WORKER_IN_PROCESS: bool = True
+    JOB_WORKER_CONCURRENCY: int = 2
+    JOB_LEASE_SECONDS: int = 300
+    JOB_POLL_INTERVAL_S: float = 1.0
+    JOB_MAX_ATTEMPTS: int = 5
+    JOB_RETRY_BASE_S: float = 5.0  # backoff: base * 2^(attempt-1), capped at one hour
+
     class Config:
         env_file = ".env"
         env_file_encoding = "utf-8"
@@ -4,10 +4,21 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 
 from backend.core.config import settings
+from backend.core.db_backend import database_url, engine_kwargs
+from backend.core.sqlite_profile import apply_sqlite_profile
 
-# Async engine and session factory
-engine = create_async_engine(settings.DATABASE_URL, future=True, echo=False)
+# Async engine and session factory. Pool options depend on the backend (core/db_backend.py).
+# On SQLite the engine holds a single connection, so writes are serialized here
+# instead of failing with "database is locked" (see backend/core/sqlite_profile.py).
+engine = create_async_engine(database_url(settings, writer=True), future=True, echo=False, **engine_kwargs(settings, writer=True))
+apply_sqlite_profile(engine, settings)
 AsyncSessionLocal = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+
+# Read-only pool for read paths (dashboards, listings, sync/polling endpoints)
+read_engine = create_async_engine(database_url(settings, writer=False), future=True, echo=False, **engine_kwargs(settings, writer=False))
+apply_sqlite_profile(read_engine, settings, read_only=True)
+ReadSessionLocal = sessionmaker(read_engine, class_=AsyncSession, expire_on_commit=False)
+
 Base = declarative_base()
 
 
@@ -20,4 +31,13 @@ async def get_db() -> AsyncGenerator[AsyncSession, None]:
     Ensures the session is closed after the request.
     """
     async with AsyncSessionLocal() as session:
-        yield session
\ No newline at end of file
+        yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """
+    Like get_db, but on the read-only pool. Use it for endpoints that never write,
+    so they do not queue behind the single writer connection.
+    """
+    async with ReadSessionLocal() as session:
+        yield session
@@ -0,0 +1,151 @@
+"""
+Per-room event sequencing and cursor-based (keyset) event sync.
+
+Every EventLog row gets a monotonically increasing per-room `seq` when it is accepted.
+Clients remember the last seq they saw and ask only for the delta:
+
+    GET /api/streams/events/{classroom_id}?after=<seq>       (optionally &wait=<seconds>)
+    socket: emit("sync_events", {classroom_id, after})  ->  "events_catchup"
+
+Rows are written through the write-behind buffer, whose flushes commit in seq order,
+so the rows visible in the DB are always a gap-free prefix of the room's sequence. The
+tail that is not committed yet is served from the buffer itself (write_behind.buffered),
+so polls never force a flush and the 100 ms / 500-row batching holds under load.
+
+Older events are periodically folded into a BoardSnapshot (see board_compaction.py).
+A cursor behind the snapshot (e.g. after=0 for a late joiner) gets the snapshot plus
+the tail after it instead of the full history.
+"""
+
+import asyncio
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.future import select
+
+from backend.core.board_compaction import load_snapshot
+from backend.core.database import ReadSessionLocal
+from backend.core.stroke_codec import PLAIN, for_codec
+from backend.core.write_behind import write_behind
+from backend.db.models import BoardSnapshot, EventLog
+
+
+class RoomSequencer:
+    def __init__(self):
+        self._last: Dict[str, int] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._new_events: Dict[str, asyncio.Event] = {}
+
+    async def next(self, classroom_id: str) -> int:
+        if classroom_id not in self._last:
+            lock = self._locks.setdefault(classroom_id, asyncio.Lock())
+            async with lock:
+                if classroom_id not in self._last:
+                    # Resume after the highest seq already stored (or compacted) for this room
+                    async with ReadSessionLocal() as db:
+                        result = await db.execute(select(func.max(EventLog.seq)).where(EventLog.classroom_id == classroom_id))
+                        stored = result.scalar() or 0
+                        result = await db.execute(select(func.max(BoardSnapshot.upto_seq)).where(BoardSnapshot.classroom_id == classroom_id))
+                        self._last[classroom_id] = max(stored, result.scalar() or 0)
+        self._last[classroom_id] += 1
+        self._signal(classroom_id)
+        return self._last[classroom_id]
+
+    def _signal(self, classroom_id: str):
+        event = self._new_events.pop(classroom_id, None)
+        if event:
+            event.set()
+
+    def last(self, classroom_id: str) -> Optional[int]:
+        return self._last.get(classroom_id)
+
+    async def wait_for_new(self, classroom_id: str, timeout: float) -> bool:
+        event = self._new_events.setdefault(classroom_id, asyncio.Event())
+        try:
+            await asyncio.wait_for(event.wait(), timeout=timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+
+event_sequencer = RoomSequencer()
+
+
+def event_to_dict(ev: EventLog) -> dict:
+    return {
+        "id": ev.id,
+        "seq": ev.seq,
+        "classroom_id": ev.classroom_id,
+        "sender_id": ev.sender_id,
+        "event_type": ev.event_type,
+        "payload": ev.payload,
+        "created_at": ev.created_at,
+    }
+
+
+def _buffered_to_dict(row: dict) -> dict:
+    return {key: row.get(key) for key in ("id", "seq", "classroom_id", "sender_id", "event_type", "payload", "created_at")}
+
+
+def render_events(events: List[dict], codec: str) -> List[dict]:
+    """Stored payloads keep strokes packed; decode them unless the client negotiated the packed codec."""
+    return [dict(ev, payload=for_codec(ev.get("payload"), codec)) for ev in events]
+
+
+async def _read_after(classroom_id: str, after: int, limit: int):
+    """(snapshot or None, events with seq > after in seq order, unrendered)."""
+    snapshot = await load_snapshot(classroom_id)
+    if snapshot is not None and after < snapshot["upto_seq"]:
+        after = snapshot["upto_seq"]
+    else:
+        snapshot = None
+
+    # Take the uncommitted tail before querying: a row committed meanwhile then shows up in
+    # the query result instead, and no row can fall between the two
+    buffered = [
+        row for row in write_behind.buffered(EventLog)
+        if row["classroom_id"] == classroom_id and row["seq"] > after
+    ]
+    async with ReadSessionLocal() as db:
+        result = await db.execute(
+            select(EventLog)
+            .where(EventLog.classroom_id == classroom_id, EventLog.seq > after)
+            .order_by(EventLog.seq)
+            .limit(limit)
+        )
+        stored = [event_to_dict(ev) for ev in result.scalars().all()]
+
+    by_seq = {ev["seq"]: ev for ev in stored}
+    for row in buffered:
+        by_seq.setdefault(row["seq"], _buffered_to_dict(row))
+    return snapshot, [by_seq[seq] for seq in sorted(by_seq)[:limit]]
+
+
+async def fetch_events_after(classroom_id: str, after: int, limit: int = 200, wait: float = 0, codec: str = PLAIN) -> dict:
+    """
+    Returns events with seq > after in seq order (keyset pagination).
+    With wait > 0 and nothing new yet, long-polls up to `wait` seconds for the next event.
+    If `after` falls inside the compacted range, the response also carries the board
+    `snapshot` and the events continue from its upto_seq.
+    Stroke payloads are rendered for `codec` (see backend/core/stroke_codec.py).
+    """
+    # Always look first: after a restart (or on another worker) the sequencer does not know
+    # the room yet, and rows already stored must not wait out the long-poll
+    snapshot, events = await _read_after(classroom_id, after, limit)
+    if wait > 0 and snapshot is None and not events:
+        # An event accepted while we were reading has already signalled; only wait if not
+        last = event_sequencer.last(classroom_id)
+        if last is None or last <= after:
+            await event_sequencer.wait_for_new(classroom_id, wait)
+        snapshot, events = await _read_after(classroom_id, after, limit)
+    events = render_events(events, codec)
+
+    response = {
+        "classroom_id": classroom_id,
+        "events": events,
+        "next_cursor": events[-1]["seq"] if events else (snapshot["upto_seq"] if snapshot else after),
+        "has_more": len(events) == limit,
+    }
+    if snapshot is not None:
+        response["snapshot"] = dict(snapshot, events=render_events(snapshot["events"], codec))
+    return response
@@ -0,0 +1,85 @@
+"""
+Bounded executor for CPU-heavy blocking calls (bcrypt hashing / verification).
+
+A bcrypt verify takes 100-300 ms; run inline in an async endpoint it stalls the event loop
+and with it every socket in every live class. password_pool runs such calls on at most
+PASSWORD_HASH_WORKERS threads (bcrypt releases the GIL while hashing), and records how
+long callers queue for a worker.
+
+Usage:
+    ok = await password_pool.run(pwd_context.verify, plain, hashed)
+    password_pool.stats()
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from backend.core.config import settings
+
+
+class BoundedExecutor:
+    def __init__(self, max_workers: Optional[int] = None, name: str = "hash"):
+        self.max_workers = max_workers or settings.PASSWORD_HASH_WORKERS
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()  # counters are updated from worker threads too
+        self._queued = 0
+        self._active = 0
+
+        # Metrics
+        self._completed = 0
+        self._failed = 0
+        self._high_watermark = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+
+    def _call(self, submitted: float, fn: Callable, args: tuple):
+        started = time.perf_counter()
+        wait = started - submitted
+        with self._lock:
+            self._queued -= 1
+            self._active += 1
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+        try:
+            return fn(*args)
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._run_total += time.perf_counter() - started
+
+    async def run(self, fn: Callable, *args) -> Any:
+        with self._lock:
+            self._queued += 1
+            self._high_watermark = max(self._high_watermark, self._queued + self._active)
+        loop = asyncio.get_running_loop()
+        try:
+            result = await loop.run_in_executor(self._executor, self._call, time.perf_counter(), fn, args)
+        except Exception:
+            self._failed += 1
+            raise
+        self._completed += 1
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> dict:
+        done = max(self._completed + self._failed, 1)
+        return {
+            "workers": self.max_workers,
+            "queued": self._queued,
+            "active": self._active,
+            "high_watermark": self._high_watermark,
+            "completed": self._completed,
+            "failed": self._failed,
+            "avg_wait_ms": round(self._wait_total / done * 1000, 2),
+            "max_wait_ms": round(self._wait_max * 1000, 2),
+            "avg_run_ms": round(self._run_total / done * 1000, 2),
+        }
+
+
+password_pool = BoundedExecutor(name="bcrypt")
@@ -0,0 +1,211 @@
+"""
+Helpers for HTTP validators (ETag / If-None-Match / If-Range) and byte ranges on download endpoints.
+
+Files on disk go through file_download(): Starlette's FileResponse parses Range and checks
+If-Range against the ETag set here; RangeFileResponse sends the bytes (core/sendfile.py)
+and frames multipart/byteranges correctly. Bytes already in memory (live chunks) go
+through range_response(), which does the same for a bytes object.
+"""
+
+import os
+from secrets import token_hex
+from typing import List, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import FileResponse, PlainTextResponse, Response
+from starlette.datastructures import Headers
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+
+from backend.core.sendfile import send_file_body
+
+# Content addressed by an immutable id never changes, so clients may cache it for a year
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+# At most this many ranges per request; more is refused as 416 rather than fanned out
+MAX_RANGES = 16
+
+
+class RangeNotSatisfiable(Exception):
+    pass
+
+
+def quote_etag(value: str, weak: bool = False) -> str:
+    return f'{"W/" if weak else ""}"{value}"'
+
+
+def if_none_match(request: Request, etag: Optional[str]) -> bool:
+    """True if the request's If-None-Match matches etag (weak comparison, as RFC 9110 requires)."""
+    header = request.headers.get("if-none-match")
+    if not header or not etag:
+        return False
+    if header.strip() == "*":
+        return True
+    target = etag[2:] if etag.startswith("W/") else etag
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == target:
+            return True
+    return False
+
+
+def if_range(request: Request, etag: Optional[str]) -> bool:
+    """True if a Range may be honoured: no If-Range, or it names etag (strong comparison only)."""
+    header = request.headers.get("if-range")
+    if header is None:
+        return True
+    return bool(etag) and not etag.startswith("W/") and header.strip() == etag
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[List[Tuple[int, int]]]:
+    """
+    Parses a bytes Range header into sorted, merged (start, end) pairs, end exclusive.
+    Returns None when the header is absent or malformed (the full body is sent, per RFC 9110);
+    raises RangeNotSatisfiable when no range overlaps the content.
+    """
+    if not header:
+        return None
+    units, _, spec = header.partition("=")
+    if units.strip().lower() != "bytes" or not spec.strip():
+        return None
+    ranges = []
+    for part in spec.split(","):
+        first, sep, last = part.strip().partition("-")
+        if not sep:
+            return None
+        try:
+            if first:
+                start = int(first)
+                end = int(last) + 1 if last else size
+                if last and end <= start:
+                    return None
+                end = min(end, size)
+            else:
+                # Suffix range: the last N bytes
+                start, end = max(size - int(last), 0), size
+        except ValueError:
+            return None
+        if start < size and end > start:
+            ranges.append((start, end))
+    if not ranges or len(ranges) > MAX_RANGES:
+        raise RangeNotSatisfiable(size)
+
+    merged = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _part_header(boundary: str, media_type: str, start: int, end: int, size: int) -> bytes:
+    return f"--{boundary}\r\nContent-Type: {media_type}\r\nContent-Range: bytes {start}-{end - 1}/{size}\r\n\r\n".encode("latin-1")
+
+
+def range_response(request: Request, data: bytes, media_type: str, headers: dict) -> Response:
+    """Serves in-memory bytes honouring Range and If-Range (headers must carry the ETag)."""
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    size = len(data)
+    try:
+        ranges = parse_range(request.headers.get("range"), size) if if_range(request, headers.get("ETag")) else None
+    except RangeNotSatisfiable:
+        return PlainTextResponse(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if ranges is None:
+        return Response(content=data, media_type=media_type, headers=headers)
+
+    if len(ranges) == 1:
+        start, end = ranges[0]
+        headers["Content-Range"] = f"bytes {start}-{end - 1}/{size}"
+        return Response(content=data[start:end], status_code=206, media_type=media_type, headers=headers)
+
+    boundary = token_hex(13)
+    parts = []
+    for start, end in ranges:
+        parts.append(_part_header(boundary, media_type, start, end, size))
+        parts.append(data[start:end])
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode("latin-1"))
+    return Response(
+        content=b"".join(parts), status_code=206, media_type=f"multipart/byteranges; boundary={boundary}", headers=headers
+    )
+
+
+class RangeFileResponse(FileResponse):
+    """
+    FileResponse whose bodies go through send_file_body() (os.sendfile / pathsend for large
+    files, see core/sendfile.py), and whose multi-range replies are well-formed
+    multipart/byteranges: Starlette 0.50 sends them under the file's own Content-Type (the
+    boundary goes into Content-Range) and frames parts with bare LF.
+    """
+
+    async def __call__(self, scope, receive, send) -> None:
+        self.extensions = scope.get("extensions") or {}
+        await super().__call__(scope, receive, send)
+
+    async def _handle_simple(self, send, send_header_only: bool, send_pathsend: bool) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        size = int(self.headers["content-length"])
+        await send_file_body(send, self.extensions, self.path, 0, size, size)
+
+    async def _handle_single_range(self, send, start: int, end: int, file_size: int, send_header_only: bool) -> None:
+        self.headers["content-range"] = f"bytes {start}-{end - 1}/{file_size}"
+        self.headers["content-length"] = str(end - start)
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        await send_file_body(send, self.extensions, self.path, start, end, file_size)
+
+    async def _handle_multiple_ranges(self, send, ranges, file_size: int, send_header_only: bool) -> None:
+        boundary = token_hex(13)
+        media_type = self.headers["content-type"]
+        heads = [_part_header(boundary, media_type, start, end, file_size) for start, end in ranges]
+        tail = f"--{boundary}--\r\n".encode("latin-1")
+        self.headers["content-type"] = f"multipart/byteranges; boundary={boundary}"
+        self.headers["content-length"] = str(sum(len(head) + end - start + 2 for head, (start, end) in zip(heads, ranges)) + len(tail))
+        await send({"type": "http.response.start", "status": 206, "headers": self.raw_headers})
+        if send_header_only:
+            await send({"type": "http.response.body", "body": b"", "more_body": False})
+            return
+        for head, (start, end) in zip(heads, ranges):
+            await send({"type": "http.response.body", "body": head, "more_body": True})
+            await send_file_body(send, self.extensions, self.path, start, end, file_size, more_body=True)
+            await send({"type": "http.response.body", "body": b"\r\n", "more_body": True})
+        await send({"type": "http.response.body", "body": tail, "more_body": False})
+
+
+class DownloadStaticFiles(StaticFiles):
+    """StaticFiles (the /uploads mount) serving through RangeFileResponse."""
+
+    def file_response(self, full_path, stat_result, scope, status_code: int = 200) -> Response:
+        response = RangeFileResponse(full_path, status_code=status_code, stat_result=stat_result)
+        if self.is_not_modified(response.headers, Headers(scope=scope)):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def file_validators(path: str, sha256: Optional[str] = None) -> dict:
+    """
+    ETag and Cache-Control for a stored file. Content with a known SHA-256 is immutable, so
+    the hash is a strong ETag and the response may be cached for good. Older files fall back
+    to an ETag from mtime and size, and are revalidated on every use.
+    """
+    if sha256:
+        return {"ETag": quote_etag(sha256), "Cache-Control": IMMUTABLE_CACHE_CONTROL}
+    st = os.stat(path)
+    return {"ETag": quote_etag(f"{st.st_mtime_ns:x}-{st.st_size:x}"), "Cache-Control": "no-cache"}
+
+
+def file_download(request: Request, path: str, filename: Optional[str], media_type: Optional[str], sha256: Optional[str] = None) -> Response:
+    """
+    304 for a matching If-None-Match, otherwise a FileResponse that serves Range requests
+    (single and multipart/byteranges) and applies If-Range against the same ETag.
+    """
+    headers = file_validators(path, sha256)
+    if if_none_match(request, headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    return RangeFileResponse(path=path, filename=filename, media_type=media_type, headers=headers)
@@ -0,0 +1,114 @@
+"""
+Identity caches for authenticated requests.
+
+- token_cache: memoizes verified JWT claims per token string until the token's `exp`
+  (at most TOKEN_CACHE_TTL_S), so the signature is checked once, not on every call.
+- identity_cache: TTL/LRU map of user id -> CachedUser, a slim immutable copy of the
+  columns handlers read (id, username, full_name, role).
+
+Together they let get_current_user answer without touching SQLite in the common case.
+Any flush that updates or deletes a User evicts that user (SQLAlchemy mapper events);
+bulk `update(User)` statements bypass those events, so call invalidate_user() after them.
+IDENTITY_CACHE_TTL_S bounds staleness for changes made by other processes.
+"""
+
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Generic, Optional, Tuple, TypeVar
+
+from sqlalchemy import event
+
+from backend.core.config import settings
+from backend.db.models import User, UserRole
+
+V = TypeVar("V")
+
+
+@dataclass(frozen=True)
+class CachedUser:
+    id: str
+    username: str
+    full_name: Optional[str]
+    role: UserRole
+
+    @classmethod
+    def from_model(cls, user: User) -> "CachedUser":
+        return cls(id=user.id, username=user.username, full_name=user.full_name, role=user.role)
+
+    @classmethod
+    def from_claims(cls, claims: dict) -> Optional["CachedUser"]:
+        """Identity carried by a token from create_user_token(); None for bare-subject tokens."""
+        try:
+            return cls(id=claims["sub"], username=claims["username"], full_name=claims.get("name"), role=UserRole(claims["role"]))
+        except (KeyError, ValueError):
+            return None
+
+
+class TTLCache(Generic[V]):
+    """LRU map whose entries also expire; get() refreshes recency, not the expiry."""
+
+    def __init__(self, ttl_s: float, max_entries: int):
+        self.ttl_s = ttl_s
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Tuple[V, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[V]:
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def put(self, key: str, value: V, ttl_s: Optional[float] = None):
+        ttl_s = self.ttl_s if ttl_s is None else min(ttl_s, self.ttl_s)
+        if ttl_s <= 0:
+            return
+        self._entries[key] = (value, time.monotonic() + ttl_s)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+class TokenCache(TTLCache[dict]):
+    def put_claims(self, token: str, claims: dict):
+        # Never cache past the token's own expiry
+        exp = claims.get("exp")
+        ttl_s = None if exp is None else float(exp) - time.time()
+        self.put(token, claims, ttl_s)
+
+
+token_cache = TokenCache(settings.TOKEN_CACHE_TTL_S, settings.IDENTITY_CACHE_MAX_ENTRIES)
+identity_cache: TTLCache[CachedUser] = TTLCache(settings.IDENTITY_CACHE_TTL_S, settings.IDENTITY_CACHE_MAX_ENTRIES)
+
+
+def invalidate_user(user_id: str, username: Optional[str] = None):
+    identity_cache.invalidate(user_id)
+    if username:
+        # Socket handshakes with legacy tokens also cache the user under its username
+        identity_cache.invalidate(f"username:{username}")
+
+
+@event.listens_for(User, "after_update")
+@event.listens_for(User, "after_delete")
+def _evict_changed_user(mapper, connection, target):
+    invalidate_user(target.id, target.username)
+
+
+def identity_stats() -> dict:
+    return {"users": identity_cache.stats(), "tokens": token_cache.stats()}
@@ -0,0 +1,206 @@
+"""
+Persistent job queue backed by the `jobs` table.
+
+Jobs survive API restarts and can be executed by any process: the API itself
+(JOB_WORKER_IN_PROCESS) or dedicated workers started with `python -m backend.core.worker`.
+A worker claims a job with a lease, renews the lease while the handler runs and marks the
+job succeeded, or failed with an exponential-backoff retry until max_attempts is reached.
+
+Usage:
+- job = await enqueue_job("recording_merge", {"classroom_id": ...})
+- jobs = await enqueue_jobs("ffprobe", [{...}, ...])  (one transaction)
+- runner = JobRunner({"recording_merge": handler}); runner.start() / await runner.run_forever()
+"""
+
+import asyncio
+import logging
+import os
+import socket
+import uuid
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional
+
+from sqlalchemy import and_, or_, update
+from sqlalchemy.future import select
+
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal
+from backend.db.models import Job, JobStatus
+
+logger = logging.getLogger(__name__)
+
+JobHandler = Callable[..., Awaitable[object]]
+
+
+def _claimable(now: datetime, kinds: Optional[List[str]]):
+    cond = or_(
+        and_(Job.status == JobStatus.QUEUED, Job.run_after <= now),
+        and_(Job.status == JobStatus.RUNNING, Job.lease_expires_at < now),
+    )
+    if kinds:
+        cond = and_(cond, Job.kind.in_(kinds))
+    return cond
+
+
+async def enqueue_job(kind: str, payload: Optional[dict] = None, max_attempts: Optional[int] = None) -> Job:
+    async with AsyncSessionLocal() as db:
+        job = Job(kind=kind, payload=payload or {}, max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS)
+        db.add(job)
+        await db.commit()
+        await db.refresh(job)
+        return job
+
+
+async def enqueue_jobs(kind: str, payloads: Iterable[dict], max_attempts: Optional[int] = None) -> List[Job]:
+    async with AsyncSessionLocal() as db:
+        jobs = [Job(kind=kind, payload=payload, max_attempts=max_attempts or settings.JOB_MAX_ATTEMPTS) for payload in payloads]
+        db.add_all(jobs)
+        await db.commit()
+        return jobs
+
+
+async def get_job(job_id: str) -> Optional[Job]:
+    async with AsyncSessionLocal() as db:
+        return await db.get(Job, job_id)
+
+
+async def claim_job(worker_id: str, kinds: Optional[List[str]] = None) -> Optional[Job]:
+    """Atomically leases the oldest runnable job, or returns None."""
+    now = datetime.utcnow()
+    async with AsyncSessionLocal() as db:
+        # SKIP LOCKED lets concurrent workers on Postgres pick different rows (ignored on SQLite)
+        result = await db.execute(
+            select(Job.id).where(_claimable(now, kinds)).order_by(Job.run_after).limit(1).with_for_update(skip_locked=True)
+        )
+        job_id = result.scalars().first()
+        if not job_id:
+            return None
+
+        # Conditional update: only one worker wins if several picked the same row
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job_id, _claimable(now, kinds))
+            .values(
+                status=JobStatus.RUNNING,
+                lease_owner=worker_id,
+                lease_expires_at=now + timedelta(seconds=settings.JOB_LEASE_SECONDS),
+                attempts=Job.attempts + 1,
+                updated_at=now,
+            )
+        )
+        await db.commit()
+        if result.rowcount != 1:
+            return None
+
+        job = await db.get(Job, job_id)
+        if job.attempts > job.max_attempts:
+            # The lease of the last allowed attempt expired (worker crashed mid-job)
+            job.status = JobStatus.FAILED
+            job.last_error = job.last_error or "Lease expired on final attempt"
+            job.lease_owner = None
+            await db.commit()
+            return None
+        return job
+
+
+async def renew_lease(job_id: str, worker_id: str) -> bool:
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.lease_owner == worker_id, Job.status == JobStatus.RUNNING)
+            .values(lease_expires_at=datetime.utcnow() + timedelta(seconds=settings.JOB_LEASE_SECONDS))
+        )
+        await db.commit()
+        return result.rowcount == 1
+
+
+async def complete_job(job_id: str, worker_id: str):
+    async with AsyncSessionLocal() as db:
+        await db.execute(
+            update(Job)
+            .where(Job.id == job_id, Job.lease_owner == worker_id)
+            .values(status=JobStatus.SUCCEEDED, lease_owner=None, lease_expires_at=None, last_error=None)
+        )
+        await db.commit()
+
+
+async def fail_job(job_id: str, worker_id: str, error: str):
+    """Schedules a retry with exponential backoff, or marks the job failed after max_attempts."""
+    async with AsyncSessionLocal() as db:
+        job = await db.get(Job, job_id)
+        if not job or job.lease_owner != worker_id:
+            return
+        job.last_error = error[-4000:]
+        job.lease_owner = None
+        job.lease_expires_at = None
+        if job.attempts >= job.max_attempts:
+            job.status = JobStatus.FAILED
+        else:
+            delay = min(settings.JOB_RETRY_BASE_S * (2 ** (job.attempts - 1)), 3600)
+            job.status = JobStatus.QUEUED
+            job.run_after = datetime.utcnow() + timedelta(seconds=delay)
+        await db.commit()
+
+
+class JobRunner:
+    """Claims and executes jobs with bounded concurrency in the current process."""
+
+    def __init__(self, handlers: Dict[str, JobHandler], concurrency: Optional[int] = None, worker_id: Optional[str] = None):
+        self.handlers = handlers
+        self.concurrency = concurrency or settings.JOB_WORKER_CONCURRENCY
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = False
+
+    async def _heartbeat(self, job_id: str):
+        while True:
+            await asyncio.sleep(settings.JOB_LEASE_SECONDS / 3)
+            if not await renew_lease(job_id, self.worker_id):
+                return
+
+    async def _execute(self, job: Job):
+        handler = self.handlers[job.kind]
+        heartbeat = asyncio.create_task(self._heartbeat(job.id))
+        try:
+            await handler(**(job.payload or {}))
+        except Exception as e:
+            logger.error(f"[Jobs] {job.kind} job {job.id} failed (attempt {job.attempts}): {e}")
+            await fail_job(job.id, self.worker_id, f"{type(e).__name__}: {e}")
+        else:
+            await complete_job(job.id, self.worker_id)
+        finally:
+            heartbeat.cancel()
+
+    async def _loop(self):
+        while not self._stopping:
+            try:
+                job = await claim_job(self.worker_id, list(self.handlers))
+            except Exception as e:
+                logger.error(f"[Jobs] Claim failed: {e}")
+                job = None
+            if job is None:
+                await asyncio.sleep(settings.JOB_POLL_INTERVAL_S)
+                continue
+            await self._execute(job)
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None) -> List[asyncio.Task]:
+        if any(not t.done() for t in self._tasks):
+            return self._tasks
+        self._stopping = False
+        loop = loop or asyncio.get_event_loop()
+        self._tasks = [loop.create_task(self._loop()) for _ in range(self.concurrency)]
+        return self._tasks
+
+    def active_slots(self) -> int:
+        return len([t for t in self._tasks if not t.done()])
+
+    async def run_forever(self):
+        await asyncio.gather(*self.start())
+
+    async def stop(self):
+        # Running jobs are abandoned; their leases expire and another worker retries them
+        self._stopping = True
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
@@ -0,0 +1,75 @@
+"""
+Compact binary framing for live audio/video chunks.
+
+Clients emit `audio_chunk` / `video_chunk` with a single binary Socket.IO attachment:
+
+    offset  size  field
+    0       1     version (FRAME_VERSION)
+    1       1     codec id (see CODECS, 0 = server default for the media type)
+    2       2     classroom id length N (0 = use the room joined via join_class)
+    4       4     seq (unsigned)
+    8       8     timestamp_ms (signed, unix ms)
+    16      N     classroom id (utf-8)
+    16+N    ...   raw media payload
+
+All integers are little-endian. parse_frame() returns the payload as a memoryview slice of
+the received buffer, so the hot path never copies or base64-decodes the media bytes.
+"""
+
+import struct
+from dataclasses import dataclass
+from typing import Optional, Union
+
+FRAME_VERSION = 1
+FRAME_HEADER = struct.Struct("<BBHIq")
+
+CODECS = {
+    1: "opus",
+    2: "h264",
+    3: "vp8",
+    4: "vp9",
+    5: "aac",
+}
+CODEC_IDS = {name: codec_id for codec_id, name in CODECS.items()}
+
+BufferLike = Union[bytes, bytearray, memoryview]
+
+
+@dataclass(frozen=True)
+class MediaFrame:
+    classroom_id: Optional[str]
+    seq: int
+    timestamp_ms: int
+    codec: Optional[str]
+    payload: memoryview
+
+
+def parse_frame(buf: BufferLike) -> MediaFrame:
+    """Parses a binary media frame. Raises ValueError for truncated or unknown frames."""
+    view = memoryview(buf)
+    if len(view) < FRAME_HEADER.size:
+        raise ValueError("Frame shorter than header")
+    version, codec_id, room_len, seq, timestamp_ms = FRAME_HEADER.unpack_from(view)
+    if version != FRAME_VERSION:
+        raise ValueError(f"Unsupported frame version {version}")
+    body_start = FRAME_HEADER.size + room_len
+    if len(view) < body_start:
+        raise ValueError("Frame shorter than declared classroom id")
+    if codec_id and codec_id not in CODECS:
+        raise ValueError(f"Unknown codec id {codec_id}")
+
+    classroom_id = bytes(view[FRAME_HEADER.size:body_start]).decode("utf-8") if room_len else None
+    return MediaFrame(
+        classroom_id=classroom_id,
+        seq=seq,
+        timestamp_ms=timestamp_ms,
+        codec=CODECS.get(codec_id),
+        payload=view[body_start:],
+    )
+
+
+def build_frame(classroom_id: Optional[str], seq: int, timestamp_ms: int, codec: Optional[str], payload: BufferLike) -> bytes:
+    """Builds a binary media frame (used by relays, tools and clients written in Python)."""
+    room = (classroom_id or "").encode("utf-8")
+    header = FRAME_HEADER.pack(FRAME_VERSION, CODEC_IDS.get(codec, 0) if codec else 0, len(room), seq, timestamp_ms)
+    return b"".join((header, room, payload))
@@ -0,0 +1,104 @@
+"""
+In-memory media relay (SFU-lite) for live chunks.
+
+Every relayed chunk is pushed to the room as it arrives (the bytes ride along in the
+`*_chunk_broadcast` event as a binary attachment) and kept in a per-room ring buffer.
+Late joiners receive the last RELAY_CATCHUP_SECONDS from that buffer, so live playback
+never touches disk or SQLite.
+
+The ring is bounded both by age (RELAY_BUFFER_SECONDS) and by bytes (RELAY_MAX_BYTES_PER_ROOM).
+"""
+
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Deque, Dict, List, Optional
+
+from backend.core.config import settings
+
+
+@dataclass(frozen=True)
+class RelayedChunk:
+    classroom_id: str
+    media_type: str
+    seq: int
+    timestamp_ms: Optional[int]
+    sender_id: Optional[str]
+    codec: str
+    data: bytes
+    received_at: float = field(default_factory=time.monotonic)
+
+    def to_event(self) -> dict:
+        return {
+            "classroom_id": self.classroom_id,
+            "seq": self.seq,
+            "sender_id": self.sender_id,
+            "codec": self.codec,
+            "timestamp_ms": self.timestamp_ms,
+            "data": self.data,
+        }
+
+
+class RoomRing:
+    """Bounded, time-ordered buffer of the most recent chunks of one room."""
+
+    def __init__(self, max_seconds: float, max_bytes: int):
+        self.max_seconds = max_seconds
+        self.max_bytes = max_bytes
+        self.chunks: Deque[RelayedChunk] = deque()
+        self.bytes = 0
+
+    def _evict(self, now: float):
+        while self.chunks and (
+            self.bytes > self.max_bytes or now - self.chunks[0].received_at > self.max_seconds
+        ):
+            self.bytes -= len(self.chunks.popleft().data)
+
+    def push(self, chunk: RelayedChunk):
+        self.chunks.append(chunk)
+        self.bytes += len(chunk.data)
+        self._evict(chunk.received_at)
+
+    def recent(self, seconds: float, media_type: Optional[str] = None) -> List[RelayedChunk]:
+        now = time.monotonic()
+        self._evict(now)
+        return [
+            c for c in self.chunks
+            if now - c.received_at <= seconds and (media_type is None or c.media_type == media_type)
+        ]
+
+
+class MediaRelay:
+    def __init__(self, max_seconds: Optional[float] = None, max_bytes: Optional[int] = None):
+        self.max_seconds = max_seconds or settings.RELAY_BUFFER_SECONDS
+        self.max_bytes = max_bytes or settings.RELAY_MAX_BYTES_PER_ROOM
+        self._rooms: Dict[str, RoomRing] = {}
+
+    def relays(self, media_type: str) -> bool:
+        return media_type in settings.RELAY_MEDIA_TYPES
+
+    def push(self, chunk: RelayedChunk):
+        ring = self._rooms.get(chunk.classroom_id)
+        if ring is None:
+            ring = RoomRing(self.max_seconds, self.max_bytes)
+            self._rooms[chunk.classroom_id] = ring
+        ring.push(chunk)
+
+    def recent(self, classroom_id: str, seconds: Optional[float] = None, media_type: Optional[str] = None) -> List[RelayedChunk]:
+        ring = self._rooms.get(classroom_id)
+        if ring is None:
+            return []
+        return ring.recent(seconds or settings.RELAY_CATCHUP_SECONDS, media_type)
+
+    def drop_room(self, classroom_id: str):
+        self._rooms.pop(classroom_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self._rooms),
+            "chunks": sum(len(r.chunks) for r in self._rooms.values()),
+            "bytes": sum(r.bytes for r in self._rooms.values()),
+        }
+
+
+media_relay = MediaRelay()
@@ -0,0 +1,111 @@
+"""
+Schema upgrades for databases created by an older version.
+
+Base.metadata.create_all() only creates missing tables; it never adds a column or an
+index to a table that already exists. upgrade_schema() runs after it at startup and
+brings existing tables up to backend/db/models.py:
+
+- missing columns are added (nullable; rows get the column's scalar default, if any);
+- missing indexes are created.
+
+Before a unique index is created, duplicate rows that would violate it are moved to
+<table>_duplicates (same columns, plus archived_at and the index name), so the upgrade
+cannot fail on data written before the constraint existed and nothing is deleted. The
+row kept in each group is the oldest one (smallest id), except for submissions, where a
+graded submission wins over a submitted one, then the latest submitted_at.
+
+Usage:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+"""
+
+import logging
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, case, func, inspect, literal, select, text
+
+from backend.core.database import Base
+from backend.db.models import SubmissionStatus
+
+logger = logging.getLogger(__name__)
+
+
+def _add_column(conn, column):
+    table = column.table
+    preparer = conn.dialect.identifier_preparer
+    col_type = column.type.compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {preparer.format_table(table)} ADD COLUMN {preparer.format_column(column)} {col_type}"))
+    default = column.default
+    if default is not None and default.is_scalar:
+        conn.execute(table.update().values({column.name: default.arg}))
+    logger.info("Added column %s.%s", table.name, column.name)
+
+
+def _keep_order(table) -> list:
+    """ORDER BY of the duplicate that stays (row_number() == 1)."""
+    c = table.c
+    if table.name == "submissions":
+        status_rank = case((c.status == SubmissionStatus.GRADED, 0), (c.status == SubmissionStatus.SUBMITTED, 1), else_=2)
+        return [status_rank, c.submitted_at.desc(), c.id]
+    return [c.id]
+
+
+def _archive_table(conn, table) -> Table:
+    archive = Table(
+        f"{table.name}_duplicates", MetaData(),
+        *(Column(col.name, col.type) for col in table.columns),
+        Column("archived_at", DateTime),
+        Column("archived_for_index", String),
+    )
+    archive.create(conn, checkfirst=True)
+    return archive
+
+
+def _archive_duplicates(conn, index) -> int:
+    """Moves the rows that would violate unique `index` to <table>_duplicates; returns how many."""
+    table = index.table
+    columns = list(index.columns)
+    # NULLs never collide in a unique index, so rows with a NULL key are left alone
+    ranked = (
+        select(table.c.id, func.row_number().over(partition_by=columns, order_by=_keep_order(table)).label("rank"))
+        .where(*(col.isnot(None) for col in columns))
+        .subquery()
+    )
+    losers = select(ranked.c.id).where(ranked.c.rank > 1)
+    ids = conn.execute(losers).scalars().all()
+    if not ids:
+        return 0
+
+    archive = _archive_table(conn, table)
+    names = [col.name for col in table.columns]
+    conn.execute(
+        archive.insert().from_select(
+            names + ["archived_at", "archived_for_index"],
+            select(*table.c, literal(datetime.utcnow()), literal(index.name)).where(table.c.id.in_(ids)),
+        )
+    )
+    conn.execute(table.delete().where(table.c.id.in_(ids)))
+    logger.warning("Moved %d duplicate %s rows to %s before creating %s: %s", len(ids), table.name, archive.name, index.name, ids)
+    return len(ids)
+
+
+def upgrade_schema(conn):
+    """Adds missing columns and indexes (run via AsyncConnection.run_sync)."""
+    inspector = inspect(conn)
+    for table in Base.metadata.sorted_tables:
+        if not inspector.has_table(table.name):
+            continue
+        columns = {c["name"] for c in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in columns:
+                _add_column(conn, column)
+
+        existing = {ix["name"] for ix in inspector.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda ix: ix.name):
+            if index.name in existing:
+                continue
+            if index.unique:
+                _archive_duplicates(conn, index)
+            index.create(conn)
+            logger.info("Created index %s", index.name)
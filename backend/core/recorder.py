@@ -0,0 +1,222 @@
+"""
+Incremental recording builder.
+
+While a class is live, chunks appended to the segment log are also handed to the recorder.
+Every RECORDING_PART_SECONDS the chunks received since the last cut are muxed into the next
+MPEG-TS part under uploads/recordings/live/<classroom_id>/<session>/ and listed in a rolling
+HLS playlist (index.m3u8), so the recording-so-far is already playable during the class.
+
+At end_class the API process only seals the room (muxes the last few seconds and closes the
+playlist). The merge job then remuxes the sealed parts (stream copy, no re-encode) into a
+single MP4, which takes seconds regardless of class length and only needs the files on disk.
+If a room has no incremental state (e.g. after a restart) seal() returns None and the merge
+falls back to the full merge from LiveChunk rows.
+
+Usage:
+- recorder.add_chunk(classroom_id, "audio", seq, timestamp_ms, location)
+- On app startup call start_recorder().
+- At end of class: parts_dir = await recorder.seal(classroom_id); later await remux_parts(parts_dir, output_path).
+"""
+
+import asyncio
+import logging
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from backend.core.config import settings
+from backend.core.segment_log import ChunkLocation
+
+logger = logging.getLogger(__name__)
+
+LIVE_PARTS_DIR = Path("uploads") / "recordings" / "live"
+
+# seq, timestamp_ms, ffmpeg source
+_PendingChunk = Tuple[int, int, str]
+
+
+@dataclass
+class _RoomRecording:
+    parts_dir: Path
+    parts: List[Tuple[Path, float]] = field(default_factory=list)  # (part path, duration seconds)
+    video: List[_PendingChunk] = field(default_factory=list)
+    audio: List[_PendingChunk] = field(default_factory=list)
+    lock: asyncio.Lock = field(default_factory=asyncio.Lock)
+    last_cut: float = field(default_factory=time.monotonic)
+    failed: bool = False  # a part could not be muxed; seal() defers to the full merge
+
+
+def _estimate_duration(chunks: List[_PendingChunk]) -> float:
+    stamps = [ts for _, ts, _ in chunks if ts]
+    if len(stamps) < 2:
+        return float(settings.RECORDING_PART_SECONDS)
+    return max((max(stamps) - min(stamps)) / 1000, 0.001)
+
+
+async def _run_ffmpeg(cmd: List[str]) -> bool:
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    out, err = await proc.communicate()
+    if proc.returncode != 0:
+        logger.error(f"[Recorder] FFmpeg failed: {err.decode(errors='replace')}")
+        return False
+    return True
+
+
+class IncrementalRecorder:
+    def __init__(self, parts_dir: Path = LIVE_PARTS_DIR):
+        self.parts_dir = parts_dir
+        self._rooms: Dict[str, _RoomRecording] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._cuts: set = set()
+
+    def _room(self, classroom_id: str) -> _RoomRecording:
+        room = self._rooms.get(classroom_id)
+        if room is None:
+            # One directory per session, so a class restarted later never clobbers sealed parts
+            session = str(int(time.time() * 1000))
+            room = _RoomRecording(parts_dir=self.parts_dir / classroom_id / session)
+            self._rooms[classroom_id] = room
+        return room
+
+    def add_chunk(self, classroom_id: str, chunk_type: str, seq: int, timestamp_ms: Optional[int], location: ChunkLocation):
+        room = self._room(classroom_id)
+        pending = room.video if chunk_type == "video" else room.audio
+        pending.append((int(seq), int(timestamp_ms or 0), location.ffmpeg_source()))
+
+    def _write_playlist(self, room: _RoomRecording, ended: bool = False):
+        target = max([int(d) + 1 for _, d in room.parts] or [settings.RECORDING_PART_SECONDS])
+        lines = ["#EXTM3U", "#EXT-X-VERSION:3", f"#EXT-X-TARGETDURATION:{target}", "#EXT-X-MEDIA-SEQUENCE:0"]
+        for path, duration in room.parts:
+            lines.append(f"#EXTINF:{duration:.3f},")
+            lines.append(path.name)
+        if ended:
+            lines.append("#EXT-X-ENDLIST")
+        (room.parts_dir / "index.m3u8").write_text("\n".join(lines) + "\n")
+
+    async def _cut_part(self, room: _RoomRecording) -> bool:
+        """Muxes the chunks received since the last cut into the room's next .ts part."""
+        video, room.video = sorted(room.video), []
+        audio, room.audio = sorted(room.audio), []
+        room.last_cut = time.monotonic()
+        if not video and not audio:
+            return True
+
+        room.parts_dir.mkdir(parents=True, exist_ok=True)
+        part_no = len(room.parts) + 1
+        part_path = room.parts_dir / f"part_{part_no:06d}.ts"
+        vid_list = room.parts_dir / f"part_{part_no:06d}_vid.txt"
+        aud_list = room.parts_dir / f"part_{part_no:06d}_aud.txt"
+
+        cmd = ["ffmpeg", "-y"]
+        concat_input = ["-protocol_whitelist", "file,subfile", "-f", "concat", "-safe", "0", "-i"]
+        for list_path, chunks in ((vid_list, video), (aud_list, audio)):
+            if chunks:
+                list_path.write_text("".join(f"file '{source}'\n" for _, _, source in chunks))
+                cmd.extend([*concat_input, str(list_path)])
+
+        if video and audio:
+            cmd.extend(["-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac"])
+        elif video:
+            cmd.extend(["-c:v", "copy"])
+        else:
+            cmd.extend(["-c:a", "aac"])
+        cmd.extend(["-f", "mpegts", str(part_path)])
+
+        ok = await _run_ffmpeg(cmd)
+        for list_path in (vid_list, aud_list):
+            if list_path.exists():
+                list_path.unlink()
+        if not ok:
+            room.failed = True
+            return False
+
+        room.parts.append((part_path, _estimate_duration(video or audio)))
+        self._write_playlist(room)
+        return True
+
+    def _tick(self):
+        now = time.monotonic()
+        for classroom_id, room in list(self._rooms.items()):
+            if room.lock.locked() or now - room.last_cut < settings.RECORDING_PART_SECONDS:
+                continue
+            if room.video or room.audio:
+                task = asyncio.create_task(self._cut_locked(classroom_id, room))
+                self._cuts.add(task)
+                task.add_done_callback(self._cuts.discard)
+
+    async def _cut_locked(self, classroom_id: str, room: _RoomRecording):
+        async with room.lock:
+            try:
+                await self._cut_part(room)
+            except Exception as e:
+                room.failed = True
+                logger.error(f"[Recorder] Failed to cut part for {classroom_id}: {e}")
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(1)
+            try:
+                self._tick()
+            except Exception as e:
+                logger.error(f"[Recorder] Tick failed: {e}")
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        if self._task and not self._task.done():
+            return self._task
+        loop = loop or asyncio.get_event_loop()
+        self._task = loop.create_task(self._run())
+        return self._task
+
+    async def seal(self, classroom_id: str) -> Optional[Path]:
+        """
+        Muxes the tail and closes the room's playlist with #EXT-X-ENDLIST.
+        Returns the parts directory, or None when the room was not recorded incrementally
+        or a part failed (the merge job then falls back to the full merge).
+        """
+        room = self._rooms.pop(classroom_id, None)
+        if room is None:
+            return None
+        async with room.lock:
+            if not await self._cut_part(room) or room.failed or not room.parts:
+                return None
+            self._write_playlist(room, ended=True)
+            return room.parts_dir
+
+
+def sealed_parts(parts_dir: Path) -> Optional[List[Path]]:
+    """Returns the parts listed in a sealed playlist, or None if the playlist is missing/unsealed."""
+    playlist = Path(parts_dir) / "index.m3u8"
+    if not playlist.exists():
+        return None
+    lines = playlist.read_text().splitlines()
+    if "#EXT-X-ENDLIST" not in lines:
+        return None
+    parts = [Path(parts_dir) / line for line in lines if line and not line.startswith("#")]
+    if not parts or not all(p.exists() for p in parts):
+        return None
+    return parts
+
+
+async def remux_parts(parts_dir: Path, output_path: Path) -> Optional[Path]:
+    """
+    Stream-copies the sealed parts of parts_dir into a single MP4.
+    Needs only what is on disk, so it can run in any worker process.
+    """
+    parts = sealed_parts(parts_dir)
+    if not parts:
+        return None
+    parts_list = Path(parts_dir) / "parts.txt"
+    parts_list.write_text("".join(f"file '{path.resolve()}'\n" for path in parts))
+    cmd = ["ffmpeg", "-y", "-f", "concat", "-safe", "0", "-i", str(parts_list),
+           "-c", "copy", "-bsf:a", "aac_adtstoasc", "-movflags", "+faststart", str(output_path)]
+    ok = await _run_ffmpeg(cmd)
+    parts_list.unlink()
+    return output_path if ok else None
+
+
+recorder = IncrementalRecorder()
+
+
+def start_recorder(loop: Optional[asyncio.AbstractEventLoop] = None):
+    return recorder.start(loop)
@@ -0,0 +1,93 @@
+"""
+Per-room connection registry.
+
+Socket.IO rooms route messages but cannot be queried cheaply for "who is in this class".
+The registry keeps room -> {sid: member info} and sid -> rooms so handlers can list
+members, validate a `to=sid` target, and clean up on disconnect in O(rooms of that sid).
+
+Usage:
+- room_registry.join(room, sid, {"user_id": ..., "name": ...})
+- room_registry.leave(room, sid) / room_registry.leave_all(sid) -> rooms left
+- room_registry.members(room), room_registry.rooms_of(sid), room_registry.shares_room(a, b)
+
+With a message-queue client manager (backend/core/socket_pubsub.py) local changes are
+published to subscribers and remote ones applied with publish=False, so the registry
+covers connections of every server process.
+"""
+
+from typing import Callable, Dict, List, Optional, Set
+
+PresenceListener = Callable[[str, str, str, Optional[dict]], None]
+
+
+class RoomRegistry:
+    def __init__(self):
+        self._rooms: Dict[str, Dict[str, dict]] = {}
+        self._sid_rooms: Dict[str, Set[str]] = {}
+        self._local: Set[str] = set()
+        self._listeners: List[PresenceListener] = []
+
+    def subscribe(self, listener: PresenceListener):
+        """Registers listener(op, room, sid, info) for local "join"/"leave" changes."""
+        self._listeners.append(listener)
+
+    def _notify(self, op: str, room: str, sid: str, info: Optional[dict]):
+        for listener in self._listeners:
+            listener(op, room, sid, info)
+
+    def join(self, room: str, sid: str, info: Optional[dict] = None, publish: bool = True):
+        self._rooms.setdefault(room, {})[sid] = dict(info or {}, sid=sid)
+        self._sid_rooms.setdefault(sid, set()).add(room)
+        if publish:
+            self._local.add(sid)
+            self._notify("join", room, sid, info)
+
+    def leave(self, room: str, sid: str, publish: bool = True) -> bool:
+        members = self._rooms.get(room)
+        if not members or members.pop(sid, None) is None:
+            return False
+        if not members:
+            del self._rooms[room]
+        rooms = self._sid_rooms.get(sid)
+        if rooms is not None:
+            rooms.discard(room)
+            if not rooms:
+                del self._sid_rooms[sid]
+                self._local.discard(sid)
+        if publish:
+            self._notify("leave", room, sid, None)
+        return True
+
+    def leave_all(self, sid: str) -> List[str]:
+        rooms = list(self._sid_rooms.get(sid, ()))
+        for room in rooms:
+            self.leave(room, sid)
+        return rooms
+
+    def replay_local(self):
+        """Re-announces every local membership (a new process asked for the current state)."""
+        for sid in list(self._local):
+            for room in self._sid_rooms.get(sid, ()):
+                self._notify("join", room, sid, self._rooms[room][sid])
+
+    def members(self, room: str) -> List[dict]:
+        return list(self._rooms.get(room, {}).values())
+
+    def member(self, room: str, sid: str) -> Optional[dict]:
+        return self._rooms.get(room, {}).get(sid)
+
+    def rooms_of(self, sid: str) -> Set[str]:
+        return set(self._sid_rooms.get(sid, ()))
+
+    def shares_room(self, sid: str, other_sid: str) -> bool:
+        return bool(self._sid_rooms.get(sid, set()) & self._sid_rooms.get(other_sid, set()))
+
+    def stats(self) -> dict:
+        return {
+            "rooms": len(self._rooms),
+            "connections": len(self._sid_rooms),
+            "largest_room": max((len(m) for m in self._rooms.values()), default=0),
+        }
+
+
+room_registry = RoomRegistry()
@@ -6,6 +6,7 @@ import jwt
 from fastapi import HTTPException, status
 
 from backend.core.config import settings
+from backend.core.hash_pool import password_pool
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
@@ -20,13 +21,31 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
 
-def create_access_token(subject: str, expires_delta: Optional[timedelta] = None) -> str:
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    """verify_password on the bounded bcrypt pool; use this from async endpoints."""
+    return await password_pool.run(verify_password, plain_password, hashed_password)
+
+
+async def get_password_hash_async(password: str) -> str:
+    return await password_pool.run(get_password_hash, password)
+
+
+def create_access_token(subject: str, expires_delta: Optional[timedelta] = None, claims: Optional[Dict[str, object]] = None) -> str:
     expire = datetime.utcnow() + (expires_delta or timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES))
-    to_encode: Dict[str, object] = {"sub": subject, "exp": expire}
+    to_encode: Dict[str, object] = dict(claims or {}, sub=subject, exp=expire)
     token = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return token
 
 
+def create_user_token(user, expires_delta: Optional[timedelta] = None) -> str:
+    """
+    Token for a User whose claims are enough to identify it (sub = user id, plus username,
+    name and role), so socket handshakes can authenticate without a DB lookup.
+    """
+    role = getattr(user.role, "value", user.role)
+    return create_access_token(user.id, expires_delta, {"username": user.username, "name": user.full_name, "role": role})
+
+
 # Robust exception resolution for different PyJWT versions
 try:
     ExpiredSignatureError = jwt.ExpiredSignatureError  # PyJWT common alias
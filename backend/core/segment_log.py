@@ -0,0 +1,174 @@
+"""
+Append-only segment log for live audio/video chunks.
+
+Instead of one file per chunk, every (classroom, sender) stream appends its chunks
+back to back into a few large rolling segment files:
+
+    uploads/live_audio/<classroom_id>/<sender_id>/000001.seg   raw chunk bytes
+    uploads/live_audio/<classroom_id>/<sender_id>/000001.idx   sidecar index
+
+Each sidecar index record is a fixed 28 byte struct (seq, timestamp_ms, offset, length),
+so a segment can be re-indexed without touching the database.
+LiveChunk rows store (file_path=segment, segment_offset, segment_length).
+
+Usage:
+- location = await live_logs["audio"].append(classroom_id, sender_id, seq, timestamp_ms, raw_bytes)
+- data = await read_chunk(location.segment_path, location.offset, location.length)
+- await close_room(classroom_id) when a class ends, await close_all() on shutdown.
+"""
+
+import asyncio
+import struct
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import aiofiles
+
+from backend.core.config import settings
+
+# seq, timestamp_ms, offset, length
+INDEX_RECORD = struct.Struct("<qqQI")
+
+SEGMENT_SUFFIX = ".seg"
+INDEX_SUFFIX = ".idx"
+
+
+@dataclass(frozen=True)
+class ChunkLocation:
+    segment_path: str
+    offset: int
+    length: int
+
+    def ffmpeg_source(self) -> str:
+        """ffmpeg input addressing this chunk's byte range (needs the subfile protocol whitelisted)."""
+        abs_path = Path(self.segment_path).resolve()
+        return f"subfile,,start,{self.offset},end,{self.offset + self.length},,:{abs_path}"
+
+
+class _StreamWriter:
+    """Owns the open segment of a single (classroom, sender) stream."""
+
+    def __init__(self, stream_dir: Path, max_bytes: int):
+        self.stream_dir = stream_dir
+        self.max_bytes = max_bytes
+        self.segment_path: Optional[Path] = None
+        self.size = 0
+        self._data = None
+        self._index = None
+        self._lock = asyncio.Lock()
+
+    def _next_segment_no(self) -> int:
+        # Continue numbering after a restart instead of overwriting older segments
+        existing = sorted(self.stream_dir.glob(f"*{SEGMENT_SUFFIX}"))
+        if not existing:
+            return 1
+        try:
+            return int(existing[-1].stem) + 1
+        except ValueError:
+            return len(existing) + 1
+
+    async def _roll(self):
+        await self._close_files()
+        self.stream_dir.mkdir(parents=True, exist_ok=True)
+        segment_no = self._next_segment_no()
+        self.segment_path = self.stream_dir / f"{segment_no:06d}{SEGMENT_SUFFIX}"
+        self._data = await aiofiles.open(self.segment_path, "ab")
+        self._index = await aiofiles.open(self.segment_path.with_suffix(INDEX_SUFFIX), "ab")
+        self.size = 0
+
+    async def append(self, seq: int, timestamp_ms: Optional[int], data: bytes) -> ChunkLocation:
+        async with self._lock:
+            if self._data is None or (self.size and self.size + len(data) > self.max_bytes):
+                await self._roll()
+
+            offset = self.size
+            # Pack the index record first: a seq/timestamp that does not fit must fail before
+            # any bytes reach the segment, or self.size and every later offset would drift
+            record = INDEX_RECORD.pack(int(seq), int(timestamp_ms or 0), offset, len(data))
+            await self._data.write(data)
+            # Flush (no fsync) so readers of the segment see the chunk straight away
+            await self._data.flush()
+            await self._index.write(record)
+            self.size += len(data)
+            return ChunkLocation(str(self.segment_path), offset, len(data))
+
+    async def _close_files(self):
+        for f in (self._data, self._index):
+            if f is not None:
+                try:
+                    await f.close()
+                except Exception:
+                    pass
+        self._data = None
+        self._index = None
+
+    async def close(self):
+        async with self._lock:
+            await self._close_files()
+
+
+class SegmentLog:
+    """Per-room, per-sender append-only segment log rooted at base_dir."""
+
+    def __init__(self, base_dir: Path, max_bytes: Optional[int] = None):
+        self.base_dir = Path(base_dir)
+        self.max_bytes = max_bytes or settings.LIVE_SEGMENT_MAX_BYTES
+        self._writers: Dict[Tuple[str, str], _StreamWriter] = {}
+
+    def _writer(self, classroom_id: str, sender_id: Optional[str]) -> _StreamWriter:
+        key = (classroom_id, sender_id or "anonymous")
+        writer = self._writers.get(key)
+        if writer is None:
+            writer = _StreamWriter(self.base_dir / key[0] / key[1], self.max_bytes)
+            self._writers[key] = writer
+        return writer
+
+    async def append(self, classroom_id: str, sender_id: Optional[str], seq: int, timestamp_ms: Optional[int], data: bytes) -> ChunkLocation:
+        return await self._writer(classroom_id, sender_id).append(seq, timestamp_ms, data)
+
+    async def close_room(self, classroom_id: str):
+        keys = [k for k in self._writers if k[0] == classroom_id]
+        for key in keys:
+            writer = self._writers.pop(key)
+            await writer.close()
+
+    async def close_all(self):
+        writers = list(self._writers.values())
+        self._writers.clear()
+        for writer in writers:
+            await writer.close()
+
+
+async def read_chunk(segment_path: str, offset: int, length: int) -> bytes:
+    async with aiofiles.open(segment_path, "rb") as f:
+        await f.seek(offset)
+        return await f.read(length)
+
+
+def read_index(segment_path: str) -> List[Tuple[int, int, int, int]]:
+    """Returns the (seq, timestamp_ms, offset, length) records of a segment's sidecar index."""
+    index_path = Path(segment_path).with_suffix(INDEX_SUFFIX)
+    if not index_path.exists():
+        return []
+    raw = index_path.read_bytes()
+    usable = len(raw) - (len(raw) % INDEX_RECORD.size)  # ignore a torn trailing record
+    return [INDEX_RECORD.unpack_from(raw, pos) for pos in range(0, usable, INDEX_RECORD.size)]
+
+
+# Shared logs used by the socket handlers and the recording merge
+UPLOAD_DIR = Path("uploads")
+live_logs: Dict[str, SegmentLog] = {
+    "audio": SegmentLog(UPLOAD_DIR / "live_audio"),
+    "video": SegmentLog(UPLOAD_DIR / "live_video"),
+}
+
+
+async def close_room(classroom_id: str):
+    for log in live_logs.values():
+        await log.close_room(classroom_id)
+
+
+async def close_all():
+    for log in live_logs.values():
+        await log.close_all()
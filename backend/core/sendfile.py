@@ -0,0 +1,81 @@
+"""
+Body senders for file downloads (FileResponse subclasses in core/http_cache.py, the /uploads mount).
+
+Starlette reads files in 64 KiB blocks through a worker thread and sends each block as an
+http.response.body message, so every GB served costs ~16k thread hops and copies through
+Python. For bodies of at least SENDFILE_MIN_BYTES, send_file_body() instead uses the best
+ASGI extension the server offers:
+
+- http.response.zerocopysend: the server calls os.sendfile() on our file descriptor for
+  any offset/count (full files, single ranges and multipart parts alike);
+- http.response.pathsend: the server sends the whole file by path (full responses only);
+- neither (e.g. uvicorn): blocks of SENDFILE_CHUNK_BYTES, cutting the per-block overhead.
+
+Smaller bodies keep the 64 KiB loop, where a syscall-level handoff gains nothing.
+
+Usage:
+    await send({"type": "http.response.start", ...})
+    await send_file_body(send, scope.get("extensions", {}), path, start, end)
+"""
+
+from collections import Counter
+
+import anyio
+
+from backend.core.config import settings
+
+ZEROCOPYSEND = "http.response.zerocopysend"
+PATHSEND = "http.response.pathsend"
+SMALL_CHUNK_BYTES = 64 * 1024
+
+# Metrics: responses and bytes per mode
+_responses: Counter = Counter()
+_bytes: Counter = Counter()
+
+
+def _mode(extensions: dict, start: int, end: int, whole_file: bool, more_body: bool) -> str:
+    if end - start < settings.SENDFILE_MIN_BYTES:
+        return "small"
+    if ZEROCOPYSEND in extensions:
+        return "zerocopysend"
+    if PATHSEND in extensions and whole_file and not more_body:
+        return "pathsend"
+    return "chunked"
+
+
+async def send_file_body(send, extensions: dict, path, start: int, end: int, file_size: int = -1, more_body: bool = False):
+    """Sends bytes [start, end) of path as the response body (more_body=True leaves it open)."""
+    mode = _mode(extensions or {}, start, end, start == 0 and end == file_size, more_body)
+    _responses[mode] += 1
+    _bytes[mode] += end - start
+
+    if mode == "pathsend":
+        await send({"type": PATHSEND, "path": str(path)})
+        return
+
+    if mode == "zerocopysend":
+        file = await anyio.to_thread.run_sync(open, path, "rb")
+        try:
+            await send({"type": ZEROCOPYSEND, "file": file, "offset": start, "count": end - start, "more_body": more_body})
+        finally:
+            await anyio.to_thread.run_sync(file.close)
+        return
+
+    block_size = SMALL_CHUNK_BYTES if mode == "small" else settings.SENDFILE_CHUNK_BYTES
+    async with await anyio.open_file(path, mode="rb") as file:
+        await file.seek(start)
+        while True:
+            chunk = await file.read(min(block_size, end - start))
+            start += len(chunk)
+            last = not chunk or start >= end
+            await send({"type": "http.response.body", "body": chunk, "more_body": more_body or not last})
+            if last:
+                return
+
+
+def sendfile_stats() -> dict:
+    return {
+        "min_bytes": settings.SENDFILE_MIN_BYTES,
+        "responses": dict(_responses),
+        "bytes": dict(_bytes),
+    }
@@ -1,15 +1,30 @@
 import socketio
 
+from backend.core.config import settings
+from backend.core.socket_pubsub import create_client_manager
+
 # Define the allowed origins explicitly for the WebSocket connection
 origins = [
     "http://localhost:5173",
     "http://127.0.0.1:5173"
 ]
 
+# In-process by default; set SOCKETIO_MESSAGE_QUEUE to share rooms across worker processes
+# (sticky-session requirements are described in backend/core/socket_pubsub.py)
+client_manager = create_client_manager(settings.SOCKETIO_MESSAGE_QUEUE, channel=settings.SOCKETIO_CHANNEL)
+
 sio = socketio.AsyncServer(
     async_mode="asgi",
+    client_manager=client_manager,
     # ⚡ CRITICAL FIX: Explicitly allow the Vite URL
     cors_allowed_origins=origins,
     logger=True,
     engineio_logger=True
-)
\ No newline at end of file
+)
+
+
+def start_client_manager():
+    """Starts the message-queue listener now instead of on the first connection."""
+    if not sio.manager_initialized:
+        sio.manager_initialized = True
+        sio.manager.initialize()
@@ -0,0 +1,206 @@
+"""
+Pluggable Socket.IO client managers for running several server processes.
+
+SOCKETIO_MESSAGE_QUEUE selects how room emits reach sockets held by other processes:
+
+    ""                          in-process only (default, single worker)
+    redis://host:6379/0         Redis / Valkey pub/sub (requires the `redis` package;
+    valkey://..., rediss://...  any Redis-compatible server works)
+    unix:///run/vlink-sio.sock  the bundled UNIX-socket broker (no extra dependency):
+                                python -m backend.core.socket_pubsub /run/vlink-sio.sock
+
+Room presence (backend/core/room_registry.py) rides on the same channel: every process
+publishes its local joins/leaves and applies the others', so member lists are global.
+
+Sticky sessions: a Socket.IO connection and its session live in the process that
+accepted the handshake. Clients that use only the websocket transport need nothing more.
+If the HTTP long-polling fallback stays enabled, every request of one connection must hit
+the same process. `uvicorn --workers N` cannot guarantee that, so run one uvicorn per port
+behind a balancer with affinity (nginx `ip_hash` / `hash $arg_sid`, HAProxy `balance source`
+or a cookie), or force `transports: ['websocket']` on the client.
+
+Per-room live state (event seq counter, media relay ring, chunk cache, recorder) is still
+held by the process that receives a room's events, so keep a class's publishers on one
+worker (e.g. balance on the classroom id) when running more than one.
+"""
+
+import asyncio
+import logging
+import os
+import struct
+import sys
+from typing import Optional, Set
+from urllib.parse import urlparse
+
+import socketio
+from socketio.async_pubsub_manager import AsyncPubSubManager
+from engineio import json
+
+from backend.core.room_registry import room_registry
+
+logger = logging.getLogger(__name__)
+
+_FRAME = struct.Struct("<I")
+_ROLE_PUBLISH = b"P"
+_ROLE_SUBSCRIBE = b"S"
+_PRESENCE = "presence"
+_presence_tasks: Set[asyncio.Task] = set()
+
+
+async def _read_frame(reader: asyncio.StreamReader) -> bytes:
+    (length,) = _FRAME.unpack(await reader.readexactly(_FRAME.size))
+    return await reader.readexactly(length)
+
+
+def _frame(data: bytes) -> bytes:
+    return _FRAME.pack(len(data)) + data
+
+
+class PresenceMixin:
+    """Shares room_registry joins/leaves between processes over the manager's channel."""
+
+    def initialize(self):
+        super().initialize()
+        if not self.write_only:
+            room_registry.subscribe(self._publish_presence)
+            # Once our subscription is up, ask the running processes to re-announce their members
+            asyncio.get_event_loop().call_later(1, self._publish_presence, "sync", "", "", None)
+
+    def _publish_presence(self, op: str, room: str, sid: str, info: Optional[dict]):
+        message = {"method": _PRESENCE, "host_id": self.host_id, "op": op, "room": room, "sid": sid, "info": info}
+        task = asyncio.ensure_future(self._publish(message))
+        # Keep a reference until the publish is done (the loop only holds tasks weakly)
+        _presence_tasks.add(task)
+        task.add_done_callback(_presence_tasks.discard)
+
+    async def _listen(self):
+        async for message in super()._listen():
+            data = message
+            if not isinstance(data, dict):
+                try:
+                    data = json.loads(message)
+                except Exception:
+                    yield message
+                    continue
+            if data.get("method") != _PRESENCE:
+                yield data
+            elif data.get("host_id") != self.host_id:
+                if data["op"] == "join":
+                    room_registry.join(data["room"], data["sid"], data.get("info"), publish=False)
+                elif data["op"] == "leave":
+                    room_registry.leave(data["room"], data["sid"], publish=False)
+                elif data["op"] == "sync":
+                    room_registry.replay_local()
+
+
+class UnixSocketManager(AsyncPubSubManager):
+    """Client manager that publishes through the UNIX-socket broker below."""
+
+    name = "unix"
+
+    def __init__(self, url: str, channel: str = "socketio", write_only: bool = False, logger=None):
+        super().__init__(channel=channel, write_only=write_only, logger=logger)
+        self.path = urlparse(url).path
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._connect_lock = asyncio.Lock()
+
+    async def _connect(self, role: bytes):
+        reader, writer = await asyncio.open_unix_connection(self.path)
+        writer.write(role + _frame(self.channel.encode("utf-8")))
+        await writer.drain()
+        return reader, writer
+
+    async def _publish(self, data):
+        payload = _frame(json.dumps(data).encode("utf-8"))
+        for attempt in range(2):
+            try:
+                async with self._connect_lock:
+                    if self._writer is None or self._writer.is_closing():
+                        _, self._writer = await self._connect(_ROLE_PUBLISH)
+                self._writer.write(payload)
+                await self._writer.drain()
+                return
+            except (ConnectionError, OSError) as e:
+                self._writer = None
+                if attempt:
+                    logger.error(f"[SocketIO] Publish to {self.path} failed: {e}")
+
+    async def _listen(self):
+        retry_sleep = 1
+        while True:
+            try:
+                reader, writer = await self._connect(_ROLE_SUBSCRIBE)
+                retry_sleep = 1
+                try:
+                    while True:
+                        yield await _read_frame(reader)
+                finally:
+                    writer.close()
+            except (ConnectionError, OSError, asyncio.IncompleteReadError) as e:
+                logger.error(f"[SocketIO] Broker {self.path} unavailable ({e}); retrying in {retry_sleep}s")
+                await asyncio.sleep(retry_sleep)
+                retry_sleep = min(retry_sleep * 2, 60)
+
+
+class UnixPresenceManager(PresenceMixin, UnixSocketManager):
+    pass
+
+
+def create_client_manager(url: str, channel: str = "socketio", write_only: bool = False):
+    """Returns the client manager for SOCKETIO_MESSAGE_QUEUE (None = in-process default)."""
+    if not url:
+        return None
+    scheme = urlparse(url).scheme.split("+", 1)[0].lower()
+    if scheme == "unix":
+        return UnixPresenceManager(url, channel=channel, write_only=write_only)
+    if scheme in ("redis", "rediss", "valkey", "valkeys"):
+        class RedisPresenceManager(PresenceMixin, socketio.AsyncRedisManager):
+            pass
+        return RedisPresenceManager(url, channel=channel, write_only=write_only)
+    raise ValueError(f"Unsupported SOCKETIO_MESSAGE_QUEUE scheme: {scheme}")
+
+
+# --- Broker ---
+
+class Broker:
+    """Fans every published frame out to all subscribers of the same channel."""
+
+    def __init__(self):
+        self._subscribers = {}
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            role = await reader.readexactly(1)
+            channel = (await _read_frame(reader)).decode("utf-8")
+            if role == _ROLE_SUBSCRIBE:
+                subscribers: Set[asyncio.StreamWriter] = self._subscribers.setdefault(channel, set())
+                subscribers.add(writer)
+                try:
+                    await reader.read()  # subscribers never send; returns on disconnect
+                finally:
+                    subscribers.discard(writer)
+                return
+            while True:
+                frame = _frame(await _read_frame(reader))
+                for subscriber in list(self._subscribers.get(channel, ())):
+                    subscriber.write(frame)
+                    # A subscriber that stops reading must not stall the whole channel
+                    if subscriber.transport.get_write_buffer_size() > 64 * 1024 * 1024:
+                        subscriber.close()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self, path: str):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = await asyncio.start_unix_server(self._handle, path=path)
+        logger.info(f"[SocketIO] Broker listening on {path}")
+        async with server:
+            await server.serve_forever()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(Broker().serve(sys.argv[1] if len(sys.argv) > 1 else "/tmp/vlink-socketio.sock"))
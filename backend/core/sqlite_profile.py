@@ -0,0 +1,67 @@
+"""
+SQLite performance profile shared by backend/core/database.py and backendv2/core/database.py.
+
+SQLite allows one writer at a time. With default settings (rollback journal, no busy
+timeout) concurrent chunk/event writes fail with "database is locked" and readers block
+writers. The profile applies, per connection:
+
+    journal_mode   WAL     (readers never block the writer and vice versa)
+    synchronous    NORMAL  (fsync at checkpoints only; safe with WAL)
+    busy_timeout   ms to wait for a lock held by another process (e.g. a job worker)
+    cache_size     page cache per connection, in KiB
+    mmap_size      bytes of the file memory-mapped for reads
+    temp_store     MEMORY
+
+and splits access into two engines:
+
+- a writer engine with exactly one connection, so every write in this process is
+  serialized in the pool instead of racing for SQLite's lock;
+- a reader engine with SQLITE_READ_POOL_SIZE `query_only` connections for read paths.
+
+For non-SQLite URLs sqlite_engine_kwargs() returns no overrides and the profile is a no-op.
+"""
+
+from typing import Any, Dict
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+
+def is_sqlite(url: str) -> bool:
+    return url.startswith("sqlite")
+
+
+def sqlite_engine_kwargs(settings, writer: bool) -> Dict[str, Any]:
+    if not is_sqlite(settings.DATABASE_URL):
+        return {}
+    if writer:
+        return {"pool_size": 1, "max_overflow": 0, "pool_timeout": settings.SQLITE_WRITER_TIMEOUT_S}
+    return {"pool_size": settings.SQLITE_READ_POOL_SIZE, "max_overflow": 0}
+
+
+def apply_sqlite_profile(engine: AsyncEngine, settings, read_only: bool = False):
+    """Registers a connect hook that applies the configured pragmas to every new connection."""
+    if engine.dialect.name != "sqlite":
+        return
+
+    pragmas = [
+        f"PRAGMA busy_timeout = {int(settings.SQLITE_BUSY_TIMEOUT_MS)}",
+        f"PRAGMA synchronous = {settings.SQLITE_SYNCHRONOUS}",
+        f"PRAGMA cache_size = -{int(settings.SQLITE_CACHE_SIZE_KB)}",
+        f"PRAGMA mmap_size = {int(settings.SQLITE_MMAP_SIZE)}",
+        "PRAGMA temp_store = MEMORY",
+    ]
+    if read_only:
+        pragmas.append("PRAGMA query_only = ON")
+    else:
+        # journal_mode is persistent in the database file; the writer sets it
+        pragmas.insert(0, f"PRAGMA journal_mode = {settings.SQLITE_JOURNAL_MODE}")
+
+    @event.listens_for(engine.sync_engine, "connect")
+    def _on_connect(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        try:
+            for pragma in pragmas:
+                cursor.execute(pragma)
+        finally:
+            cursor.close()
@@ -0,0 +1,194 @@
+"""
+Stroke codec for whiteboard payloads (pen_event / draw_data).
+
+Every numeric `points` array found in a payload (at any depth, e.g. payload["points"] or
+payload["line"]["points"]) is quantized to 1/scale px, delta-encoded per coordinate and
+packed as zigzag varints:
+
+    varint  version (STROKE_VERSION)
+    varint  shape   (0 = flat [x0, y0, x1, y1, ...], 1 = nested [[x0, y0], [x1, y1], ...])
+    varint  stride  (coordinates per point; deltas are taken against the previous point)
+    varint  scale
+    varint  count   (number of coordinates)
+    varint* zigzag(q[i] - q[i - stride])
+
+and replaced by the envelope {"codec": PACKED, "scale": N, "data": <bytes | base64 str>}.
+
+Clients pick a codec per connection (socket event `stroke_codec`):
+- "json" (default): points arrive as plain numbers (already quantized).
+- PACKED: points arrive as the envelope, with `data` as a binary attachment on live
+  broadcasts and as base64 in JSON responses (sync / REST).
+
+EventLog.payload stores the packed form (base64), so stored rows shrink as well.
+"""
+
+import base64
+import math
+from typing import Any, List, Optional
+
+from backend.core.config import settings
+
+STROKE_VERSION = 1
+PLAIN = "json"
+PACKED = "qdv1"  # quantized, delta, varint
+CODECS = (PACKED, PLAIN)  # in order of preference
+
+_SHAPE_FLAT = 0
+_SHAPE_NESTED = 1
+
+
+def _write_varint(out: bytearray, value: int):
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def _read_varint(data: bytes, pos: int):
+    result = shift = 0
+    while True:
+        if pos >= len(data):
+            raise ValueError("Truncated varint")
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return result, pos
+        shift += 7
+
+
+def _is_number(v) -> bool:
+    return isinstance(v, (int, float)) and not isinstance(v, bool)
+
+
+def _flatten(points: list):
+    """
+    Returns (shape, stride, flat coordinates) or None if `points` is not a numeric point list.
+    Raises ValueError for NaN/Infinity (accepted by Python's json, not storable as JSON).
+    """
+    if not points:
+        return None
+    if all(_is_number(v) for v in points):
+        shape, stride, values = _SHAPE_FLAT, 2 if len(points) % 2 == 0 else 1, points
+    elif all(isinstance(p, (list, tuple)) for p in points):
+        stride = len(points[0])
+        if not (stride and all(len(p) == stride and all(_is_number(v) for v in p) for p in points)):
+            return None
+        shape, values = _SHAPE_NESTED, [v for p in points for v in p]
+    else:
+        return None
+    if not all(math.isfinite(v) for v in values):
+        raise ValueError("Non-finite coordinate in point list")
+    return shape, stride, values
+
+
+def encode_points(points: list, scale: Optional[int] = None) -> bytes:
+    """Packs a numeric point list. Raises ValueError if it is not one."""
+    flat = _flatten(points)
+    if flat is None:
+        raise ValueError("Not a numeric point list")
+    shape, stride, values = flat
+    scale = scale or settings.STROKE_QUANT_SCALE
+
+    out = bytearray()
+    for header in (STROKE_VERSION, shape, stride, scale, len(values)):
+        _write_varint(out, header)
+    prev = [0] * stride
+    for i, v in enumerate(values):
+        q = int(round(v * scale))
+        delta = q - prev[i % stride]
+        prev[i % stride] = q
+        _write_varint(out, delta << 1 if delta >= 0 else ((-delta) << 1) - 1)
+    return bytes(out)
+
+
+def decode_points(data: bytes) -> list:
+    """Inverse of encode_points (values come back quantized). Raises ValueError on bad input."""
+    version, pos = _read_varint(data, 0)
+    if version != STROKE_VERSION:
+        raise ValueError(f"Unsupported stroke version {version}")
+    shape, pos = _read_varint(data, pos)
+    stride, pos = _read_varint(data, pos)
+    scale, pos = _read_varint(data, pos)
+    count, pos = _read_varint(data, pos)
+    if not stride or not scale:
+        raise ValueError("Invalid stroke header")
+
+    values: List[Any] = []
+    prev = [0] * stride
+    for i in range(count):
+        zz, pos = _read_varint(data, pos)
+        prev[i % stride] += (zz >> 1) ^ -(zz & 1)
+        q = prev[i % stride]
+        values.append(q if scale == 1 else q / scale)
+    if shape == _SHAPE_NESTED:
+        return [values[i:i + stride] for i in range(0, len(values), stride)]
+    return values
+
+
+def _is_envelope(value) -> bool:
+    return isinstance(value, dict) and value.get("codec") == PACKED and "data" in value
+
+
+def pack_payload(payload: Any, scale: Optional[int] = None) -> Any:
+    """Returns a copy of payload with every numeric `points` array packed (data as bytes)."""
+    if isinstance(payload, dict):
+        packed = {}
+        for key, value in payload.items():
+            if key == "points" and isinstance(value, list) and _flatten(value) is not None:
+                value = {"codec": PACKED, "scale": scale or settings.STROKE_QUANT_SCALE, "data": encode_points(value, scale)}
+            elif not _is_envelope(value):
+                value = pack_payload(value, scale)
+            packed[key] = value
+        return packed
+    if isinstance(payload, list):
+        return [pack_payload(v, scale) for v in payload]
+    return payload
+
+
+def unpack_payload(payload: Any) -> Any:
+    """Returns a copy of payload with every envelope decoded back to plain numbers."""
+    if _is_envelope(payload):
+        data = payload["data"]
+        if isinstance(data, str):
+            data = base64.b64decode(data)
+        return decode_points(bytes(data))
+    if isinstance(payload, dict):
+        return {k: unpack_payload(v) for k, v in payload.items()}
+    if isinstance(payload, list):
+        return [unpack_payload(v) for v in payload]
+    return payload
+
+
+def to_storable(payload: Any) -> Any:
+    """JSON-safe form of a packed payload (envelope data as base64), used for EventLog rows."""
+    if _is_envelope(payload):
+        data = payload["data"]
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            data = base64.b64encode(bytes(data)).decode("ascii")
+        return dict(payload, data=data)
+    if isinstance(payload, dict):
+        return {k: to_storable(v) for k, v in payload.items()}
+    if isinstance(payload, list):
+        return [to_storable(v) for v in payload]
+    return payload
+
+
+def for_codec(payload: Any, codec: Optional[str]) -> Any:
+    """Renders a stored (packed, base64) payload for a client that negotiated `codec`."""
+    return payload if codec == PACKED else unpack_payload(payload)
+
+
+def negotiate(offered) -> str:
+    """Picks the preferred codec among those a client offers (a name or a list of names)."""
+    if isinstance(offered, str):
+        offered = [offered]
+    for codec in CODECS:
+        if codec in (offered or ()):
+            return codec
+    return PLAIN
+
+
+def codec_room(room: str, codec: Optional[str]) -> str:
+    """Sub-room joined next to `room` so a broadcast is encoded once per codec, not per client."""
+    return f"{room}#{codec or PLAIN}"
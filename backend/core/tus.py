@@ -0,0 +1,210 @@
+"""
+Resumable uploads (tus 1.0.0: core + creation, creation-with-upload, expiration, termination).
+
+An upload is a `<id>.part` file that PATCH requests write at the client's Upload-Offset,
+plus a `<id>.info` JSON sidecar holding the offset, declared length, metadata, owner and
+expiry. A dropped connection keeps every byte already written: the client asks HEAD for
+the offset and continues from there. When the offset reaches the length the caller hands
+the part file to the blob store, which renames it into place (no second copy).
+
+Uploads not touched for TUS_EXPIRY_S are removed by the reaper (start_tus_reaper()).
+Locks are per process; with several workers, route /api/files/tus/<id> stickily.
+
+Usage:
+    upload = tus_store.create(length, metadata, owner_id)
+    async with tus_store.lock(upload.id):
+        upload = await tus_store.append(upload, offset, request.stream())
+    if upload.complete: await blob_store.put(db, StoredUpload(tus_store.part_path(upload.id), ...))
+"""
+
+import asyncio
+import base64
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import AsyncIterator, Dict, Optional
+
+import aiofiles
+
+from backend.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+TUS_VERSION = "1.0.0"
+TUS_EXTENSIONS = "creation,creation-with-upload,expiration,termination"
+# Response headers browsers may read cross-origin (CORS expose_headers)
+TUS_EXPOSED_HEADERS = [
+    "Location", "Tus-Resumable", "Tus-Version", "Tus-Extension", "Tus-Max-Size",
+    "Upload-Offset", "Upload-Length", "Upload-Metadata", "Upload-Expires", "Vlink-File-Id",
+]
+
+_reaper_task: Optional[asyncio.Task] = None
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class OffsetMismatch(Exception):
+    pass
+
+
+@dataclass
+class TusUpload:
+    id: str
+    length: int
+    owner_id: str
+    metadata: Dict[str, str] = field(default_factory=dict)
+    offset: int = 0
+    expires_at: float = 0.0
+    file_id: Optional[str] = None  # FileResource id once the upload is finalized
+
+    @property
+    def complete(self) -> bool:
+        return self.offset >= self.length
+
+
+def parse_metadata(header: Optional[str]) -> Dict[str, str]:
+    """Upload-Metadata: comma-separated "key base64(value)" pairs; the value may be omitted."""
+    metadata = {}
+    for pair in (header or "").split(","):
+        parts = pair.strip().split(" ", 1)
+        if not parts[0]:
+            continue
+        value = base64.b64decode(parts[1]).decode("utf-8", "replace") if len(parts) > 1 else ""
+        metadata[parts[0]] = value
+    return metadata
+
+
+def format_metadata(metadata: Dict[str, str]) -> str:
+    return ",".join(f"{k} {base64.b64encode(v.encode()).decode()}" for k, v in metadata.items())
+
+
+class TusStore:
+    def __init__(self, root: Optional[Path] = None, expiry_s: Optional[int] = None, max_size: Optional[int] = None):
+        self.root = Path(root or settings.TUS_UPLOAD_DIR)
+        self.root.mkdir(parents=True, exist_ok=True)
+        self.expiry_s = expiry_s or settings.TUS_EXPIRY_S
+        self.max_size = max_size or settings.TUS_MAX_SIZE
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+        # Metrics
+        self.created = 0
+        self.completed = 0
+        self.expired = 0
+        self.bytes_received = 0
+
+    def part_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.part"
+
+    def _info_path(self, upload_id: str) -> Path:
+        return self.root / f"{upload_id}.info"
+
+    def save(self, upload: TusUpload):
+        tmp = self._info_path(upload.id).with_suffix(".tmp")
+        tmp.write_text(json.dumps(asdict(upload)))
+        os.replace(tmp, self._info_path(upload.id))  # atomic: a crash never leaves half an .info
+
+    def create(self, length: int, metadata: Dict[str, str], owner_id: str) -> TusUpload:
+        if length > self.max_size:
+            raise UploadTooLarge(length)
+        upload = TusUpload(id=uuid.uuid4().hex, length=length, owner_id=owner_id, metadata=metadata,
+                           expires_at=time.time() + self.expiry_s)
+        self.part_path(upload.id).touch()
+        self.save(upload)
+        self.created += 1
+        return upload
+
+    def get(self, upload_id: str) -> Optional[TusUpload]:
+        if not upload_id.isalnum():
+            return None
+        try:
+            upload = TusUpload(**json.loads(self._info_path(upload_id).read_text()))
+        except (OSError, ValueError, TypeError):
+            return None
+        if upload.expires_at <= time.time():
+            return None
+        return upload
+
+    def lock(self, upload_id: str) -> asyncio.Lock:
+        return self._locks.setdefault(upload_id, asyncio.Lock())
+
+    async def append(self, upload: TusUpload, offset: int, chunks: AsyncIterator[bytes]) -> TusUpload:
+        """Writes the request body at `offset`. Bytes received before a disconnect are kept."""
+        if offset != upload.offset:
+            raise OffsetMismatch(upload.offset)
+        try:
+            # r+b: the part file may hold bytes past the recorded offset from an interrupted
+            # write before a crash; they are overwritten and truncated below
+            async with aiofiles.open(self.part_path(upload.id), "r+b") as out:
+                await out.seek(offset)
+                async for chunk in chunks:
+                    if upload.offset + len(chunk) > upload.length:
+                        raise UploadTooLarge(upload.offset + len(chunk))
+                    await out.write(chunk)
+                    upload.offset += len(chunk)
+                    self.bytes_received += len(chunk)
+                await out.truncate(upload.offset)
+        finally:
+            upload.expires_at = time.time() + self.expiry_s
+            self.save(upload)
+        if upload.complete:
+            self.completed += 1
+        return upload
+
+    def delete(self, upload_id: str):
+        for path in (self.part_path(upload_id), self._info_path(upload_id)):
+            path.unlink(missing_ok=True)
+        self._locks.pop(upload_id, None)
+
+    def reap_expired(self) -> int:
+        removed = 0
+        now = time.time()
+        for info in self.root.glob("*.info"):
+            try:
+                expires_at = json.loads(info.read_text()).get("expires_at", 0)
+            except (OSError, ValueError):
+                expires_at = 0
+            upload_id = info.stem
+            lock = self._locks.get(upload_id)
+            if expires_at <= now and not (lock and lock.locked()):
+                self.delete(upload_id)
+                removed += 1
+        self.expired += removed
+        return removed
+
+    def stats(self) -> dict:
+        return {
+            "active": sum(1 for _ in self.root.glob("*.info")),
+            "created": self.created,
+            "completed": self.completed,
+            "expired": self.expired,
+            "bytes_received": self.bytes_received,
+        }
+
+
+tus_store = TusStore()
+
+
+async def _reaper():
+    while True:
+        await asyncio.sleep(settings.TUS_REAP_INTERVAL_S)
+        try:
+            removed = tus_store.reap_expired()
+            if removed:
+                logger.info(f"[Tus] Removed {removed} expired uploads")
+        except Exception as e:
+            logger.error(f"[Tus] Reaper failed: {e}")
+
+
+def start_tus_reaper(loop: Optional[asyncio.AbstractEventLoop] = None):
+    global _reaper_task
+    if _reaper_task and not _reaper_task.done():
+        return _reaper_task
+    loop = loop or asyncio.get_event_loop()
+    _reaper_task = loop.create_task(_reaper())
+    return _reaper_task
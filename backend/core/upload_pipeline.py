@@ -0,0 +1,229 @@
+"""
+Shared streaming stage for uploaded files.
+
+store_upload() copies an UploadFile to its destination in UPLOAD_BUFFER_BYTES blocks on
+the upload_io_pool threads. Each block is read, hashed and written in one thread hop, so
+the event loop never runs file I/O or SHA-256, and the body is never held in memory as a
+whole (Starlette spools large multipart parts to a temporary file).
+
+Quotas are enforced while the bytes flow: a QuotaReservation starts from the bytes a user
+and a class already store and counts what uploads in flight in this process have written
+so far. A block that crosses either limit aborts the copy, removes the partial file and
+raises QuotaExceeded.
+
+Stored bytes are physical, not logical: content in the blob store counts once per user and
+once per class however many files reference it (distinct blob_sha256), so linking the same
+PDF to five sections, or /api/files/dedupe, does not charge the uploader five times. Files
+stored before the blob store count by their own size_bytes.
+
+Usage:
+    async with upload_quota.reserve(user_id, classroom_id) as reservation:
+        stored = await store_upload(upload_file, dest, reservation)
+        ... persist FileResource(size_bytes=stored.size, sha256=stored.sha256) ...
+"""
+
+import hashlib
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Optional
+
+from fastapi import UploadFile
+from sqlalchemy import exists, func
+from sqlalchemy.future import select
+
+from backend.core.config import settings
+from backend.core.database import ReadSessionLocal
+from backend.core.hash_pool import BoundedExecutor
+from backend.db.models import Blob, FileResource
+
+upload_io_pool = BoundedExecutor(max_workers=settings.UPLOAD_IO_WORKERS, name="upload")
+
+
+class QuotaExceeded(Exception):
+    def __init__(self, scope: str, limit: int):
+        super().__init__(f"{scope} upload quota of {limit} bytes exceeded")
+        self.scope = scope
+        self.limit = limit
+
+
+@dataclass(frozen=True)
+class StoredUpload:
+    path: Path
+    size: int
+    sha256: str
+
+
+class QuotaReservation:
+    def __init__(self, quota: "UploadQuota", user_id: str, classroom_id: Optional[str], user_used: int, class_used: int):
+        self.quota = quota
+        self.user_id = user_id
+        self.classroom_id = classroom_id
+        self.user_used = user_used
+        self.class_used = class_used
+        self.user_reserved = 0
+        self.class_reserved = 0
+
+    def check(self, nbytes: int, user: bool = True, klass: bool = True):
+        """
+        Raises QuotaExceeded if nbytes more would cross the user or class limit. user/klass
+        False skips a scope that already stores this content.
+        """
+        q = self.quota
+        if user and q.user_limit and self.user_used + q.inflight_users[self.user_id] + nbytes > q.user_limit:
+            raise QuotaExceeded("user", q.user_limit)
+        if klass and self.classroom_id and q.class_limit and self.class_used + q.inflight_classes[self.classroom_id] + nbytes > q.class_limit:
+            raise QuotaExceeded("class", q.class_limit)
+
+    def add(self, nbytes: int, user: bool = True, klass: bool = True):
+        """Accounts nbytes more for this upload; raises QuotaExceeded instead of crossing a limit."""
+        self.check(nbytes, user, klass)
+        q = self.quota
+        if user:
+            q.inflight_users[self.user_id] += nbytes
+            self.user_reserved += nbytes
+        if klass and self.classroom_id:
+            q.inflight_classes[self.classroom_id] += nbytes
+            self.class_reserved += nbytes
+
+    def release(self):
+        q = self.quota
+        q.inflight_users[self.user_id] -= self.user_reserved
+        if q.inflight_users[self.user_id] <= 0:
+            del q.inflight_users[self.user_id]
+        if self.classroom_id:
+            q.inflight_classes[self.classroom_id] -= self.class_reserved
+            if q.inflight_classes[self.classroom_id] <= 0:
+                del q.inflight_classes[self.classroom_id]
+        self.user_reserved = self.class_reserved = 0
+
+
+def _stored_bytes(scope):
+    """Physical bytes stored under `scope`: each referenced blob once, plus pre-blob files."""
+    blobs = select(func.coalesce(func.sum(Blob.size_bytes), 0)).where(
+        Blob.sha256.in_(select(FileResource.blob_sha256).where(scope, FileResource.blob_sha256.isnot(None)))
+    )
+    legacy = select(func.coalesce(func.sum(FileResource.size_bytes), 0)).where(scope, FileResource.blob_sha256.is_(None))
+    return blobs.scalar_subquery() + legacy.scalar_subquery()
+
+
+class UploadQuota:
+    def __init__(self, user_limit: Optional[int] = None, class_limit: Optional[int] = None):
+        self.user_limit = settings.UPLOAD_QUOTA_USER_BYTES if user_limit is None else user_limit
+        self.class_limit = settings.UPLOAD_QUOTA_CLASS_BYTES if class_limit is None else class_limit
+        self.inflight_users: Dict[str, int] = defaultdict(int)
+        self.inflight_classes: Dict[str, int] = defaultdict(int)
+        self.rejected = 0
+
+    async def usage(self, user_id: str, classroom_id: Optional[str]) -> tuple:
+        """Bytes stored by the user and in the class (user uploads only; recordings are not counted)."""
+        async with ReadSessionLocal() as db:
+            result = await db.execute(select(_stored_bytes(FileResource.uploaded_by == user_id)))
+            user_used = result.scalar()
+            class_used = 0
+            if classroom_id:
+                result = await db.execute(
+                    select(_stored_bytes((FileResource.classroom_id == classroom_id) & FileResource.uploaded_by.isnot(None)))
+                )
+                class_used = result.scalar()
+        return int(user_used), int(class_used)
+
+    async def stores(self, user_id: str, classroom_id: Optional[str], sha256: str) -> tuple:
+        """Whether the user, and the class, already reference this content (so it costs them nothing)."""
+        has_blob = FileResource.blob_sha256 == sha256.lower()
+        async with ReadSessionLocal() as db:
+            result = await db.execute(select(exists().where(has_blob, FileResource.uploaded_by == user_id)))
+            user_has = bool(result.scalar())
+            class_has = False
+            if classroom_id:
+                result = await db.execute(
+                    select(exists().where(has_blob, FileResource.classroom_id == classroom_id, FileResource.uploaded_by.isnot(None)))
+                )
+                class_has = bool(result.scalar())
+        return user_has, class_has
+
+    @asynccontextmanager
+    async def reserve(self, user_id: str, classroom_id: Optional[str], expected: int = 0, sha256: Optional[str] = None):
+        """
+        Yields a QuotaReservation. Keep the block open until the FileResource row is committed,
+        so its bytes are never counted twice nor missed. `expected` reserves a size known
+        upfront (an assembled tus upload) instead of counting blocks through store_upload();
+        with the content's `sha256` it is not charged to a user or class already storing it.
+        """
+        user_used, class_used = await self.usage(user_id, classroom_id)
+        reservation = QuotaReservation(self, user_id, classroom_id, user_used, class_used)
+        try:
+            if expected:
+                user_has, class_has = await self.stores(user_id, classroom_id, sha256) if sha256 else (False, False)
+                reservation.add(expected, user=not user_has, klass=not class_has)
+            yield reservation
+        except QuotaExceeded:
+            self.rejected += 1
+            raise
+        finally:
+            reservation.release()
+
+    def stats(self) -> dict:
+        return {
+            "user_limit": self.user_limit,
+            "class_limit": self.class_limit,
+            "inflight_bytes": sum(self.inflight_users.values()),
+            "inflight_uploads_users": len(self.inflight_users),
+            "rejected": self.rejected,
+        }
+
+
+upload_quota = UploadQuota()
+
+
+def _copy_block(src, dst, hasher, block_size: int) -> int:
+    block = src.read(block_size)
+    if block:
+        hasher.update(block)  # hashlib releases the GIL for large buffers
+        dst.write(block)
+    return len(block)
+
+
+def _hash_file(path: Path, block_size: int) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            hasher.update(block)
+    return hasher.hexdigest()
+
+
+async def store_upload(upload_file: UploadFile, dest: Path, reservation: Optional[QuotaReservation] = None) -> StoredUpload:
+    """Streams upload_file to dest off the event loop, hashing and counting in the same pass."""
+    block_size = settings.UPLOAD_BUFFER_BYTES
+    hasher = hashlib.sha256()
+    size = 0
+    if reservation is not None and upload_file.size:
+        # Size known from the multipart part: reject before copying anything
+        reservation.check(upload_file.size)
+    dst = await upload_io_pool.run(open, dest, "wb")
+    try:
+        await upload_io_pool.run(upload_file.file.seek, 0)
+        while True:
+            n = await upload_io_pool.run(_copy_block, upload_file.file, dst, hasher, block_size)
+            if not n:
+                break
+            size += n
+            if reservation is not None:
+                # Over the limit by at most one block on disk; the partial file is removed below
+                reservation.add(n)
+    except BaseException:
+        await upload_io_pool.run(dst.close)
+        dest.unlink(missing_ok=True)
+        raise
+    await upload_io_pool.run(dst.close)
+    try:
+        await upload_file.close()
+    except Exception:
+        pass
+    return StoredUpload(path=dest, size=size, sha256=hasher.hexdigest())
+
+
+async def hash_file(path: Path) -> str:
+    """SHA-256 of a file already on disk (e.g. an assembled tus upload), off the event loop."""
+    return await upload_io_pool.run(_hash_file, path, settings.UPLOAD_BUFFER_BYTES)
@@ -4,20 +4,34 @@ Async background worker to:
 2. Merge live streaming chunks (audio/video) into a final MP4 recording.
 
 Usage:
-- import enqueue_ffprobe(file_path, related={"type":..., "id":...})
+- await enqueue_ffprobe(file_path, related={"type":..., "id":...}, classroom_id=...)
 - import enqueue_recording_merge(classroom_id)
-- On app startup call start_ffprobe_worker() to begin the consumer.
+- Both run as persistent jobs (see backend/core/jobs.py), dispatched through JOB_HANDLERS,
+  so a restart loses no probe or merge work.
+- On app startup call start_ffprobe_worker() to start the probe runner, which claims only
+  ffprobe jobs (FFPROBE_CONCURRENCY slots, defaulting to the CPU count) so probes never
+  queue behind merges. Dedicated worker processes run both runners:
+  python -m backend.core.worker
+- await ffprobe_stats() reports queue depth, latency and cache hit counters.
 """
 
 import asyncio
+import hashlib
 import json
 import os
-from typing import Optional
+import time
+from collections import OrderedDict
+from typing import Iterable, List, Optional, Tuple
 from pathlib import Path
 from datetime import datetime
 
-from backend.core.database import AsyncSessionLocal
-from backend.db.models import AudioCache, FileResource, LiveChunk
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal, ReadSessionLocal
+from backend.db.models import AudioCache, FileResource, Job, JobStatus, LiveChunk
+from backend.core.segment_log import ChunkLocation, close_room
+from backend.core.recorder import remux_parts
+from backend.core.jobs import JobRunner, enqueue_job, enqueue_jobs
+from sqlalchemy import func
 from sqlalchemy.future import select
 
 # Directory setup
@@ -27,8 +41,27 @@ TEMP_LISTS_DIR = RECORDINGS_DIR / "temp"
 TEMP_LISTS_DIR.mkdir(parents=True, exist_ok=True)
 
 # --- FFprobe Worker Logic ---
-_ffprobe_queue: asyncio.Queue = asyncio.Queue()
-_worker_task: Optional[asyncio.Task] = None
+# Probes are "ffprobe" jobs, claimed concurrently by the probe runner; results are cached by content hash.
+FFPROBE_JOB = "ffprobe"
+_probe_cache: "OrderedDict[str, dict]" = OrderedDict()
+_stats = {
+    "processed": 0,
+    "failed": 0,
+    "timeouts": 0,
+    "skipped": 0,
+    "cache_hits": 0,
+    "cache_misses": 0,
+    "total_wait_ms": 0.0,
+    "total_probe_ms": 0.0,
+}
+
+
+def _hash_file(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
 
 
 async def _run_ffprobe(path: str) -> Optional[dict]:
@@ -37,7 +70,13 @@ async def _run_ffprobe(path: str) -> Optional[dict]:
         return None
     cmd = ["ffprobe", "-v", "error", "-print_format", "json", "-show_format", "-show_streams", path]
     proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-    out, err = await proc.communicate()
+    try:
+        out, err = await asyncio.wait_for(proc.communicate(), timeout=settings.FFPROBE_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        _stats["timeouts"] += 1
+        proc.kill()
+        await proc.wait()
+        return None
     if not out:
         return None
     try:
@@ -46,13 +85,36 @@ async def _run_ffprobe(path: str) -> Optional[dict]:
         return None
 
 
+async def _probe_cached(path: str) -> Optional[dict]:
+    # Identical content (e.g. the same PDF/audio re-uploaded) is never probed twice
+    if not Path(path).exists():
+        return None
+    key = await asyncio.to_thread(_hash_file, path)
+    if key in _probe_cache:
+        _stats["cache_hits"] += 1
+        _probe_cache.move_to_end(key)
+        return _probe_cache[key]
+
+    _stats["cache_misses"] += 1
+    info = await _run_ffprobe(path)
+    if info:
+        _probe_cache[key] = info
+        if len(_probe_cache) > settings.FFPROBE_CACHE_SIZE:
+            _probe_cache.popitem(last=False)
+    return info
+
+
 async def _process_item(item: dict):
     path = item.get("path")
     related = item.get("related")
     if not path:
         return
-    info = await _run_ffprobe(path)
+
+    started = time.perf_counter()
+    info = await _probe_cached(path)
+    _stats["total_probe_ms"] += (time.perf_counter() - started) * 1000
     if not info:
+        _stats["failed"] += 1
         return
         
     # extract duration and sample_rate (approx)
@@ -80,142 +142,237 @@ async def _process_item(item: dict):
                 audio = AudioCache(filename=f.filename, file_path=str(path), duration_ms=duration, sample_rate=sample_rate, classroom_id=f.classroom_id)
                 db.add(audio)
                 await db.commit()
-        elif related and related.get("type") == "live_chunk":
-            res = await db.execute(select(LiveChunk).where(LiveChunk.id == related.get("id")))
-            chunk = res.scalars().first()
-            if chunk:
-                # Update file size
-                try:
-                    chunk.file_size = Path(path).stat().st_size
-                except:
-                    pass
-                await db.commit()
 
 
-async def _consumer():
-    while True:
-        item = await _ffprobe_queue.get()
-        try:
-            await _process_item(item)
-        except Exception:
-            pass
-        finally:
-            _ffprobe_queue.task_done()
+def _ffprobe_payload(path: str, related: Optional[dict], classroom_id: Optional[str]) -> Optional[dict]:
+    # Live chunks carry their size in the segment index and their duration in timestamp_ms,
+    # so spawning ffprobe per chunk buys nothing (and a job row per chunk even less)
+    if related and related.get("type") == "live_chunk":
+        _stats["skipped"] += 1
+        return None
+    return {"path": path, "related": related, "classroom_id": classroom_id, "enqueued_at": time.time()}
+
+
+async def enqueue_ffprobe(path: str, related: Optional[dict] = None, classroom_id: Optional[str] = None):
+    """Persists an ffprobe job; classroom_id makes it visible to the class's teacher via /jobs."""
+    payload = _ffprobe_payload(path, related, classroom_id)
+    return await enqueue_job(FFPROBE_JOB, payload) if payload else None
 
 
-def enqueue_ffprobe(path: str, related: Optional[dict] = None):
-    _ffprobe_queue.put_nowait({"path": path, "related": related})
+async def enqueue_ffprobe_batch(items: Iterable[Tuple[str, Optional[dict], Optional[str]]]):
+    """Persists many (path, related, classroom_id) probes in one transaction; the runner probes them in parallel."""
+    payloads = [p for p in (_ffprobe_payload(*item) for item in items) if p]
+    return await enqueue_jobs(FFPROBE_JOB, payloads) if payloads else []
+
+
+async def ffprobe_stats() -> dict:
+    processed = _stats["processed"] or 1
+    async with ReadSessionLocal() as db:
+        result = await db.execute(
+            select(func.count()).select_from(Job).where(Job.kind == FFPROBE_JOB, Job.status == JobStatus.QUEUED)
+        )
+    return {
+        "queue_depth": result.scalar(),
+        "workers": probe_runner.active_slots(),
+        "cache_size": len(_probe_cache),
+        **{k: v for k, v in _stats.items() if not k.startswith("total_")},
+        "avg_wait_ms": round(_stats["total_wait_ms"] / processed, 2),
+        "avg_probe_ms": round(_stats["total_probe_ms"] / processed, 2),
+    }
 
 
 def start_ffprobe_worker(loop: Optional[asyncio.AbstractEventLoop] = None):
-    global _worker_task
-    if _worker_task and not _worker_task.done():
-        return
-    loop = loop or asyncio.get_event_loop()
-    _worker_task = loop.create_task(_consumer())
-    return _worker_task
+    return probe_runner.start(loop)
 
 
 # --- NEW: Recording Merge Logic (Video + Audio) ---
 
-async def enqueue_recording_merge(classroom_id: str):
+def _concat_source(chunk: LiveChunk) -> str:
+    """
+    Returns the ffmpeg input for a chunk.
+    Segment-log chunks are addressed as a byte range of their segment via the subfile protocol.
+    """
+    if chunk.segment_offset is None or not chunk.segment_length:
+        return str(Path(chunk.file_path).resolve())
+    return ChunkLocation(chunk.file_path, chunk.segment_offset, chunk.segment_length).ffmpeg_source()
+
+
+async def _save_recording(db, classroom_id: str, filename: str, output_path: Path):
+    file_size = output_path.stat().st_size
+    new_file = FileResource(
+        classroom_id=classroom_id,
+        filename=filename,
+        file_path=str(output_path),
+        file_size=str(file_size),
+        size_bytes=file_size,
+        file_type="video/mp4",
+        is_offline_ready=True
+    )
+    db.add(new_file)
+    await db.commit()
+
+
+async def enqueue_recording_merge(classroom_id: str, parts_dir: Optional[str] = None):
     """
-    1. Fetches all chunks (video/audio) for the classroom.
+    0. If the class was recorded incrementally (parts_dir sealed by the recorder),
+       only remuxes the live parts.
+    1. Otherwise fetches all chunks (video/audio) for the classroom.
     2. Creates file lists for ffmpeg concat.
     3. Merges them into a single .mp4 file.
     4. Saves the result as a FileResource in the DB.
     """
     print(f"[Worker] Starting recording merge for {classroom_id}...")
+
+    # Close the room's open segments so their sidecar indexes are flushed
+    await close_room(classroom_id)
+
+    filename = f"recording_{classroom_id}_{int(datetime.utcnow().timestamp())}.mp4"
+    output_path = RECORDINGS_DIR / filename
+
+    # Fast path: remux the parts the incremental recorder built during the class
+    if parts_dir and await remux_parts(Path(parts_dir), output_path):
+        print(f"[Worker] Recording finalized from live parts: {output_path}")
+        async with AsyncSessionLocal() as db:
+            await _save_recording(db, classroom_id, filename, output_path)
+        return
     
-    async with AsyncSessionLocal() as db:
+    # Read the chunk list on the read pool and release it; ffmpeg can run for minutes
+    async with ReadSessionLocal() as db:
         # Fetch chunks sorted by sequence
         stmt = select(LiveChunk).where(LiveChunk.classroom_id == classroom_id).order_by(LiveChunk.seq)
         result = await db.execute(stmt)
         chunks = result.scalars().all()
-        
-        if not chunks:
-            print(f"[Worker] No chunks found for {classroom_id}")
-            return
+    
+    if not chunks:
+        print(f"[Worker] No chunks found for {classroom_id}")
+        return
 
-        # Separate by type
-        # We ensure paths are absolute string paths
-        video_chunks = [c for c in chunks if c.chunk_type == 'video' and c.file_path]
-        audio_chunks = [c for c in chunks if c.chunk_type == 'audio' and c.file_path]
+    # Separate by type
+    # We ensure paths are absolute string paths
+    video_chunks = [c for c in chunks if c.chunk_type == 'video' and c.file_path]
+    audio_chunks = [c for c in chunks if c.chunk_type == 'audio' and c.file_path]
 
-        if not video_chunks and not audio_chunks:
-            return
+    if not video_chunks and not audio_chunks:
+        return
 
-        # Create temporary input files for FFmpeg concat demuxer
-        vid_list_path = TEMP_LISTS_DIR / f"{classroom_id}_vid.txt"
-        aud_list_path = TEMP_LISTS_DIR / f"{classroom_id}_aud.txt"
-        
-        # Helper to write list
-        def write_list(file_path, chunk_list):
-            with open(file_path, "w") as f:
-                for c in chunk_list:
-                    # FFmpeg concat requires 'file path' format
-                    # Resolving to absolute path is safer
-                    abs_path = Path(c.file_path).resolve()
-                    f.write(f"file '{abs_path}'\n")
-
-        has_video = len(video_chunks) > 0
-        has_audio = len(audio_chunks) > 0
-
-        if has_video:
-            write_list(vid_list_path, video_chunks)
-        if has_audio:
-            write_list(aud_list_path, audio_chunks)
-
-        # Output file
-        filename = f"recording_{classroom_id}_{int(datetime.utcnow().timestamp())}.mp4"
-        output_path = RECORDINGS_DIR / filename
-        
-        # Build FFmpeg command
-        # Syntax: ffmpeg -f concat -safe 0 -i vid.txt -f concat -safe 0 -i aud.txt ...
-        cmd = ["ffmpeg", "-y"]
+    # Create temporary input files for FFmpeg concat demuxer
+    vid_list_path = TEMP_LISTS_DIR / f"{classroom_id}_vid.txt"
+    aud_list_path = TEMP_LISTS_DIR / f"{classroom_id}_aud.txt"
+    
+    # Helper to write list
+    def write_list(file_path, chunk_list):
+        with open(file_path, "w") as f:
+            for c in chunk_list:
+                # FFmpeg concat requires 'file path' format
+                # Resolving to absolute path is safer
+                f.write(f"file '{_concat_source(c)}'\n")
+
+    has_video = len(video_chunks) > 0
+    has_audio = len(audio_chunks) > 0
+
+    if has_video:
+        write_list(vid_list_path, video_chunks)
+    if has_audio:
+        write_list(aud_list_path, audio_chunks)
+
+    # Build FFmpeg command
+    # Syntax: ffmpeg -f concat -safe 0 -i vid.txt -f concat -safe 0 -i aud.txt ...
+    # subfile must be whitelisted so concat entries can address segment byte ranges
+    cmd = ["ffmpeg", "-y"]
+    concat_input = ["-protocol_whitelist", "file,subfile", "-f", "concat", "-safe", "0", "-i"]
+    
+    if has_video:
+        cmd.extend([*concat_input, str(vid_list_path)])
+    if has_audio:
+        cmd.extend([*concat_input, str(aud_list_path)])
         
-        if has_video:
-            cmd.extend(["-f", "concat", "-safe", "0", "-i", str(vid_list_path)])
-        if has_audio:
-            cmd.extend(["-f", "concat", "-safe", "0", "-i", str(aud_list_path)])
-            
-        # Encoding arguments
-        # We copy video (fast) and AAC encode audio (compatible)
-        if has_video and has_audio:
-            # map 0:v and 1:a
-            cmd.extend(["-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac", "-shortest", str(output_path)])
-        elif has_video:
-            cmd.extend(["-c:v", "copy", str(output_path)])
-        elif has_audio:
-            cmd.extend(["-c:a", "aac", str(output_path)])
-
-        # Execute
-        print(f"[Worker] Running FFmpeg: {' '.join(cmd)}")
-        proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
-        out, err = await proc.communicate()
-
-        if proc.returncode != 0:
-            print(f"[Worker] FFmpeg failed: {err.decode()}")
-            # Cleanup lists
-            if vid_list_path.exists(): vid_list_path.unlink()
-            if aud_list_path.exists(): aud_list_path.unlink()
-            return
-
-        print(f"[Worker] Recording created successfully: {output_path}")
-
-        # Save to DB
-        file_size = output_path.stat().st_size
-        new_file = FileResource(
-            classroom_id=classroom_id,
-            filename=filename,
-            file_path=str(output_path),
-            file_size=str(file_size),
-            file_type="video/mp4",
-            is_offline_ready=True
-        )
-        db.add(new_file)
-        await db.commit()
+    # Encoding arguments
+    # We copy video (fast) and AAC encode audio (compatible)
+    if has_video and has_audio:
+        # map 0:v and 1:a
+        cmd.extend(["-map", "0:v", "-map", "1:a", "-c:v", "copy", "-c:a", "aac", "-shortest", str(output_path)])
+    elif has_video:
+        cmd.extend(["-c:v", "copy", str(output_path)])
+    elif has_audio:
+        cmd.extend(["-c:a", "aac", str(output_path)])
 
-        # Cleanup temp lists
+    # Execute
+    print(f"[Worker] Running FFmpeg: {' '.join(cmd)}")
+    proc = await asyncio.create_subprocess_exec(*cmd, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+    out, err = await proc.communicate()
+
+    if proc.returncode != 0:
+        print(f"[Worker] FFmpeg failed: {err.decode()}")
+        # Cleanup lists
         if vid_list_path.exists(): vid_list_path.unlink()
-        if aud_list_path.exists(): aud_list_path.unlink()
\ No newline at end of file
+        if aud_list_path.exists(): aud_list_path.unlink()
+        # Raise so the job queue retries with backoff
+        raise RuntimeError(f"FFmpeg exited with code {proc.returncode}")
+
+    print(f"[Worker] Recording created successfully: {output_path}")
+
+    # Save to DB
+    async with AsyncSessionLocal() as db:
+        await _save_recording(db, classroom_id, filename, output_path)
+
+    # Cleanup temp lists
+    if vid_list_path.exists(): vid_list_path.unlink()
+    if aud_list_path.exists(): aud_list_path.unlink()
+
+
+# --- Persistent Job Handlers ---
+
+async def _ffprobe_job(path: str, related: Optional[dict] = None, classroom_id: Optional[str] = None, enqueued_at: Optional[float] = None):
+    if enqueued_at:
+        _stats["total_wait_ms"] += max(time.time() - enqueued_at, 0) * 1000
+    try:
+        await _process_item({"path": path, "related": related})
+    except Exception:
+        # Raised again so the job is retried with backoff
+        _stats["failed"] += 1
+        raise
+    finally:
+        _stats["processed"] += 1
+
+
+JOB_HANDLERS = {
+    "recording_merge": enqueue_recording_merge,
+    FFPROBE_JOB: _ffprobe_job,
+}
+
+
+def create_job_runner(concurrency: Optional[int] = None) -> JobRunner:
+    """Runner for every job kind except probes, which have their own runner (probe_runner)."""
+    return JobRunner({k: v for k, v in JOB_HANDLERS.items() if k != FFPROBE_JOB}, concurrency=concurrency)
+
+
+def create_probe_runner(concurrency: Optional[int] = None) -> JobRunner:
+    concurrency = concurrency or settings.FFPROBE_CONCURRENCY or os.cpu_count() or 1
+    return JobRunner({FFPROBE_JOB: _ffprobe_job}, concurrency=concurrency)
+
+
+probe_runner = create_probe_runner()
+
+
+async def run_worker_process():
+    """Entry point for dedicated worker processes: claims jobs until interrupted."""
+    from backend.core.database import engine, Base
+    from backend.core.migrations import upgrade_schema
+
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+    runner = create_job_runner()
+    print(f"[Worker] Job worker {runner.worker_id} started ({runner.concurrency} slots, {probe_runner.concurrency} probe slots)")
+    try:
+        await asyncio.gather(runner.run_forever(), probe_runner.run_forever())
+    finally:
+        await runner.stop()
+        await probe_runner.stop()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(run_worker_process())
+    except KeyboardInterrupt:
+        pass
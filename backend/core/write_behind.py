@@ -0,0 +1,202 @@
+"""
+Write-behind buffer for high-frequency inserts (LiveChunk, EventLog).
+
+Socket handlers hand rows to the buffer instead of opening a session and committing
+one row each. Rows are flushed as one multi-row INSERT per model, in a single
+transaction, whenever WRITE_BEHIND_MAX_ROWS rows are pending or WRITE_BEHIND_MAX_DELAY_MS
+has elapsed, whichever comes first.
+
+A failed flush (database locked, pool timeout, ...) puts its rows back at the front of the
+buffer and is retried with exponential backoff. Rows are dropped, with their ids logged,
+only after WRITE_BEHIND_MAX_ATTEMPTS failed attempts, so a transient error never leaves a
+hole in the event seq numbers.
+
+Usage:
+- await write_behind.put(EventLog, {"classroom_id": ..., "event_type": ..., "payload": ...})
+- On app startup call start_write_behind(); on shutdown await write_behind.drain().
+- write_behind.buffered(EventLog) lists rows not committed yet, so readers can serve them
+  without forcing a flush.
+- write_behind.stats() returns queue depth and flush/backpressure counters.
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, List, Optional
+
+from sqlalchemy import insert
+
+from backend.core.config import settings
+from backend.core.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+
+class WriteBehindBuffer:
+    def __init__(self, session_factory=AsyncSessionLocal, max_rows: Optional[int] = None,
+                 max_delay_ms: Optional[int] = None, max_pending: Optional[int] = None):
+        self._session_factory = session_factory
+        self.max_rows = max_rows or settings.WRITE_BEHIND_MAX_ROWS
+        self.max_delay = (max_delay_ms or settings.WRITE_BEHIND_MAX_DELAY_MS) / 1000
+        self.max_pending = max_pending or settings.WRITE_BEHIND_MAX_PENDING
+
+        self._rows: Dict[type, List[dict]] = {}
+        self._inflight: Dict[type, List[dict]] = {}  # batch being written, until committed
+        self._pending = 0
+        self._wakeup = asyncio.Event()
+        self._has_room = asyncio.Event()
+        self._has_room.set()
+        self._flush_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._closing = False
+        self._attempts = 0  # consecutive failed flushes of the rows at the front
+
+        # Metrics
+        self._enqueued = 0
+        self._flushed_rows = 0
+        self._flushes = 0
+        self._failed_rows = 0
+        self._retries = 0
+        self._backpressure_waits = 0
+        self._high_watermark = 0
+        self._last_flush_ms = 0.0
+        self._last_batch = 0
+
+    def add(self, model, values: dict):
+        """Queues a row without waiting. Prefer put() so callers respect backpressure."""
+        self._rows.setdefault(model, []).append(values)
+        self._pending += 1
+        self._enqueued += 1
+        self._high_watermark = max(self._high_watermark, self._pending)
+        if self._pending >= self.max_rows:
+            self._wakeup.set()
+        if self._pending >= self.max_pending:
+            self._has_room.clear()
+
+    async def wait_for_room(self):
+        """Waits for a flush if max_pending rows are already buffered."""
+        if self._pending >= self.max_pending and not self._closing:
+            self._backpressure_waits += 1
+            self._wakeup.set()
+            await self._has_room.wait()
+
+    async def put(self, model, values: dict):
+        """Queues a row, waiting for a flush first if max_pending rows are already buffered."""
+        await self.wait_for_room()
+        self.add(model, values)
+
+    async def flush(self) -> bool:
+        """Writes out the buffered rows; False if the attempt failed (the rows stay queued)."""
+        async with self._flush_lock:
+            if not self._rows:
+                return True
+            batch, self._rows = self._rows, {}
+            count, self._pending = self._pending, 0
+            self._inflight = batch
+            started = time.perf_counter()
+            try:
+                async with self._session_factory() as db:
+                    for model, rows in batch.items():
+                        await db.execute(insert(model), rows)
+                    await db.commit()
+                self._flushed_rows += count
+                self._flushes += 1
+                self._last_batch = count
+                self._attempts = 0
+                return True
+            except Exception as e:
+                self._attempts += 1
+                if self._attempts >= settings.WRITE_BEHIND_MAX_ATTEMPTS:
+                    self._failed_rows += count
+                    self._attempts = 0
+                    logger.error(f"Write-behind dropped {count} rows after {settings.WRITE_BEHIND_MAX_ATTEMPTS} failed flushes: {e}; "
+                                 f"rows: {_row_keys(batch)}")
+                else:
+                    self._requeue(batch, count)
+                    self._retries += 1
+                    logger.warning(f"Write-behind flush of {count} rows failed (attempt {self._attempts}), retrying: {e}")
+                return False
+            finally:
+                self._inflight = {}
+                self._last_flush_ms = round((time.perf_counter() - started) * 1000, 2)
+                if self._pending < self.max_pending:
+                    self._has_room.set()
+
+    def _requeue(self, batch: Dict[type, List[dict]], count: int):
+        # Back in front of rows queued meanwhile, so each model's rows keep their order
+        for model, rows in self._rows.items():
+            batch.setdefault(model, []).extend(rows)
+        self._rows = batch
+        self._pending += count
+
+    def _backoff(self) -> float:
+        delay_ms = settings.WRITE_BEHIND_RETRY_BASE_MS * 2 ** max(self._attempts - 1, 0)
+        return min(delay_ms, settings.WRITE_BEHIND_RETRY_MAX_MS) / 1000
+
+    def buffered(self, model) -> List[dict]:
+        """Rows of `model` not yet committed (being flushed or queued), oldest first."""
+        return self._inflight.get(model, []) + self._rows.get(model, [])
+
+    async def _run(self):
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.max_delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if not await self.flush():
+                await asyncio.sleep(self._backoff())
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        if self._task and not self._task.done():
+            return self._task
+        self._closing = False
+        loop = loop or asyncio.get_event_loop()
+        self._task = loop.create_task(self._run())
+        return self._task
+
+    async def drain(self):
+        """Stops the flush loop and writes out everything still buffered."""
+        self._closing = True
+        self._wakeup.set()
+        if self._task:
+            try:
+                await self._task
+            except Exception:
+                pass
+            self._task = None
+        # Failed rows are retried until written or dropped after the attempt limit
+        while self._rows and not await self.flush():
+            await asyncio.sleep(self._backoff())
+
+    def stats(self) -> dict:
+        return {
+            "pending": self._pending,
+            "max_pending": self.max_pending,
+            "high_watermark": self._high_watermark,
+            "enqueued": self._enqueued,
+            "flushed_rows": self._flushed_rows,
+            "failed_rows": self._failed_rows,
+            "retries": self._retries,
+            "flushes": self._flushes,
+            "last_batch": self._last_batch,
+            "last_flush_ms": self._last_flush_ms,
+            "backpressure_waits": self._backpressure_waits,
+        }
+
+
+def _row_keys(batch: Dict[type, List[dict]]) -> List[str]:
+    # Rows carry their id; fall back to room and seq for rows queued without one
+    keys = []
+    for model, rows in batch.items():
+        for row in rows:
+            key = row.get("id") or f"{row.get('classroom_id')}#{row.get('seq')}"
+            keys.append(f"{model.__tablename__}:{key}")
+    return keys
+
+
+write_behind = WriteBehindBuffer()
+
+
+def start_write_behind(loop: Optional[asyncio.AbstractEventLoop] = None):
+    return write_behind.start(loop)
@@ -1,6 +1,6 @@
 import enum
 import uuid
-from sqlalchemy import Column, String, Boolean, ForeignKey, Integer, Enum, Text, DateTime, JSON
+from sqlalchemy import BigInteger, Column, String, Boolean, ForeignKey, Integer, Enum, Text, DateTime, JSON, Index, LargeBinary
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from backend.core.database import Base
@@ -29,6 +29,18 @@ class SubmissionStatus(str, enum.Enum):
     GRADED = "graded"
 
 
+class JobStatus(str, enum.Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+
+def portable_enum(enum_cls):
+    # Stored as VARCHAR everywhere (as on SQLite), so Postgres needs no CREATE/ALTER TYPE
+    return Enum(enum_cls, native_enum=False, length=32)
+
+
 # --- TABLES ---
 class User(Base):
     __tablename__ = "users"
@@ -36,7 +48,7 @@ class User(Base):
     username = Column(String, unique=True, index=True, nullable=False)
     full_name = Column(String, nullable=True)
     hashed_password = Column(String, nullable=True)
-    role = Column(Enum(UserRole), default=UserRole.STUDENT)
+    role = Column(portable_enum(UserRole), default=UserRole.STUDENT)
 
     enrollments = relationship("Enrollment", back_populates="student")
     created_classes = relationship("Classroom", back_populates="teacher")
@@ -51,7 +63,7 @@ class Classroom(Base):
     title = Column(String, index=True)
     code = Column(String, unique=True, index=True)
     teacher_id = Column(String, ForeignKey("users.id"))
-    status = Column(Enum(ClassStatus), default=ClassStatus.UPCOMING)
+    status = Column(portable_enum(ClassStatus), default=ClassStatus.UPCOMING)
 
     teacher = relationship("User", back_populates="created_classes")
     students = relationship("Enrollment", back_populates="classroom")
@@ -64,6 +76,12 @@ class Classroom(Base):
 
 class Enrollment(Base):
     __tablename__ = "enrollments"
+    __table_args__ = (
+        # One enrollment per student and class; also serves "classes of user" lookups
+        Index("uq_enrollments_user_classroom", "user_id", "classroom_id", unique=True),
+        # Class roster: WHERE classroom_id = ?
+        Index("ix_enrollments_classroom", "classroom_id"),
+    )
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(String, ForeignKey("users.id"))
     classroom_id = Column(String, ForeignKey("classrooms.id"))
@@ -86,11 +104,15 @@ class Assignment(Base):
 
 class Submission(Base):
     __tablename__ = "submissions"
+    __table_args__ = (
+        # One submission per student and assignment: WHERE assignment_id = ? AND student_id = ?
+        Index("uq_submissions_assignment_student", "assignment_id", "student_id", unique=True),
+    )
     id = Column(String, primary_key=True, index=True, default=gen_uuid)
     assignment_id = Column(String, ForeignKey("assignments.id"))
     student_id = Column(String, ForeignKey("users.id"))
     file_url = Column(String, nullable=True)
-    status = Column(Enum(SubmissionStatus), default=SubmissionStatus.PENDING)
+    status = Column(portable_enum(SubmissionStatus), default=SubmissionStatus.PENDING)
     grade = Column(String, nullable=True)
     submitted_at = Column(DateTime, default=datetime.utcnow)
 
@@ -100,18 +122,42 @@ class Submission(Base):
 
 class FileResource(Base):
     __tablename__ = "files"
+    __table_args__ = (
+        # Per-class quota: SUM(size_bytes) WHERE classroom_id = ?
+        Index("ix_files_classroom", "classroom_id"),
+    )
     id = Column(String, primary_key=True, index=True, default=gen_uuid)
     classroom_id = Column(String, ForeignKey("classrooms.id"))
     filename = Column(String)
     file_path = Column(String)
-    file_size = Column(String)
+    file_size = Column(String)  # display value; size_bytes is the number used for quotas
     file_type = Column(String)
     is_offline_ready = Column(Boolean, default=False)
     uploaded_at = Column(DateTime, default=datetime.utcnow)
+    uploaded_by = Column(String, ForeignKey("users.id"), nullable=True, index=True)  # None for generated files
+    size_bytes = Column(BigInteger, nullable=True)
+    sha256 = Column(String(64), nullable=True)  # hex digest computed while the upload streams to disk
+    # Content-addressed storage: file_path is the blob's path; None for legacy/generated files
+    blob_sha256 = Column(String(64), ForeignKey("blobs.sha256"), nullable=True, index=True)
 
     classroom = relationship("Classroom", back_populates="files")
 
 
+class Blob(Base):
+    """
+    Content-addressed file body shared by every FileResource with the same SHA-256
+    (see backend/core/blob_store.py). refcount counts referencing FileResource rows;
+    unreferenced blobs are garbage-collected after a grace period.
+    """
+    __tablename__ = "blobs"
+    sha256 = Column(String(64), primary_key=True)
+    size_bytes = Column(BigInteger, nullable=False)
+    path = Column(String, nullable=False)
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    unreferenced_at = Column(DateTime, nullable=True)  # when refcount last dropped to 0
+
+
 class Discussion(Base):
     __tablename__ = "discussions"
     id = Column(String, primary_key=True, index=True, default=gen_uuid)
@@ -157,22 +203,32 @@ class AudioCache(Base):
 class LiveChunk(Base):
     """
     Stores individual audio/video chunk metadata persisted from socket.io stream.
-    The backend writes chunk binary files under uploads/live_audio or uploads/live_video.
+    Chunk bytes live in append-only segment files under uploads/live_audio or uploads/live_video
+    (see backend/core/segment_log.py); file_path points at the segment and
+    segment_offset/segment_length locate the chunk inside it.
+    Legacy rows without segment_offset point at a standalone chunk file.
     """
     __tablename__ = "live_chunks"
+    __table_args__ = (
+        # Chunk listing and recording merge: WHERE classroom_id = ? ORDER BY seq
+        Index("ix_live_chunks_classroom_seq", "classroom_id", "seq"),
+    )
     id = Column(String, primary_key=True, index=True, default=gen_uuid)
     classroom_id = Column(String, ForeignKey("classrooms.id"), nullable=False)
     sender_id = Column(String, ForeignKey("users.id"), nullable=True)
     
     seq = Column(Integer, nullable=False, index=True)  # sequence number
-    timestamp_ms = Column(Integer, nullable=True)  # unix ms timestamp from client
+    timestamp_ms = Column(BigInteger, nullable=True)  # unix ms timestamp from client (exceeds int32)
     
     # "audio" or "video" - Added to support x264 video streaming
     chunk_type = Column(String, default="audio", nullable=False) 
     
     codec = Column(String, nullable=True)  # e.g., "opus", "h264"
-    file_path = Column(String, nullable=True)  # stored chunk file path
-    file_size = Column(Integer, nullable=True)
+    file_path = Column(String, nullable=True)  # segment file path (or legacy chunk file)
+    file_size = Column(BigInteger, nullable=True)
+    segment_offset = Column(BigInteger, nullable=True)  # byte offset inside the segment
+    segment_length = Column(BigInteger, nullable=True)  # chunk length inside the segment
+    sha256 = Column(String(64), nullable=True)  # hex digest of the chunk bytes (ETag); null on legacy rows
     created_at = Column(DateTime, default=datetime.utcnow)
 
     classroom = relationship("Classroom", back_populates="live_chunks")
@@ -184,11 +240,76 @@ class EventLog(Base):
     payload is JSON to be flexible.
     """
     __tablename__ = "event_logs"
+    __table_args__ = (
+        # Keyset pagination for cursor-based sync: WHERE classroom_id = ? AND seq > ? ORDER BY seq
+        Index("ix_event_logs_classroom_seq", "classroom_id", "seq"),
+        # Recent-events listing: WHERE classroom_id = ? ORDER BY created_at DESC
+        Index("ix_event_logs_classroom_created", "classroom_id", "created_at"),
+    )
     id = Column(String, primary_key=True, index=True, default=gen_uuid)
     classroom_id = Column(String, ForeignKey("classrooms.id"), nullable=False)
     sender_id = Column(String, ForeignKey("users.id"), nullable=True)
+    seq = Column(Integer, nullable=True)  # monotonically increasing per classroom
     event_type = Column(String, nullable=False)  # e.g., "pen", "coords", "slide", "control"
     payload = Column(JSON, nullable=True)  # JSON blob with details
     created_at = Column(DateTime, default=datetime.utcnow)
 
-    classroom = relationship("Classroom", back_populates="events")
\ No newline at end of file
+    classroom = relationship("Classroom", back_populates="events")
+
+
+class EventLogArchive(Base):
+    """
+    EventLog rows folded into a BoardSnapshot, moved off the hot table by the compactor
+    (same columns, plus when they were archived). Nothing is destroyed by compaction.
+    """
+    __tablename__ = "event_logs_archive"
+    __table_args__ = (
+        Index("ix_event_logs_archive_classroom_seq", "classroom_id", "seq"),
+        # Full-history listing continues here: WHERE classroom_id = ? ORDER BY created_at DESC
+        Index("ix_event_logs_archive_classroom_created", "classroom_id", "created_at"),
+    )
+    id = Column(String, primary_key=True)
+    classroom_id = Column(String, ForeignKey("classrooms.id"), nullable=False)
+    sender_id = Column(String, ForeignKey("users.id"), nullable=True)
+    seq = Column(Integer, nullable=True)
+    event_type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=True)
+    created_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+
+class BoardSnapshot(Base):
+    """
+    Compacted whiteboard state of a classroom: every pen/control event up to upto_seq,
+    folded into a zlib-compressed JSON stroke array (see backend/core/board_compaction.py).
+    The folded EventLog rows are moved to event_logs_archive; late joiners load the
+    snapshot plus the EventLog tail after upto_seq.
+    """
+    __tablename__ = "board_snapshots"
+    id = Column(String, primary_key=True, index=True, default=gen_uuid)
+    classroom_id = Column(String, ForeignKey("classrooms.id"), nullable=False, index=True)
+    upto_seq = Column(Integer, nullable=False)
+    event_count = Column(Integer, nullable=False, default=0)
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class Job(Base):
+    """
+    Persistent background job (recording merge, ffprobe) claimed by worker processes.
+    A worker owns a running job until lease_expires_at; expired leases are re-claimed,
+    failures are retried with exponential backoff via run_after.
+    """
+    __tablename__ = "jobs"
+    id = Column(String, primary_key=True, index=True, default=gen_uuid)
+    kind = Column(String, nullable=False, index=True)  # e.g., "recording_merge", "ffprobe"
+    payload = Column(JSON, nullable=True)  # keyword arguments for the job handler
+    status = Column(portable_enum(JobStatus), default=JobStatus.QUEUED, nullable=False, index=True)
+    attempts = Column(Integer, default=0, nullable=False)
+    max_attempts = Column(Integer, default=5, nullable=False)
+    run_after = Column(DateTime, default=datetime.utcnow, nullable=False)
+    lease_owner = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
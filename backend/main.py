@@ -10,23 +10,36 @@ import uvicorn
 import socketio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
 
 from backend.core.config import settings
 from backend.core.database import engine, Base
+from backend.core.migrations import upgrade_schema
+from backend.core.http_cache import DownloadStaticFiles
 from backend.api.router import api_router
 
 # Socket manager and event handlers
-from backend.core.socket_manager import sio
+from backend.core.socket_manager import sio, start_client_manager
 import backend.api.sockets  # registers socket event handlers
 
 # FFProbe worker (background consumer)
-from backend.core.worker import start_ffprobe_worker
+from backend.core.worker import start_ffprobe_worker, create_job_runner, probe_runner
+from backend.core.segment_log import close_all as close_segment_logs
+from backend.core.write_behind import start_write_behind, write_behind
+from backend.core.recorder import start_recorder
+from backend.core.board_compaction import start_board_compactor
+from backend.core.broadcast import pen_broadcaster
+from backend.core.hash_pool import password_pool
+from backend.core.tus import TUS_EXPOSED_HEADERS, start_tus_reaper
+from backend.core.blob_store import start_blob_gc
+from backend.core.upload_pipeline import upload_io_pool
 
 # Logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger("backend.main")
 
+# In-process job runner (disabled when dedicated `python -m backend.core.worker` processes are used)
+job_runner = create_job_runner()
+
 # Create FastAPI app
 app = FastAPI(title=settings.PROJECT_NAME, openapi_url=f"{settings.API_STR}/openapi.json")
 
@@ -37,12 +50,14 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=TUS_EXPOSED_HEADERS,
 )
 
 # Ensure uploads dir exists and mount for static serving
+# (recordings and large files go out via os.sendfile / pathsend when the server supports it)
 UPLOADS_DIR = os.path.join(os.getcwd(), "uploads")
 os.makedirs(UPLOADS_DIR, exist_ok=True)
-app.mount("/uploads", StaticFiles(directory=UPLOADS_DIR), name="uploads")
+app.mount("/uploads", DownloadStaticFiles(directory=UPLOADS_DIR), name="uploads")
 
 # Include API router under configured prefix
 app.include_router(api_router, prefix=settings.API_STR)
@@ -54,14 +69,61 @@ async def startup_event():
     # Create DB tables if missing
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
     logger.info("✅ Database Tables Verified/Created")
 
-    # Start ffprobe background worker (runs on the current event loop)
-    try:
-        start_ffprobe_worker()
-        logger.info("✅ FFProbe worker started")
-    except Exception as e:
-        logger.warning("⚠️  Could not start FFProbe worker: %s", e)
+    # Start the ffprobe job runner (runs on the current event loop; dedicated workers
+    # started with `python -m backend.core.worker` take over when JOB_WORKER_IN_PROCESS=false)
+    if settings.JOB_WORKER_IN_PROCESS:
+        try:
+            start_ffprobe_worker()
+            logger.info("✅ FFProbe worker started")
+        except Exception as e:
+            logger.warning("⚠️  Could not start FFProbe worker: %s", e)
+
+    # Join the Socket.IO message queue (rooms/presence shared with other workers)
+    if settings.SOCKETIO_MESSAGE_QUEUE:
+        start_client_manager()
+        logger.info("✅ Socket.IO message queue: %s", settings.SOCKETIO_MESSAGE_QUEUE)
+
+    # Start batched LiveChunk/EventLog writer
+    start_write_behind()
+    logger.info("✅ Write-behind buffer started")
+
+    # Start incremental recorder (muxes live chunks into parts during class)
+    if settings.LIVE_RECORDING_ENABLED:
+        start_recorder()
+        logger.info("✅ Incremental recorder started")
+
+    # Start whiteboard compaction (folds old pen events into board snapshots)
+    start_board_compactor()
+    logger.info("✅ Board compactor started")
+
+    # Start expiry of stale partial (tus) uploads
+    start_tus_reaper()
+    logger.info("✅ Tus upload reaper started")
+
+    # Start collection of unreferenced upload blobs
+    start_blob_gc()
+    logger.info("✅ Blob garbage collector started")
+
+    # Start persistent job runner (recording merges, ffprobe jobs)
+    if settings.JOB_WORKER_IN_PROCESS:
+        job_runner.start()
+        logger.info("✅ Job runner started (%s)", job_runner.worker_id)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    # Write out buffered rows, then flush and close any open live media segments.
+    # Jobs still running are re-claimed by a worker once their lease expires.
+    await job_runner.stop()
+    await probe_runner.stop()
+    await pen_broadcaster.flush_all()
+    await write_behind.drain()
+    await close_segment_logs()
+    password_pool.shutdown()
+    upload_io_pool.shutdown()
 
 
 @app.get("/")
@@ -0,0 +1,67 @@
+import os
+import sys
+
+# Add the parent directory to sys.path so we can import 'backend'
+# even if running this script directly from inside the backend/ folder.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from sqlalchemy import create_engine, select, text
+
+from backend.core.database import Base
+from backend.core.migrations import upgrade_schema
+from backend.db.models import Enrollment, EventLog, EventLogArchive, LiveChunk, Submission
+
+# Hot queries in the shape the endpoints/workers issue them. Each must be answered
+# from an index: no full-table SCAN and no temp B-tree for the ORDER BY.
+HOT_QUERIES = {
+    "streams.list_chunks": select(LiveChunk).where(LiveChunk.classroom_id == "c").order_by(LiveChunk.seq.desc()).limit(50),
+    "worker.recording_merge": select(LiveChunk).where(LiveChunk.classroom_id == "c").order_by(LiveChunk.seq),
+    "streams.list_events": select(EventLog).where(EventLog.classroom_id == "c").order_by(EventLog.created_at.desc()).limit(200),
+    "streams.list_events_archive": select(EventLogArchive).where(EventLogArchive.classroom_id == "c").order_by(EventLogArchive.created_at.desc()).limit(200),
+    "event_sync.fetch_events_after": select(EventLog).where(EventLog.classroom_id == "c", EventLog.seq > 10).order_by(EventLog.seq).limit(200),
+    "classes.join_class": select(Enrollment).where(Enrollment.user_id == "u", Enrollment.classroom_id == "c"),
+    "classes.roster": select(Enrollment).where(Enrollment.classroom_id == "c"),
+    "dashboard.my_classes": select(Enrollment.classroom_id).where(Enrollment.user_id == "u"),
+    "assignments.submit": select(Submission).where(Submission.assignment_id == "a", Submission.student_id == "u"),
+}
+
+
+def _problems(plan_lines):
+    problems = []
+    for detail in plan_lines:
+        # "SCAN t" and "SCAN t USING INDEX ix" both walk the whole table; only SEARCH seeks
+        if detail.startswith("SCAN"):
+            problems.append(detail)
+        if "TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+
+def verify(url: str = "sqlite://"):
+    """Runs EXPLAIN QUERY PLAN for every hot query; returns False if any degrades to a scan."""
+    print("🔍 Checking query plans of hot queries...")
+    engine = create_engine(url)
+    failed = []
+    with engine.begin() as conn:
+        Base.metadata.create_all(conn)
+        upgrade_schema(conn)
+        for name, stmt in HOT_QUERIES.items():
+            sql = str(stmt.compile(conn, compile_kwargs={"literal_binds": True}))
+            plan = [row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {sql}"))]
+            problems = _problems(plan)
+            status = "❌" if problems else "✅"
+            print(f"{status} {name}: {' | '.join(plan)}")
+            if problems:
+                failed.append(name)
+    engine.dispose()
+
+    if failed:
+        print(f"❌ FAILURE: full scans in {failed}")
+        return False
+    print("✅ SUCCESS: every hot query is served by an index.")
+    return True
+
+
+if __name__ == "__main__":
+    # Optionally check (and upgrade) an existing SQLite file: python verify_indexes.py sqlite:///./vlink.db
+    sys.exit(0 if verify(sys.argv[1] if len(sys.argv) > 1 else "sqlite://") else 1)
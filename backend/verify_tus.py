@@ -0,0 +1,95 @@
+import asyncio
+import base64
+import os
+import sys
+import tempfile
+from types import SimpleNamespace
+
+# Add the parent directory to sys.path so we can import 'backend'
+# even if running this script directly from inside the backend/ folder.
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+# Runs against a throwaway database and upload directories
+WORKDIR = tempfile.mkdtemp(prefix="vlink-tus-")
+os.chdir(WORKDIR)
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{os.path.join(WORKDIR, 'vlink.db')}"
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from backend.api.deps import get_current_user
+from backend.api.router import api_router
+from backend.core.database import AsyncSessionLocal, Base, engine
+from backend.core.migrations import upgrade_schema
+from backend.db.models import Classroom, User, UserRole
+
+TUS = {"Tus-Resumable": "1.0.0"}
+OFFSET = {"Content-Type": "application/offset+octet-stream"}
+
+
+def _metadata(**values) -> str:
+    return ",".join(f"{k} {base64.b64encode(v.encode()).decode()}" for k, v in values.items())
+
+
+async def _create_tables():
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
+    async with AsyncSessionLocal() as db:
+        db.add(User(id="u1", username="teacher", role=UserRole.TEACHER))
+        await db.flush()
+        db.add(Classroom(id="c1", title="Physics", code="TUS001", teacher_id="u1"))
+        await db.commit()
+
+
+def verify():
+    """Walks a resumable upload through the cases a flaky connection produces."""
+    print("🔍 Checking tus uploads...")
+    asyncio.run(_create_tables())
+    app = FastAPI()
+    app.include_router(api_router, prefix="/api")
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="u1", role=UserRole.TEACHER)
+    client = TestClient(app)
+
+    body = os.urandom(100000)
+    created = client.post("/api/files/tus", headers={
+        **TUS, "Upload-Length": str(len(body)), "Upload-Metadata": _metadata(classroom_id="c1", filename="lecture.mp4"),
+    })
+    url = created.headers["Location"]
+    patch = lambda offset, data: client.patch(url, content=data, headers={**TUS, **OFFSET, "Upload-Offset": str(offset)})
+
+    first = patch(0, body[:40000])
+    wrong_offset = patch(0, body[:10])
+    last = patch(40000, body[40000:])
+    retried = patch(len(body), b"")
+    retried_with_body = patch(len(body), b"x")
+    status = client.head(url, headers=TUS)
+
+    app.dependency_overrides[get_current_user] = lambda: SimpleNamespace(id="u2", role=UserRole.STUDENT)
+    outsider = client.post("/api/files/tus", headers={
+        **TUS, "Upload-Length": "10", "Upload-Metadata": _metadata(classroom_id="c1", filename="x.bin"),
+    })
+
+    file_id = last.headers.get("Vlink-File-Id")
+    checks = {
+        "create -> 201": created.status_code == 201,
+        "first PATCH -> 204 at 40000": first.status_code == 204 and first.headers["Upload-Offset"] == "40000",
+        "PATCH at a stale offset -> 409": wrong_offset.status_code == 409,
+        "final PATCH -> 204 with Vlink-File-Id": last.status_code == 204 and bool(file_id),
+        "retried final PATCH -> 204, same file": retried.status_code == 204
+            and retried.headers["Upload-Offset"] == str(len(body)) and retried.headers.get("Vlink-File-Id") == file_id,
+        "retried final PATCH with a body -> 409": retried_with_body.status_code == 409,
+        "HEAD after completion -> full offset": status.status_code == 200 and status.headers["Upload-Offset"] == str(len(body)),
+        "create in someone else's class -> 403": outsider.status_code == 403,
+    }
+    for name, ok in checks.items():
+        print(f"{'✅' if ok else '❌'} {name}")
+    if not all(checks.values()):
+        print("❌ FAILURE: tus upload flow is broken")
+        return False
+    print("✅ SUCCESS: resumable uploads survive retries.")
+    return True
+
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
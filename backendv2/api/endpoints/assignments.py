@@ -1,13 +1,15 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from pydantic import BaseModel
 from typing import Optional, List
 import os
-import shutil
+from pathlib import Path
 
 from backend.core.database import get_db
 from backend.api.deps import get_current_user
+from backend.core.upload_pipeline import store_upload
 from backend.db.models import User, Assignment, Submission, SubmissionStatus, UserRole
 
 router = APIRouter()
@@ -89,7 +91,12 @@ async def submit_assignment(
     )
     
     db.add(submission)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request submitted first (unique assignment/student index)
+        await db.rollback()
+        return {"success": False, "message": "You have already submitted this assignment."}
     
     return {
         "success": True,
@@ -109,9 +116,9 @@ async def upload_file(file: UploadFile = File(...)):
     upload_dir = "uploads"
     os.makedirs(upload_dir, exist_ok=True)
     
-    file_path = f"{upload_dir}/{file.filename}"
+    file_path = f"{upload_dir}/{Path(file.filename).name}"
     
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
+    # Streamed off the event loop in large blocks (resumable uploads: /api/files/tus)
+    stored = await store_upload(file, Path(file_path))
         
-    return {"url": file_path, "filename": file.filename}
\ No newline at end of file
+    return {"url": file_path, "filename": file.filename, "size": stored.size, "sha256": stored.sha256}
\ No newline at end of file
@@ -53,15 +53,16 @@ async def login(
 
     # 2. Verify Credentials
     # Check if user exists AND if the password hash matches
-    if not user or not security.verify_password(credentials.password, user.hashed_password):
+    if not user or not await security.verify_password_async(credentials.password, user.hashed_password):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid credentials"
         )
 
     # 3. Create Access Token
-    # This generates the JWT string
-    access_token = security.create_access_token(data={"sub": user.id})
+    # This generates the JWT string; its claims (id, username, name, role) let socket
+    # handshakes authenticate without a DB lookup
+    access_token = security.create_user_token(user)
 
     # 4. Return Response
     # The structure here matches exactly what your AuthContext.jsx expects:
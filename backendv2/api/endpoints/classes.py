@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import selectinload
@@ -91,7 +92,12 @@ async def join_classroom(
     # 3. Create Enrollment
     enrollment = Enrollment(user_id=current_user.id, classroom_id=classroom.id)
     db.add(enrollment)
-    await db.commit()
+    try:
+        await db.commit()
+    except IntegrityError:
+        # A concurrent request enrolled first (unique user/classroom index)
+        await db.rollback()
+        return {"success": True, "message": "Already enrolled", "classId": classroom.id}
     
     return {"success": True, "classId": classroom.id}
 
@@ -1,14 +1,14 @@
-from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException
-from fastapi.responses import FileResponse
+from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 import os
-import shutil
-import uuid
 from datetime import datetime
 
 from backend.core.database import get_db
 from backend.api.deps import get_current_user
+from backend.core.blob_store import blob_store
+from backend.core.http_cache import file_download
+from backend.core.upload_pipeline import QuotaExceeded, store_upload, upload_quota
 from backend.db.models import User, FileResource, Classroom, UserRole
 
 router = APIRouter()
@@ -34,29 +34,34 @@ async def upload_resource(
     # but normally we'd check Enrollment or Ownership.
     
     # 2. Save File Physically
-    # Generate unique filename to prevent overwrites
-    file_ext = os.path.splitext(file.filename)[1]
-    unique_name = f"{uuid.uuid4()}{file_ext}"
-    file_path = os.path.join(UPLOAD_DIR, unique_name)
-    
-    with open(file_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-        
-    # 3. Create DB Entry
-    file_size_mb = f"{round(file.size / 1024 / 1024, 2)} MB" if file.size else "Unknown"
-    
-    new_file = FileResource(
-        classroom_id=classroom_id,
-        filename=file.filename,
-        file_path=file_path,
-        file_size=file_size_mb,
-        file_type=file.content_type,
-        is_offline_ready=False # Default
-    )
-    
-    db.add(new_file)
-    await db.commit()
-    await db.refresh(new_file)
+    # Stream to a temp file off the event loop, hashing and enforcing quotas as it goes
+    # (resumable uploads: /api/files/tus). The blob store keeps one copy per content hash.
+    try:
+        async with upload_quota.reserve(current_user.id, classroom_id) as reservation:
+            stored = await store_upload(file, blob_store.temp_path(), reservation)
+            blob = await blob_store.put(db, stored)
+
+            # 3. Create DB Entry
+            file_size_mb = f"{round(stored.size / 1024 / 1024, 2)} MB"
+
+            new_file = FileResource(
+                classroom_id=classroom_id,
+                filename=file.filename,
+                file_path=blob.path,
+                file_size=file_size_mb,
+                file_type=file.content_type,
+                is_offline_ready=False, # Default
+                uploaded_by=current_user.id,
+                size_bytes=stored.size,
+                sha256=stored.sha256,
+                blob_sha256=blob.sha256,
+            )
+
+            db.add(new_file)
+            await db.commit()
+            await db.refresh(new_file)
+    except QuotaExceeded as e:
+        raise HTTPException(status_code=413, detail=str(e))
     
     return {
         "success": True,
@@ -72,12 +77,13 @@ async def upload_resource(
 @router.get("/download/{file_id}")
 async def download_file(
     file_id: str,
+    request: Request,
     db: AsyncSession = Depends(get_db)
     # current_user check removed to allow easier downloading/caching 
     # for Service Workers (PWA) in this prototype phase
 ):
     """
-    Serves the physical file.
+    Serves the physical file (ETag / If-None-Match, Range and If-Range supported).
     """
     result = await db.execute(select(FileResource).where(FileResource.id == file_id))
     file_record = result.scalars().first()
@@ -85,8 +91,4 @@ async def download_file(
     if not file_record or not os.path.exists(file_record.file_path):
         raise HTTPException(status_code=404, detail="File not found")
         
-    return FileResponse(
-        path=file_record.file_path, 
-        filename=file_record.filename,
-        media_type=file_record.file_type
-    )
\ No newline at end of file
+    return file_download(request, file_record.file_path, file_record.filename, file_record.file_type, file_record.sha256)
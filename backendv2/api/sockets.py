@@ -1,4 +1,6 @@
 from backend.core.socket_manager import sio
+from backend.core.room_registry import room_registry
+from backend.core.stroke_codec import PACKED, PLAIN, codec_room, negotiate, pack_payload, unpack_payload
 
 # --- CONNECTION LIFECYCLE ---
 
@@ -15,35 +17,137 @@ async def disconnect(sid):
     """
     Triggered when a client drops connection.
     """
+    for room in room_registry.leave_all(sid):
+        await sio.emit('user_left', {'sid': sid, 'room': room}, room=room)
     print(f"❌ Socket Disconnected: {sid}")
 
+# --- ROOM MEMBERSHIP ---
+
+async def _current_room(sid):
+    session = await sio.get_session(sid)
+    return session.get('room')
+
+async def _leave(sid, room):
+    async with sio.session(sid) as session:
+        codec = session.get('stroke_codec', PLAIN)
+        if session.get('room') == room:
+            session.pop('room')
+    await sio.leave_room(sid, room)
+    await sio.leave_room(sid, codec_room(room, codec))
+    if room_registry.leave(room, sid):
+        await sio.emit('user_left', {'sid': sid, 'room': room}, room=room)
+
+@sio.event
+async def join_room(sid, data):
+    """
+    Joins a class room (one per connection; joining another room leaves the previous one).
+    Frontend sends: { room: classroom_id, user: { id, name } }
+    and receives 'room_joined' with the current members; the others get 'user_joined'.
+    """
+    room = (data or {}).get('room')
+    if not room:
+        return
+    previous = await _current_room(sid)
+    if previous and previous != room:
+        await _leave(sid, previous)
+
+    async with sio.session(sid) as session:
+        session['room'] = room
+        codec = session.get('stroke_codec', PLAIN)
+    member = {'user': (data or {}).get('user')}
+    await sio.enter_room(sid, room)
+    await sio.enter_room(sid, codec_room(room, codec))
+    room_registry.join(room, sid, member)
+
+    await sio.emit('room_joined', {'room': room, 'members': room_registry.members(room)}, to=sid)
+    await sio.emit('user_joined', dict(member, sid=sid, room=room), room=room, skip_sid=sid)
+
+@sio.event
+async def leave_room(sid, data=None):
+    """
+    Leaves the current (or the given) room.
+    Frontend sends: { room: classroom_id } (optional)
+    """
+    room = (data or {}).get('room') or await _current_room(sid)
+    if room:
+        await _leave(sid, room)
+
 # --- WEB RTC SIGNALING (P2P Handshake) ---
 
+async def _relay_signal(sid, event, payload, to):
+    """
+    Delivers a signaling message to exactly one peer (to=sid) when the target shares a room
+    with the sender, otherwise to the sender's room only. Never to the whole server.
+    """
+    if to:
+        if room_registry.shares_room(sid, to):
+            await sio.emit(event, payload, to=to)
+        return
+    room = await _current_room(sid)
+    if room:
+        await sio.emit(event, payload, room=room, skip_sid=sid)
+
 @sio.event
 async def callUser(sid, data):
     """
     Relays the 'Offer' signal from the Initiator (Teacher) to the Receiver.
-    Frontend sends: { signalData: ..., from: user.id }
+    Frontend sends: { signalData: ..., from: user.id, to: receiver_sid }
+    The receiver gets 'fromSid' so it can answer the caller directly.
     """
-    # In a real production app, we would use 'to=room_id' to isolate classes.
-    # For now, we broadcast to everyone except the sender.
-    await sio.emit('callUser', data, skip_sid=sid)
+    data = dict(data or {}, fromSid=sid)
+    await _relay_signal(sid, 'callUser', data, data.get('to'))
 
 @sio.event
 async def answerCall(sid, data):
     """
     Relays the 'Answer' signal from the Receiver back to the Initiator.
-    Frontend sends: { signal: ... }
+    Frontend sends: { signal: ..., to: caller_sid }
     """
     # Frontend expects 'callAccepted' event with the signal payload
-    await sio.emit('callAccepted', data['signal'], skip_sid=sid)
+    data = data or {}
+    await _relay_signal(sid, 'callAccepted', data.get('signal'), data.get('to'))
+
+@sio.event
+async def room_members(sid, data=None):
+    """
+    Lists who is in the current (or the given) room, for picking a `to` target.
+    """
+    room = (data or {}).get('room') or await _current_room(sid)
+    await sio.emit('room_members', {'room': room, 'members': room_registry.members(room) if room else []}, to=sid)
 
 # --- WHITEBOARD SYNC ---
 
+@sio.event
+async def stroke_codec(sid, data):
+    """
+    Negotiates the stroke codec for this client.
+    Frontend sends: { codecs: ['qdv1', 'json'] } and receives 'stroke_codec_selected'.
+    """
+    codec = negotiate((data or {}).get('codecs'))
+    async with sio.session(sid) as session:
+        previous = session.get('stroke_codec', PLAIN)
+        session['stroke_codec'] = codec
+        room = session.get('room')
+    if room and previous != codec:
+        await sio.leave_room(sid, codec_room(room, previous))
+        await sio.enter_room(sid, codec_room(room, codec))
+    await sio.emit('stroke_codec_selected', {'codec': codec}, to=sid)
+
 @sio.event
 async def draw_data(sid, data):
     """
-    Relays vector drawing coordinates.
+    Relays vector drawing coordinates to the sender's room only.
     Frontend sends: { line: { tool, points: [...] } }
+    Points are quantized and delta-packed once; 'qdv1' clients receive the packed
+    envelope, the others plain (quantized) numbers.
     """
-    await sio.emit('draw_data', data, skip_sid=sid)
\ No newline at end of file
+    room = await _current_room(sid)
+    if not room:
+        return
+    try:
+        packed = pack_payload(data)
+        plain = unpack_payload(packed)
+    except (ValueError, TypeError, OverflowError):
+        return
+    await sio.emit('draw_data', packed, room=codec_room(room, PACKED), skip_sid=sid)
+    await sio.emit('draw_data', plain, room=codec_room(room, PLAIN), skip_sid=sid)
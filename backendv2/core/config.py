@@ -13,6 +13,26 @@ class Settings(BaseSettings):
 
     # Database (Async SQLite for Hackathon)
     DATABASE_URL: str = "sqlite+aiosqlite:///./vlink.db"
+
+    # SQLite profile (see backend/core/sqlite_profile.py): one serialized writer, a pool of readers
+    SQLITE_JOURNAL_MODE: str = "WAL"
+    SQLITE_SYNCHRONOUS: str = "NORMAL"
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_CACHE_SIZE_KB: int = 64 * 1024
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_READ_POOL_SIZE: int = 4
+    SQLITE_WRITER_TIMEOUT_S: float = 30.0
+
+    # Server databases (see backend/core/db_backend.py); DATABASE_READ_URL may point at a replica
+    DATABASE_READ_URL: str = ""
+    DB_POOL_SIZE: int = 10
+    DB_READ_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 20
+    DB_POOL_TIMEOUT_S: float = 30.0
+    DB_POOL_RECYCLE_S: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    DB_STATEMENT_CACHE_SIZE: int = 256  # 0 behind pgbouncer in transaction mode
+    DB_APPLICATION_NAME: str = "vlink"
     
     # JWT Auth
     SECRET_KEY: str = "CHANGE_THIS_TO_A_SUPER_SECRET_KEY_IN_ENV_FILE"
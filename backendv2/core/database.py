@@ -2,15 +2,28 @@ from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
 # We use a relative import here to ensure it works regardless of where the script is run
 from .config import settings
+from backend.core.db_backend import database_url, engine_kwargs
+from backend.core.sqlite_profile import apply_sqlite_profile
 
 # 1. Create the Async Engine
-# check_same_thread=False is needed ONLY for SQLite
+# engine_kwargs() adds check_same_thread=False ONLY for SQLite, and pool sizing/pre-ping for Postgres
+# On SQLite this is the single, serialized writer connection (WAL + pragmas applied on connect)
 engine = create_async_engine(
-    settings.DATABASE_URL,
-    connect_args={"check_same_thread": False}, 
+    database_url(settings, writer=True),
     echo=False,
-    future=True
+    future=True,
+    **engine_kwargs(settings, writer=True)
 )
+apply_sqlite_profile(engine, settings)
+
+# Read-only connection pool for read paths
+read_engine = create_async_engine(
+    database_url(settings, writer=False),
+    echo=False,
+    future=True,
+    **engine_kwargs(settings, writer=False)
+)
+apply_sqlite_profile(read_engine, settings, read_only=True)
 
 # 2. Create the Session Factory
 AsyncSessionLocal = sessionmaker(
@@ -20,6 +33,13 @@ AsyncSessionLocal = sessionmaker(
     autoflush=False
 )
 
+ReadSessionLocal = sessionmaker(
+    bind=read_engine,
+    class_=AsyncSession,
+    expire_on_commit=False,
+    autoflush=False
+)
+
 # 3. Base class for Models
 # The error you saw happened because this specific line was missing
 Base = declarative_base()
@@ -33,4 +53,11 @@ async def get_db():
             await session.rollback()
             raise
         finally:
-            await session.close()
\ No newline at end of file
+            await session.close()
+
+async def get_read_db():
+    async with ReadSessionLocal() as session:
+        try:
+            yield session
+        finally:
+            await session.close()
@@ -12,6 +12,7 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from backend.core.config import settings
 from backend.core.database import engine, Base
+from backend.core.migrations import upgrade_schema
 from backend.api.router import api_router
 
 # Import Socket Manager
@@ -45,6 +46,7 @@ app.include_router(api_router, prefix=settings.API_STR)
 async def init_db_tables():
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
     print("✅ Database Tables Verified/Created")
 
 @app.get("/")